@@ -0,0 +1,122 @@
+"""Benchmark per-bill insert_rows against the bulk insert_bill_rows path.
+
+Builds an in-memory day sheet with the Shopee/Lazada/Grand total summary block,
+adds N bills both ways and checks that the two sheets come out identical.
+
+    python benchmarks/bench_insert_rows.py [--existing 200] [--sizes 50 500 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orderreports import report  # noqa: E402
+
+
+def build_day_sheet(existing):
+    """Return a workbook with one day sheet holding `existing` bill rows and the summary block."""
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = "1"
+    for row in range(5, 5 + existing):
+        sheet[f"B{row}"] = "PHK"
+        sheet[f"C{row}"] = f"{row:06d}"
+        sheet[f"E{row}"] = "N/A / N/A"
+        sheet[f"G{row}"] = 100.0
+        sheet[f"H{row}"] = 7.0
+        sheet[f"K{row}"] = "Kerry / Shopee"
+    summary = 5 + max(existing, 1)
+    sheet[f"E{summary + 6}"] = "Shopee"
+    sheet[f"E{summary + 7}"] = "Lazada"
+    sheet[f"E{summary + 8}"] = "Grand total"
+    return wb, sheet
+
+
+def make_bills(count):
+    return {
+        f"B{i:05d}": {
+            'customer_name': f"Customer {i}",
+            'zone': "บางพลี / สมุทรปราการ",
+            'box_count': 1 + i % 5,
+            'total_value': 100.0 + i,
+            'tax_value': 7.0 + i / 100,
+            'transport_service': "Flash / Lazada" if i % 2 else "Kerry / Shopee",
+            'phone': "081-234-5678",
+        }
+        for i in range(count)
+    }
+
+
+def insert_per_row(sheet, current_row, bills_data):
+    """The original write loop: one insert_rows call per bill."""
+    for bill_number, data in bills_data.items():
+        if current_row != 5:
+            sheet.insert_rows(current_row)
+            sheet.row_dimensions[current_row].height = 18
+
+        sheet[f"B{current_row}"] = "PHK"
+        sheet[f"C{current_row}"] = bill_number
+        sheet[f"D{current_row}"] = data['customer_name']
+        sheet[f"E{current_row}"] = data['zone']
+        sheet[f"F{current_row}"] = data['box_count']
+        sheet[f"G{current_row}"] = data['total_value']
+        sheet[f"H{current_row}"] = data['tax_value']
+        sheet[f"H{current_row}"].number_format = "0.00"
+        sheet[f"M{current_row}"] = data['phone']
+        sheet[f"K{current_row}"] = data['transport_service']
+
+        report.apply_borders_and_format(sheet, current_row)
+        current_row += 1
+    return current_row
+
+
+def sheet_snapshot(sheet):
+    return [(cell.coordinate, cell.value, cell.number_format, cell.border.left.style, cell.font.name)
+            for row in sheet.iter_rows() for cell in row if cell.has_style or cell.value is not None]
+
+
+def run(size, existing):
+    start_row = 5 + existing if existing else 5
+    bills = make_bills(size)
+
+    _, legacy_sheet = build_day_sheet(existing)
+    started = time.perf_counter()
+    insert_per_row(legacy_sheet, start_row, bills)
+    legacy = time.perf_counter() - started
+
+    _, bulk_sheet = build_day_sheet(existing)
+    started = time.perf_counter()
+    report.insert_bill_rows(bulk_sheet, start_row, bills)
+    bulk = time.perf_counter() - started
+
+    same = (sheet_snapshot(legacy_sheet) == sheet_snapshot(bulk_sheet)
+            and report.find_keyword_row(legacy_sheet, "Grand total", 5)
+            == report.find_keyword_row(bulk_sheet, "Grand total", 5))
+    return {"bills": size, "existing_rows": existing, "per_row_s": round(legacy, 4),
+            "bulk_s": round(bulk, 4), "speedup": round(legacy / bulk, 1) if bulk else None,
+            "identical": same}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--existing", type=int, default=200, help="bill rows already in the day sheet")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [run(size, args.existing) for size in args.sizes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'bills':>6} {'per-row (s)':>12} {'bulk (s)':>9} {'speedup':>8} identical")
+    for r in results:
+        print(f"{r['bills']:>6} {r['per_row_s']:>12.4f} {r['bulk_s']:>9.4f} {r['speedup']:>7}x {r['identical']}")
+
+
+if __name__ == "__main__":
+    main()
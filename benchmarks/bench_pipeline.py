@@ -0,0 +1,144 @@
+"""Benchmark each processing stage at several bills-per-day sizes.
+
+Times folder scan, bill extraction, report load, row insertion, process_sheet,
+row indices/summary formulas and save against a synthetic tree under --root
+(generated on first use and reused afterwards). Results are JSON, so runs can be compared:
+
+    python benchmarks/bench_pipeline.py --root /tmp/bench --output before.json
+    python benchmarks/bench_pipeline.py --root /tmp/bench --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import load_workbook  # noqa: E402
+
+from benchmarks.synthetic import generate_day  # noqa: E402
+from orderreports import report  # noqa: E402
+from orderreports.paths import get_path  # noqa: E402
+from orderreports.processing import extract_new_bills, find_new_bill_files  # noqa: E402
+from orderreports.store import BillStore  # noqa: E402
+
+YEAR, MONTH, DAY = 2024, 11, 1
+stages = ("scan", "extract", "load", "insert", "process_sheet", "formulas", "save")
+
+
+def prepare_tree(root, bills):
+    """Return the root of a synthetic tree with `bills` bills on day 1, generating it if needed."""
+    tree = os.path.join(root, f"bills_{bills}")
+    folder = get_path(YEAR, MONTH, DAY, report=False, root=tree)
+    if not (os.path.isdir(folder) and len(os.listdir(folder)) == bills):
+        shutil.rmtree(tree, ignore_errors=True)
+        generate_day(tree, YEAR, MONTH, DAY, bills, seed=bills)
+    return tree
+
+
+def run_once(tree, workers):
+    """Run every stage once against a fresh store and a scratch copy of the report; returns stage seconds."""
+    timings = {}
+    scratch = tempfile.mkdtemp(prefix="orderreports-bench-")
+    try:
+        store = BillStore(os.path.join(scratch, "store.sqlite3"))
+        report_path = os.path.join(scratch, "report.xlsx")
+        shutil.copyfile(get_path(YEAR, MONTH, root=tree), report_path)
+        folder = get_path(YEAR, MONTH, DAY, report=False, root=tree)
+
+        def timed(stage, func, *args):
+            started = time.perf_counter()
+            value = func(*args)
+            timings[stage] = time.perf_counter() - started
+            return value
+
+        bill_files = timed("scan", find_new_bill_files, folder, store)
+        bills_data = timed("extract", extract_new_bills, bill_files, store, (YEAR, MONTH, DAY), workers)
+        wb = timed("load", load_workbook, report_path)
+        sheet = wb[str(DAY)]
+
+        def insert():
+            index = report.build_bill_index(sheet)
+            new_bills, _, _ = report.upsert_bill_rows(sheet, bills_data, index)
+            current_row = report.get_last_data_row(sheet) + 1 if sheet["C5"].value else 5
+            report.insert_bill_rows(sheet, current_row, new_bills, index)
+
+        def formulas():
+            report.update_row_indices(sheet)
+            report.update_summary_formulas(sheet)
+
+        timed("insert", insert)
+        timed("process_sheet", report.process_sheet, sheet, DAY)
+        timed("formulas", formulas)
+        timed("save", wb.save, report_path)
+        wb.close()
+        store.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return timings
+
+
+def benchmark(root, sizes, repeat=1, workers=None, log=print):
+    """Return the benchmark results document for the given bill counts."""
+    results = []
+    for bills in sizes:
+        log(f"Preparing {bills} bills...")
+        tree = prepare_tree(root, bills)
+        runs = [run_once(tree, workers) for _ in range(repeat)]
+        best = {stage: round(min(run[stage] for run in runs), 4) for stage in stages}
+        results.append({"bills": bills, "stages": best, "total_s": round(sum(best.values()), 4),
+                        "per_bill_ms": round(sum(best.values()) / bills * 1000, 3)})
+        log(f"{bills:>6} bills: " + ", ".join(f"{stage} {best[stage]:.3f}s" for stage in stages))
+    return {
+        "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpu_count": os.cpu_count(), "workers": workers,
+                 "repeat": repeat},
+        "results": results,
+    }
+
+
+def compare(current, previous):
+    """Return lines comparing stage times with a previous results document (ratio < 1 is faster)."""
+    before = {entry["bills"]: entry for entry in previous["results"]}
+    lines = []
+    for entry in current["results"]:
+        old = before.get(entry["bills"])
+        if not old:
+            continue
+        ratios = [f"{stage} x{entry['stages'][stage] / old['stages'][stage]:.2f}"
+                  for stage in stages if old["stages"].get(stage)]
+        lines.append(f"{entry['bills']:>6} bills: total x{entry['total_s'] / old['total_s']:.2f} ({', '.join(ratios)})")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=os.path.join(tempfile.gettempdir(), "orderreports-bench"),
+                        help="where the synthetic trees are generated and reused")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size; the best time per stage is kept")
+    parser.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", metavar="JSON", help="previous results to compare against")
+    args = parser.parse_args()
+
+    results = benchmark(args.root, args.sizes, args.repeat, args.workers, log=lambda m: print(m, file=sys.stderr))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare) as file:
+            for line in compare(results, json.load(file)):
+                print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Synthetic OrderReports tree: CashSale_th bill workbooks and a matching monthly report.
+
+    python benchmarks/synthetic.py --root /tmp/OrderReports --year 2024 --month 11 --day 7 --bills 100
+
+Bills have a variable number of line items, Thai and romanized addresses and
+Shopee/Lazada/other transport strings, with the cells the extractor reads at the
+template positions (D9, D11, D12, amounts in column F, tax in J five rows below the total).
+"""
+import argparse
+import calendar
+import os
+import random
+import sys
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Border, Font, Side
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orderreports.address import provinces  # noqa: E402
+from orderreports.paths import get_path  # noqa: E402
+
+first_names = ["สมชาย", "สมหญิง", "วิชัย", "มาลี", "ประเสริฐ", "อรุณี", "Somchai", "Nattaya", "Anan", "Kanya"]
+last_names = ["ใจดี", "รักไทย", "ศรีสุข", "มั่นคง", "Wongsa", "Srisuk", "Chaiyaporn"]
+subdistricts = ["บางพลี", "คลองตัน", "ท่าศาลา", "หนองปรือ", "ในเมือง", "บางรัก", "Nongprue", "Suthep", "Bang Kaeo"]
+transports = ["Kerry / Shopee", "Flash / Lazada", "J&T Express / Shopee", "Thailand Post / Lazada",
+              "SPX / Shopee", "Lazada Express / Lazada", "ไปรษณีย์ไทย", "รับเอง"]
+items = ["กล่องพัสดุ เบอร์ A", "เทปใส 2 นิ้ว", "บับเบิ้ลกันกระแทก", "สติ๊กเกอร์ระวังแตก", "ถุงไปรษณีย์", "Packing set"]
+
+thin = Side(style="thin")
+box = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+
+def random_phone(rng):
+    digits = f"0{rng.choice('689')}{rng.randint(0, 99999999):08d}"
+    return rng.choice([f"{digits[:3]}-{digits[3:6]}-{digits[6:]}", digits])
+
+
+def random_address(rng):
+    """Return an address in one of the formats customers actually type."""
+    thai, romanized, _ = rng.choice(provinces)
+    zone = rng.choice(subdistricts)
+    number = f"{rng.randint(1, 999)}/{rng.randint(1, 99)}"
+    postcode = f"{rng.randint(10, 96)}{rng.randint(0, 999):03d}"
+    phone = random_phone(rng)
+    return rng.choice([
+        f"{number} ม.{rng.randint(1, 12)} ต.{zone} อ.เมือง จ.{thai} {postcode} โทร. {phone}",
+        f"{number} หมู่ {rng.randint(1, 12)} ตำบล{zone} อำเภอเมือง จังหวัด{thai} {postcode} {phone}",
+        f"{number} ต.{zone}อ.เมืองจ.{thai}{postcode}",
+        f"{number} ต.{zone} อ.เมือง {thai} {postcode} {phone}",
+        f"{number} Moo {rng.randint(1, 12)} T.{zone} A.Mueang {romanized} {postcode} Tel. {phone}",
+        f"{number} Soi {rng.randint(1, 50)} {romanized} {postcode}",
+    ])
+
+
+def write_bill(path, rng, bill_number):
+    """Write one CashSale_th bill workbook and return its total."""
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = "CashSale_th"
+    sheet.merge_cells("A1:J1")
+    sheet["A1"] = "บริษัท ตัวอย่าง จำกัด - บิลเงินสด / Cash Sale"
+    sheet["A1"].font = Font(name="Tahoma", size=14, bold=True)
+    sheet["A1"].alignment = Alignment(horizontal="center")
+    sheet["H3"], sheet["I3"] = "เลขที่", bill_number
+    sheet["H4"], sheet["I4"] = "วันที่", f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2567"
+
+    sheet["C9"], sheet["D9"] = "ชื่อลูกค้า", f"{rng.choice(first_names)} {rng.choice(last_names)}"
+    sheet["C11"], sheet["D11"] = "ที่อยู่", random_address(rng)
+    sheet["C12"], sheet["D12"] = "ขนส่ง", rng.choice(transports)
+
+    header_row = 14
+    for col, label in zip("ABCDEF", ["ลำดับ", "รายการ", "จำนวน", "หน่วย", "ราคา/หน่วย", "จำนวนเงิน"]):
+        sheet[f"{col}{header_row}"] = label
+        sheet[f"{col}{header_row}"].border = box
+    row = header_row
+    subtotal = 0
+    for index in range(1, rng.randint(1, 25) + 1):
+        row = header_row + index
+        quantity, price = rng.randint(1, 20), round(rng.uniform(5, 500), 2)
+        amount = round(quantity * price, 2)
+        subtotal += amount
+        for col, value in zip("ABCDEF", [index, rng.choice(items), quantity, "ชิ้น", price, amount]):
+            sheet[f"{col}{row}"] = value
+            sheet[f"{col}{row}"].border = box
+        sheet[f"F{row}"].number_format = "#,##0.00"
+
+    # Totals block: the last numeric F is the bill total and J five rows below holds the tax
+    discount = round(subtotal * rng.choice([0, 0, 0.05]), 2)
+    total = round(subtotal - discount, 2)
+    sheet[f"E{row + 2}"], sheet[f"F{row + 2}"] = "รวมเงิน", round(subtotal, 2)
+    sheet[f"E{row + 3}"], sheet[f"F{row + 3}"] = "ส่วนลด", discount
+    sheet[f"E{row + 4}"], sheet[f"F{row + 4}"] = "ยอดสุทธิ", total
+    sheet[f"F{row + 5}"] = "(ตัวอักษร)"
+    sheet[f"I{row + 9}"], sheet[f"J{row + 9}"] = "ภาษีมูลค่าเพิ่ม", round(total * 7 / 107, 2)
+    sheet[f"J{row + 9}"].number_format = "#,##0.00"
+    wb.save(path)
+    return total
+
+
+def write_monthly_report(path, year, month):
+    """Write a 31-sheet monthly report with the day-sheet template the processor expects."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    headers = ["ลำดับ", "สาขา", "เลขที่บิล", "ชื่อลูกค้า", "ตำบล / จังหวัด", "กล่อง", "ยอดเงิน", "ภาษี",
+               "", "", "ขนส่ง", "App", "เบอร์โทร", "หมายเหตุ"]
+    for day in range(1, 32):
+        sheet = wb.create_sheet(str(day))
+        sheet["A1"] = f"รายงานการขายประจำวันที่ {day}/{month}/{year + 543}"
+        sheet["A1"].font = Font(name="Tahoma", size=14, bold=True)
+        for col, label in enumerate(headers, 1):
+            cell = sheet.cell(row=4, column=col, value=label or None)
+            cell.border = box
+            cell.font = Font(name="Tahoma", size=12, bold=True)
+        # Row 5 is the blank first data row, followed by the summary rows and the platform labels
+        for col in "FGH":
+            sheet[f"{col}6"] = f"=SUM({col}5:{col}5)"
+            sheet[f"{col}7"] = f"={col}6"
+        sheet["H9"] = "=H7"
+        sheet["E11"], sheet["E12"], sheet["E13"] = "Shopee", "Lazada", "Grand total"
+    wb.save(path)
+
+
+def generate_day(root, year, month, day, bills, seed=0, report=True):
+    """Create the monthly report (unless it exists) and `bills` bill files for one day.
+
+    Returns the Day_N folder path.
+    """
+    rng = random.Random(seed * 100003 + day)
+    report_path = get_path(year, month, root=root)
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    if report and not os.path.exists(report_path):
+        write_monthly_report(report_path, year, month)
+
+    folder = get_path(year, month, day, report=False, root=root)
+    os.makedirs(folder, exist_ok=True)
+    numbers = rng.sample(range(1, 1000000), bills)
+    for number in numbers:
+        bill_number = f"{number:06d}"
+        write_bill(os.path.join(folder, f"{bill_number}{rng.randint(1, 9):02d}.xlsx"), rng, bill_number)
+    return folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic OrderReports tree.")
+    parser.add_argument("--root", required=True)
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--month", type=int, default=11)
+    parser.add_argument("--day", type=int, nargs="+", help="days to fill (default: every day of the month)")
+    parser.add_argument("--bills", type=int, default=50, help="bills per day")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    days = args.day or range(1, calendar.monthrange(args.year, args.month)[1] + 1)
+    for day in days:
+        print(generate_day(args.root, args.year, args.month, day, args.bills, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Order report processing: daily CashSale_th bills into Monthly_Report_M_YYYY.xlsx.
+
+The processing API is importable without a display. Names are resolved lazily,
+so `import orderreports` does not pull in openpyxl or Tk.
+"""
+import importlib
+
+_exports = {
+    "process_bills_for_day": "processing",
+    "process_bills_for_range": "processing",
+    "find_new_bill_files": "processing",
+    "extract_new_bills": "processing",
+    "write_day_sheet": "processing",
+    "BillRecord": "pipeline",
+    "extract_bill_data": "bills",
+    "parse_address": "address",
+    "parse_addresses": "address",
+    "extract_bills": "bills",
+    "Cancelled": "bills",
+    "parse_bill_filename": "bills",
+    "parse_address_zone_province_and_phone": "bills",
+    "read_bill_cells": "bill_reader",
+    "rebuild_range": "rebuild",
+    "verify_range": "rebuild",
+    "watch_bills": "watch",
+    "serve": "service",
+    "submit_range": "service",
+    "get_path": "paths",
+    "convert_year": "paths",
+}
+
+__all__ = sorted(_exports)
+
+
+def __getattr__(name):
+    if name in _exports:
+        return getattr(importlib.import_module(f".{_exports[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,312 @@
+"""Thai address parsing: sub-district (zone), province and phone number.
+
+Patterns are compiled once. All gazetteer names are matched in one pass over the address
+with an Aho-Corasick automaton. Results are cached in a bounded LRU, since repeat customers
+send the same address again and again.
+
+Scope of the built-in gazetteer: the 77 provinces only, in Thai and romanized spellings.
+No district or sub-district names ship with the package. Without a sub-district file, the
+zone comes only from a ต./ตำบล/แขวง/T. marker in the address, and the gazetteer only
+finds provinces. Province names that are also ordinary words (เลย, ตาก) need a จ./จังหวัด
+marker or the end of the address. To match sub-districts by name (and fill in the province of an address that
+names only its sub-district), load a CSV with load_gazetteer(), the --gazetteer option
+or $ORDER_REPORTS_GAZETTEER.
+"""
+import csv
+import os
+import re
+
+from collections import deque
+from functools import lru_cache
+
+# The 77 provinces: (Thai name, romanized name, other spellings)
+provinces = [
+    ("กรุงเทพมหานคร", "Bangkok", ("กรุงเทพฯ", "กรุงเทพ", "กทม.", "กทม", "Krung Thep", "BKK")),
+    ("กระบี่", "Krabi", ()),
+    ("กาญจนบุรี", "Kanchanaburi", ()),
+    ("กาฬสินธุ์", "Kalasin", ()),
+    ("กำแพงเพชร", "Kamphaeng Phet", ()),
+    ("ขอนแก่น", "Khon Kaen", ()),
+    ("จันทบุรี", "Chanthaburi", ("Chantaburi",)),
+    ("ฉะเชิงเทรา", "Chachoengsao", ()),
+    ("ชลบุรี", "Chon Buri", ()),
+    ("ชัยนาท", "Chai Nat", ("Chainat",)),
+    ("ชัยภูมิ", "Chaiyaphum", ()),
+    ("ชุมพร", "Chumphon", ("Chumporn",)),
+    ("เชียงราย", "Chiang Rai", ()),
+    ("เชียงใหม่", "Chiang Mai", ()),
+    ("ตรัง", "Trang", ()),
+    ("ตราด", "Trat", ()),
+    ("ตาก", "Tak", ()),
+    ("นครนายก", "Nakhon Nayok", ()),
+    ("นครปฐม", "Nakhon Pathom", ()),
+    ("นครพนม", "Nakhon Phanom", ()),
+    ("นครราชสีมา", "Nakhon Ratchasima", ("โคราช", "Korat")),
+    ("นครศรีธรรมราช", "Nakhon Si Thammarat", ()),
+    ("นครสวรรค์", "Nakhon Sawan", ()),
+    ("นนทบุรี", "Nonthaburi", ()),
+    ("นราธิวาส", "Narathiwat", ()),
+    ("น่าน", "Nan", ()),
+    ("บึงกาฬ", "Bueng Kan", ("Bueng Kal",)),
+    ("บุรีรัมย์", "Buri Ram", ()),
+    ("ปทุมธานี", "Pathum Thani", ()),
+    ("ประจวบคีรีขันธ์", "Prachuap Khiri Khan", ()),
+    ("ปราจีนบุรี", "Prachin Buri", ()),
+    ("ปัตตานี", "Pattani", ()),
+    ("พระนครศรีอยุธยา", "Phra Nakhon Si Ayutthaya", ("อยุธยา", "Ayutthaya", "Ayuthaya")),
+    ("พะเยา", "Phayao", ()),
+    ("พังงา", "Phang Nga", ()),
+    ("พัทลุง", "Phatthalung", ()),
+    ("พิจิตร", "Phichit", ()),
+    ("พิษณุโลก", "Phitsanulok", ()),
+    ("เพชรบุรี", "Phetchaburi", ("Petchaburi",)),
+    ("เพชรบูรณ์", "Phetchabun", ()),
+    ("แพร่", "Phrae", ()),
+    ("ภูเก็ต", "Phuket", ()),
+    ("มหาสารคาม", "Maha Sarakham", ()),
+    ("มุกดาหาร", "Mukdahan", ()),
+    ("แม่ฮ่องสอน", "Mae Hong Son", ()),
+    ("ยโสธร", "Yasothon", ()),
+    ("ยะลา", "Yala", ()),
+    ("ร้อยเอ็ด", "Roi Et", ()),
+    ("ระนอง", "Ranong", ()),
+    ("ระยอง", "Rayong", ()),
+    ("ราชบุรี", "Ratchaburi", ()),
+    ("ลพบุรี", "Lop Buri", ()),
+    ("ลำปาง", "Lampang", ()),
+    ("ลำพูน", "Lamphun", ()),
+    ("เลย", "Loei", ()),
+    ("ศรีสะเกษ", "Si Sa Ket", ()),
+    ("สกลนคร", "Sakon Nakhon", ()),
+    ("สงขลา", "Songkhla", ()),
+    ("สตูล", "Satun", ()),
+    ("สมุทรปราการ", "Samut Prakan", ("Samut Prakarn",)),
+    ("สมุทรสงคราม", "Samut Songkhram", ()),
+    ("สมุทรสาคร", "Samut Sakhon", ()),
+    ("สระแก้ว", "Sa Kaeo", ("Sa Kaew",)),
+    ("สระบุรี", "Saraburi", ()),
+    ("สิงห์บุรี", "Sing Buri", ()),
+    ("สุโขทัย", "Sukhothai", ()),
+    ("สุพรรณบุรี", "Suphan Buri", ()),
+    ("สุราษฎร์ธานี", "Surat Thani", ()),
+    ("สุรินทร์", "Surin", ()),
+    ("หนองคาย", "Nong Khai", ()),
+    ("หนองบัวลำภู", "Nong Bua Lam Phu", ()),
+    ("อ่างทอง", "Ang Thong", ()),
+    ("อำนาจเจริญ", "Amnat Charoen", ()),
+    ("อุดรธานี", "Udon Thani", ()),
+    ("อุตรดิตถ์", "Uttaradit", ()),
+    ("อุทัยธานี", "Uthai Thani", ()),
+    ("อุบลราชธานี", "Ubon Ratchathani", ()),
+]
+
+# Province names that are also everyday words or parts of other names (เลย "very", ถ.ตากสิน):
+# without a จ./จังหวัด marker they only count at the end of the address, before the postcode
+ambiguous_provinces = {"เลย", "ตาก", "แพร่", "น่าน", "ตรัง", "nan", "tak"}
+
+# Same patterns as the original parser, compiled once
+_PHONE = re.compile(r"(Tel\.|โทร\.)?\s*(\d{3}-?\d{3}-?\d{4})")
+
+# Zone and province markers, in priority order; the token after a marker runs to the next
+# whitespace or the next Thai marker (addresses often have no space before อ./จ.)
+_TOKEN = r"\s*(\S+?)(?=\s|\d|อ\.|อำเภอ|จ\.|จังหวัด|$)"
+_ZONE_MARKERS = [re.compile(marker + _TOKEN) for marker in (r"(?<![A-Za-z])T\.", r"ต\.", r"ตำบล", r"แขวง")]
+_PROVINCE_MARKERS = [re.compile(marker + _TOKEN) for marker in (r"จ\.", r"จังหวัด")]
+
+
+class Automaton:
+    """Aho-Corasick automaton: finds every occurrence of a set of names in one pass."""
+
+    def __init__(self, names):
+        # names: {lowercased name: value}
+        self.goto, self.fail, self.out = [{}], [0], [[]]
+        for name, value in names.items():
+            node = 0
+            for char in name:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.out[node].append((len(name), value))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def search(self, text):
+        """Yield (start, end, value) for every name found in text (which should be lowercased)."""
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, value in self.out[node]:
+                yield end - length, end, value
+
+
+def _is_latin(text):
+    return text.isascii()
+
+
+def _on_word_boundary(text, start, end):
+    """Latin names must not run into neighbouring letters ("Nan" inside "Nanthaburi")."""
+    return not (start > 0 and text[start - 1].isalpha() and text[start - 1].isascii()) \
+        and not (end < len(text) and text[end].isalpha() and text[end].isascii())
+
+
+def _at_end(text, end):
+    """True when only a postcode, spaces or punctuation follow position end."""
+    return not text[end:].strip(" \t\n,.-()0123456789")
+
+
+class Gazetteer:
+    """Province and sub-district names with a single-pass matcher over them."""
+
+    def __init__(self):
+        self.provinces = {}
+        self.canonical = {}  # Any province spelling, lowercased -> Thai name
+        self.subdistricts = {}
+        for thai, romanized, others in provinces:
+            self.add_province(thai, romanized, others)
+        self._automaton = None
+
+    def add_province(self, thai, romanized, others=()):
+        for name in (thai, romanized, romanized.replace(" ", ""), *others):
+            self.provinces[name.lower()] = ("province", romanized if _is_latin(name) else thai)
+            self.canonical[name.lower()] = thai
+        self._automaton = None
+
+    def add_subdistrict(self, thai, romanized, province_thai, province_romanized):
+        for name, province in ((thai, province_thai), (romanized, province_romanized)):
+            if name:
+                self.subdistricts[name.lower()] = ("zone", name, province)
+        self._automaton = None
+
+    @property
+    def automaton(self):
+        if self._automaton is None:
+            self._automaton = Automaton({**self.subdistricts, **self.provinces})
+        return self._automaton
+
+    def find(self, address):
+        """Return the last, longest province match and sub-district match in an address, as values."""
+        text = address.lower()
+        best = {}
+        for start, end, value in self.automaton.search(text):
+            if _is_latin(text[start:end]) and not _on_word_boundary(text, start, end):
+                continue
+            if text[start:end] in ambiguous_provinces and not _at_end(text, end):
+                continue
+            kind = value[0]
+            if kind not in best or (end, end - start) > best[kind][0]:
+                best[kind] = ((end, end - start), value)
+        return {kind: value for kind, (_, value) in best.items()}
+
+
+gazetteer = Gazetteer()
+
+_PROVINCE_PREFIX = re.compile(r"^\s*(จ\.|จังหวัด|changwat\s+)\s*", re.IGNORECASE)
+_PROVINCE_SUFFIX = re.compile(r"\s+province\s*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def canonical_province(name):
+    """Return the Thai gazetteer name for any spelling of a province ("Bangkok", "จ.กรุงเทพฯ").
+
+    Names that are not in the gazetteer come back stripped of their จ./จังหวัด prefix;
+    empty names and "N/A" come back as None.
+    """
+    if not name:
+        return None
+    name = _PROVINCE_SUFFIX.sub("", _PROVINCE_PREFIX.sub("", name)).strip()
+    if name in ("", "N/A"):
+        return None
+    canonical = gazetteer.canonical.get(name.lower())
+    if canonical is None:
+        # A spelling with extra text around it ("กรุงเทพฯ 10110")
+        found = gazetteer.find(name)
+        if "province" in found:
+            canonical = gazetteer.canonical[found["province"][1].lower()]
+    return canonical or name
+
+
+gazetteer_columns = ("province_th", "province_en", "subdistrict_th", "subdistrict_en")
+
+
+def load_gazetteer(path):
+    """Add sub-districts from a UTF-8 CSV and return how many rows were loaded.
+
+    The header must have the gazetteer_columns, one row per sub-district, e.g.
+    สมุทรปราการ,Samut Prakan,บางพลีใหญ่,Bang Phli Yai. Raises ValueError when a column is missing.
+    """
+    count = 0
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        missing = [column for column in gazetteer_columns if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"{path}: missing gazetteer column(s) {', '.join(missing)}")
+        for row in reader:
+            gazetteer.add_subdistrict(row["subdistrict_th"], row["subdistrict_en"],
+                                      row["province_th"], row["province_en"])
+            count += 1
+    parse_address.cache_clear()
+    return count
+
+
+def _marker_token(markers, address):
+    for marker in markers:
+        match = marker.search(address)
+        if match:
+            return match.group(1)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_address(address):
+    """Return ("zone / province", phone) for an address, with "N/A" for parts not found."""
+    if not address:
+        return "N/A / N/A", "N/A"
+
+    # Remove potential phone number patterns to avoid interfering with other parsing
+    phone_match = _PHONE.search(address)
+    phone = phone_match.group(2).replace("-", "") if phone_match else "N/A"
+    if phone != "N/A" and len(phone) == 10:
+        phone = f"{phone[:3]}-{phone[3:6]}-{phone[6:]}"  # Format to XXX-XXX-XXXX
+    address = _PHONE.sub("", address).strip()
+
+    zone = _marker_token(_ZONE_MARKERS, address)
+    province = _marker_token(_PROVINCE_MARKERS, address)
+    if zone is None or province is None:
+        found = gazetteer.find(address)
+        if zone is None and "zone" in found:
+            zone = found["zone"][1]
+            province = province or found["zone"][2]
+        if province is None and "province" in found:
+            province = found["province"][1]
+
+    if province is None:
+        # Last resort: the last word that is not an abbreviation or a postcode
+        for word in reversed(address.split()):
+            if "." not in word and not word.isdigit():
+                province = word
+                break
+
+    return f"{zone or 'N/A'} / {province or 'N/A'}", phone
+
+
+def parse_addresses(addresses):
+    """Parse a list of addresses at once; repeated addresses are parsed only once."""
+    return [parse_address(address) for address in addresses]
+
+
+if os.environ.get("ORDER_REPORTS_GAZETTEER"):
+    load_gazetteer(os.environ["ORDER_REPORTS_GAZETTEER"])
@@ -0,0 +1,198 @@
+"""Bill history for reporting: every processed bill, appended to an indexed SQLite table.
+
+The monthly reports stay the working documents; this keeps a copy of each bill row as it is
+written, so questions like "Lazada revenue by province for Q3" are one indexed query instead
+of opening a stack of workbooks. Rows are only ever appended; a bill written again (an updated
+bill file, or a backfill) adds a row, and queries read the latest row per (date, bill number).
+Reports written before this table existed are loaded with backfill_report.
+"""
+import os
+import sqlite3
+import time
+
+from .address import canonical_province
+from .bills import normalize_bill_number, transport_platform
+
+# Next to the bill store, kept separate so archiving the store never touches the history
+analytics_path = "bill_analytics.sqlite3"
+
+bill_columns = ("date", "month", "bill_number", "customer_name", "zone", "province", "platform", "box_count",
+                "total_value", "tax_value", "transport_service", "phone", "source", "recorded_at")
+
+_schema = """
+CREATE TABLE IF NOT EXISTS bills (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,
+    bill_number TEXT NOT NULL,
+    customer_name TEXT,
+    zone TEXT,
+    province TEXT,
+    platform TEXT,
+    box_count INTEGER,
+    total_value REAL,
+    tax_value REAL,
+    transport_service TEXT,
+    phone TEXT,
+    source TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bills_date ON bills (date, bill_number);
+CREATE INDEX IF NOT EXISTS bills_platform ON bills (platform, date);
+CREATE INDEX IF NOT EXISTS bills_province ON bills (province, date);
+CREATE VIEW IF NOT EXISTS latest_bills AS
+    SELECT * FROM bills WHERE id IN (SELECT MAX(id) FROM bills GROUP BY date, bill_number);
+"""
+
+# Query groupings: name -> SQL expression over latest_bills
+group_columns = {
+    "day": "date",
+    "month": "month",
+    "platform": "COALESCE(platform, 'Other')",
+    "province": "COALESCE(province, 'N/A')",
+}
+
+# PRAGMA user_version of the current layout; 1: provinces are stored by their canonical (Thai) name
+schema_version = 1
+
+# Opened on first use and shared for the rest of the session
+_analytics = None
+
+
+def bill_record(date, bill_number, data, source):
+    """Return the bills-table row for one bill; date is "YYYY-MM-DD", data as in extract_new_bills."""
+    zone = data.get('zone')
+    # One name per province, whether the bill spelled it in Thai, romanized or with a จ. prefix
+    province = canonical_province(zone.rsplit(" / ", 1)[-1]) if isinstance(zone, str) and " / " in zone else None
+    transport = data.get('transport_service')
+    return {
+        'date': date,
+        'month': date[:7],
+        'bill_number': normalize_bill_number(bill_number),
+        'customer_name': data.get('customer_name'),
+        'zone': zone,
+        'province': province,
+        'platform': transport_platform(transport) if isinstance(transport, str) else None,
+        'box_count': data.get('box_count'),
+        'total_value': data.get('total_value'),
+        'tax_value': data.get('tax_value'),
+        'transport_service': transport,
+        'phone': data.get('phone'),
+        'source': source,
+        'recorded_at': time.time(),
+    }
+
+
+class BillAnalytics:
+    """Append-only history of written bills with aggregate queries."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("ORDER_REPORTS_ANALYTICS") or analytics_path
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_schema)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < schema_version:
+            self._canonicalize_provinces()
+
+    def _canonicalize_provinces(self):
+        """Rewrite provinces recorded from the raw zone text to their canonical names."""
+        with self.conn:
+            rows = self.conn.execute("SELECT DISTINCT province FROM bills WHERE province IS NOT NULL").fetchall()
+            self.conn.executemany("UPDATE bills SET province = ? WHERE province = ?",
+                                  [(canonical_province(name), name) for name, in rows
+                                   if canonical_province(name) != name])
+            self.conn.execute(f"PRAGMA user_version = {schema_version}")
+
+    def close(self):
+        self.conn.close()
+
+    def append(self, records, skip_existing=False):
+        """Append bill_record rows; with skip_existing, bills already recorded for their date are left out.
+
+        Returns the number of rows added.
+        """
+        insert = (f"INSERT INTO bills ({', '.join(bill_columns)}) "
+                  f"SELECT {', '.join('?' * len(bill_columns))}")
+        if skip_existing:
+            insert += " WHERE NOT EXISTS (SELECT 1 FROM bills WHERE date = ? AND bill_number = ?)"
+        rows = [tuple(record[column] for column in bill_columns)
+                + ((record['date'], record['bill_number']) if skip_existing else ())
+                for record in records]
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(insert, rows)
+        return self.conn.total_changes - before
+
+    def record_day(self, date, bills, source="bill"):
+        """Append the bills written for one day; bills are the dicts of a run summary's 'bills' list."""
+        return self.append(bill_record(date, bill['bill_number'], bill, source) for bill in bills)
+
+    def query(self, group_by=("month",), start=None, end=None, platform=None, province=None):
+        """Return bill count, boxes, total and tax per group over the latest row of each bill.
+
+        group_by names keys of group_columns; start and end are inclusive "YYYY-MM-DD" dates.
+        province may be given in any spelling the gazetteer knows.
+        """
+        keys = [group_columns[name] for name in group_by]
+        where, params = [], []
+        if start:
+            where.append("date >= ?")
+            params.append(str(start))
+        if end:
+            where.append("date <= ?")
+            params.append(str(end))
+        if platform:
+            where.append("platform = ? COLLATE NOCASE")
+            params.append(platform)
+        if province:
+            where.append("province = ?")
+            params.append(canonical_province(province))
+
+        sql = (f"SELECT {', '.join(keys + ['COUNT(*)', 'SUM(box_count)', 'SUM(total_value)', 'SUM(tax_value)'])} "
+               "FROM latest_bills"
+               + (f" WHERE {' AND '.join(where)}" if where else "")
+               + (f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else ""))
+        results = []
+        for row in self.conn.execute(sql, params):
+            bills, boxes, total, tax = row[len(keys):]
+            result = dict(zip(group_by, row[:len(keys)]))
+            result.update(bills=bills, boxes=boxes or 0, total=round(total or 0, 2), tax=round(tax or 0, 2))
+            results.append(result)
+        return results
+
+    def backfill_report(self, report_path, year, month):
+        """Append the bill rows of an existing monthly report, skipping bills already recorded.
+
+        Returns the number of rows added.
+        """
+        from openpyxl import load_workbook
+
+        source = f"report:{os.path.basename(report_path)}"
+        records = []
+        wb = load_workbook(report_path, read_only=True, data_only=True)
+        try:
+            for day in range(1, 32):
+                if str(day) not in wb.sheetnames:
+                    continue
+                date = f"{year}-{month:02d}-{day:02d}"
+                # Data rows start at row 5 and end at the first empty bill number (column C)
+                for row in wb[str(day)].iter_rows(min_row=5, max_col=13, values_only=True):
+                    row = row + (None,) * (13 - len(row))
+                    bill_number = row[2]
+                    if bill_number is None:
+                        break
+                    data = {'customer_name': row[3], 'zone': row[4], 'box_count': row[5], 'total_value': row[6],
+                            'tax_value': row[7], 'transport_service': row[10], 'phone': row[12]}
+                    records.append(bill_record(date, bill_number, data, source))
+        finally:
+            wb.close()
+        return self.append(records, skip_existing=True)
+
+
+def get_analytics():
+    """Return the session's bill history, opening it on first use."""
+    global _analytics
+    if _analytics is None:
+        _analytics = BillAnalytics()
+    return _analytics
@@ -0,0 +1,235 @@
+"""Fast bill reader: reads the CashSale_th cells straight from the xlsx zip
+instead of building openpyxl's full cell model for every bill.
+
+Only the standard library is needed to read plain bills; openpyxl's date helpers
+are imported when a bill actually holds a date-formatted number.
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+DOC_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_CELL_TAG = f"{{{SHEET_MAIN_NS}}}c"
+_ROW_TAG = f"{{{SHEET_MAIN_NS}}}row"
+_VALUE_TAG = f"{{{SHEET_MAIN_NS}}}v"
+_TEXT_TAG = f"{{{SHEET_MAIN_NS}}}t"
+_RUN_TAG = f"{{{SHEET_MAIN_NS}}}r"
+_INLINE_TAG = f"{{{SHEET_MAIN_NS}}}is"
+_STRING_TAG = f"{{{SHEET_MAIN_NS}}}si"
+
+# Bill header cells read alongside the column F/J scan
+bill_header_cells = {"D9": "customer_name", "D11": "address", "D12": "transport"}
+
+
+def _column_index(column):
+    """Return the 1-based index of a column letter such as "F" or "AB"."""
+    index = 0
+    for char in column:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def _column_letter(index):
+    """Return the column letter for a 1-based column index."""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _text_content(node):
+    """Return the plain text of a shared or inline string, like openpyxl's Text.content."""
+    parts = []
+    plain = node.find(_TEXT_TAG)
+    if plain is not None and plain.text is not None:
+        parts.append(plain.text)
+    for run in node.findall(_RUN_TAG):
+        text = run.find(_TEXT_TAG)
+        if text is not None and text.text is not None:
+            parts.append(text.text)
+    return "".join(parts)
+
+
+def _resolve_part(base, target):
+    """Resolve a relationship target relative to the part that refers to it."""
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _read_workbook_parts(archive, sheet_name):
+    """Return the sheet, shared strings and styles part names plus the 1904 date flag."""
+    workbook_part = "xl/workbook.xml"
+    for rel in ET.fromstring(archive.read("_rels/.rels")).iter(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            workbook_part = _resolve_part("", rel.get("Target"))
+
+    workbook = ET.fromstring(archive.read(workbook_part))
+    sheet_rid = None
+    for sheet in workbook.iter(f"{{{SHEET_MAIN_NS}}}sheet"):
+        if sheet.get("name") == sheet_name:
+            sheet_rid = sheet.get(f"{{{DOC_REL_NS}}}id")
+    if sheet_rid is None:
+        raise KeyError(f"Worksheet {sheet_name} does not exist.")
+
+    properties = workbook.find(f"{{{SHEET_MAIN_NS}}}workbookPr")
+    date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+
+    rels_part = posixpath.join(posixpath.dirname(workbook_part), "_rels",
+                               posixpath.basename(workbook_part) + ".rels")
+    parts = {"sheet": None, "strings": None, "styles": None}
+    for rel in ET.fromstring(archive.read(rels_part)).iter(f"{{{PKG_REL_NS}}}Relationship"):
+        target = _resolve_part(workbook_part, rel.get("Target"))
+        rel_type = rel.get("Type", "")
+        if rel.get("Id") == sheet_rid:
+            parts["sheet"] = target
+        elif rel_type.endswith("/sharedStrings"):
+            parts["strings"] = target
+        elif rel_type.endswith("/styles"):
+            parts["styles"] = target
+    if parts["sheet"] is None:
+        raise KeyError(f"Worksheet {sheet_name} has no part in {workbook_part}.")
+    return parts, date1904
+
+
+def _read_shared_strings(archive, part, wanted):
+    """Read shared strings up to the highest wanted index, then stop."""
+    strings = {}
+    if not wanted:
+        return strings
+    last = max(wanted)
+    index = 0
+    with archive.open(part) as source:
+        for _, node in ET.iterparse(source):
+            if node.tag != _STRING_TAG:
+                continue
+            if index in wanted:
+                strings[index] = _text_content(node).replace("x005F_", "")
+            node.clear()
+            if index == last:
+                break
+            index += 1
+    return strings
+
+
+def _read_date_styles(archive, part):
+    """Return the style ids that format numbers as dates and as time deltas."""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+
+    styles = ET.fromstring(archive.read(part))
+    custom = {int(fmt.get("numFmtId")): fmt.get("formatCode")
+              for fmt in styles.iter(f"{{{SHEET_MAIN_NS}}}numFmt")}
+    date_styles, timedelta_styles = set(), set()
+    cell_xfs = styles.find(f"{{{SHEET_MAIN_NS}}}cellXfs")
+    for idx, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+        fmt_id = int(xf.get("numFmtId", 0))
+        fmt = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+        if fmt and is_date_format(fmt):
+            date_styles.add(idx)
+        if fmt and is_timedelta_format(fmt):
+            timedelta_styles.add(idx)
+    return date_styles, timedelta_styles
+
+
+def read_bill_cells(bill_path, sheet_name="CashSale_th"):
+    """Read the bill header cells and the total/tax pair straight from the xlsx zip.
+
+    Values match what load_workbook(data_only=True) and find_total_and_tax_values return.
+    """
+    with zipfile.ZipFile(bill_path) as archive:
+        parts, date1904 = _read_workbook_parts(archive, sheet_name)
+
+        # One pass over the sheet XML, keeping only the raw D header cells and columns F and J
+        header, f_cells, j_cells = {}, [], {}
+        row_number, col_number = 0, 0
+        with archive.open(parts["sheet"]) as source:
+            for event, node in ET.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if node.tag == _ROW_TAG:
+                        row_number = int(node.get("r", row_number + 1))
+                        col_number = 0
+                    continue
+                if node.tag == _ROW_TAG:
+                    node.clear()
+                    continue
+                if node.tag != _CELL_TAG:
+                    continue
+
+                coordinate = node.get("r")
+                if coordinate:
+                    column = coordinate.rstrip("0123456789")
+                    col_number = _column_index(column)
+                else:
+                    col_number += 1
+                    column = _column_letter(col_number)
+                    coordinate = f"{column}{row_number}"
+
+                if column in ("D", "F", "J"):
+                    data_type = node.get("t", "n")
+                    style_id = int(node.get("s", 0))
+                    if data_type == "inlineStr":
+                        inline = node.find(_INLINE_TAG)
+                        raw = (data_type, _text_content(inline) if inline is not None else None, style_id)
+                    else:
+                        raw = (data_type, node.findtext(_VALUE_TAG) or None, style_id)
+
+                    if column == "D" and coordinate in bill_header_cells:
+                        header[bill_header_cells[coordinate]] = raw
+                    elif column == "F" and raw[0] in ("n", "b") and raw[1] is not None:
+                        f_cells.append((row_number, raw))
+                    elif column == "J":
+                        j_cells[row_number] = raw
+                node.clear()
+
+        raws = list(header.values()) + [raw for _, raw in f_cells] + list(j_cells.values())
+        wanted = {int(raw[1]) for raw in raws if raw[0] == "s" and raw[1] is not None}
+        strings = _read_shared_strings(archive, parts["strings"], wanted) if parts["strings"] else {}
+
+        date_styles, timedelta_styles = set(), set()
+        if parts["styles"] and any(raw[0] == "n" and raw[2] for raw in raws):
+            date_styles, timedelta_styles = _read_date_styles(archive, parts["styles"])
+
+    def convert(raw):
+        data_type, value, style_id = raw if raw else (None, None, 0)
+        if value is None:
+            return None
+        if data_type == "n":
+            value = float(value) if "." in value or "E" in value or "e" in value else int(value)
+            if style_id in date_styles:
+                from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+                epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+                try:
+                    return from_excel(value, epoch, timedelta=style_id in timedelta_styles)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if data_type == "s":
+            return strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            from openpyxl.utils.datetime import from_ISO8601
+
+            return from_ISO8601(value)
+        return value
+
+    # The total is the last numeric value in column F; the tax sits five rows below it in column J
+    total, tax = None, None
+    for row, raw in reversed(f_cells):
+        value = convert(raw)
+        if isinstance(value, (int, float)):
+            total, tax = value, convert(j_cells.get(row + 5))
+            break
+
+    return {
+        'customer_name': convert(header.get("customer_name")),
+        'address': convert(header.get("address")),
+        'transport': convert(header.get("transport")),
+        'total_value': total,
+        'tax_value': tax,
+    }
@@ -0,0 +1,207 @@
+"""Daily bill parsing and extraction: file names, addresses and the CashSale_th template."""
+import os
+import re
+import time
+
+from .address import parse_address
+from .bill_reader import ET, read_bill_cells
+from .metrics import record_bill
+
+# Bill extraction runs in a process pool; None uses one worker per CPU core.
+# Below the threshold the pool start-up costs more than it saves.
+extraction_workers = None
+parallel_threshold = 8
+# Bills read ahead of the consumer at most; bounds memory when writing is slower than reading
+read_ahead = 64
+
+valid_platforms = ["shopee", "lazada"]
+_PLATFORM = re.compile(r"/\s*(\w+)$", re.IGNORECASE)
+
+
+def parse_address_zone_province_and_phone(address):
+    """Extract and return the sub-district (zone), province, and phone number from an address."""
+    return parse_address(address)
+
+
+def extract_transport_service(transport_info):
+    """Extract and return the transport service from the provided text."""
+    return transport_info.strip() if transport_info else "N/A"
+
+
+def transport_platform(transport):
+    """Return "Shopee" or "Lazada" when the transport text ends in "/ <platform>", else None."""
+    match = _PLATFORM.search(transport)
+    if match and match.group(1).lower() in valid_platforms:
+        return match.group(1).lower().capitalize()
+    return None
+
+
+def normalize_bill_number(value):
+    """Return the form of a bill number used to match report rows with bill files.
+
+    parse_bill_filename drops a leading zero and Excel may turn a typed bill number into
+    an int or float, so leading zeros are ignored and whole floats count as ints.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip().lstrip("0")
+
+
+def parse_bill_filename(filename):
+    """Parse the bill filename to extract a 6-character alphanumeric bill number and a non-zero box count."""
+    if not filename.endswith('.xlsx'):
+        return None, None
+
+    # Extract the first 6 alphanumeric characters
+    match = re.match(r"([A-Za-z0-9]{6})([0-9]{2})\.xlsx", filename)
+    if match:
+        bill_number, box_count = match.groups()
+        if int(box_count) != 0:  # Ensure the box count is non-zero
+            # Remove leading 0 if the bill number starts with it
+            if bill_number.startswith('0'):
+                bill_number = bill_number[1:]
+            return bill_number, int(box_count)
+
+    return None, None
+
+
+def find_total_and_tax_values(sheet):
+    """Identify and return total and tax values from the daily bill template."""
+    total, tax, last_row = None, None, None
+    for row in range(1, sheet.max_row + 1):
+        if isinstance(sheet[f"F{row}"].value, (int, float)):
+            total, last_row = sheet[f"F{row}"].value, row
+
+    if last_row:
+        tax = sheet[f"J{last_row + 5}"].value
+    return total, tax
+
+
+def read_bill_fields(bill_path):
+    """Read a daily bill's raw fields (customer, address, transport, total, tax) as plain data."""
+    try:
+        return read_bill_cells(bill_path)
+    except (KeyError, ValueError, ET.ParseError):
+        # Templates the fast reader cannot follow go through the full openpyxl load
+        return load_bill_fields(bill_path)
+
+
+def read_bill_fields_timed(bill_path):
+    """Return read_bill_fields(bill_path) and the seconds it took."""
+    started = time.perf_counter()
+    fields = read_bill_fields(bill_path)
+    return fields, time.perf_counter() - started
+
+
+def load_bill_fields(bill_path):
+    """Load a daily bill with openpyxl and return its raw fields as plain data."""
+    from openpyxl import load_workbook
+
+    bill_wb = load_workbook(bill_path, data_only=True)
+    try:
+        bill_sheet = bill_wb["CashSale_th"]
+        total, tax = find_total_and_tax_values(bill_sheet)
+        return {
+            'customer_name': bill_sheet["D9"].value,
+            'address': bill_sheet["D11"].value,
+            'transport': bill_sheet["D12"].value,
+            'total_value': total,
+            'tax_value': tax,
+        }
+    finally:
+        bill_wb.close()
+
+
+def bill_data(fields, parsed_address):
+    """Combine raw bill fields with their parsed (zone, phone) into the extracted bill data."""
+    zone_province, phone = parsed_address
+    return {
+        'customer_name': fields['customer_name'],
+        'zone': zone_province,
+        'total_value': fields['total_value'],
+        'tax_value': fields['tax_value'],
+        'transport_service': extract_transport_service(fields['transport']),
+        'phone': phone
+    }
+
+
+def extract_bill_data(bill_path):
+    """Read a daily bill and return its extracted fields as plain data."""
+    fields = read_bill_fields(bill_path)
+    return bill_data(fields, parse_address(fields['address']))
+
+
+class Cancelled(Exception):
+    """Raised when a run is cancelled between bills; nothing has been written."""
+
+
+def read_bill_batch(bill_paths):
+    """Return read_bill_fields_timed for each path; one process-pool task reads a batch of bills."""
+    return [read_bill_fields_timed(path) for path in bill_paths]
+
+
+def iter_bill_fields(bill_paths, workers=None, progress=None, cancel=None):
+    """Yield the raw fields of each bill in order, reading in a process pool when there are enough bills.
+
+    The pool reads at most read_ahead bills ahead of the consumer, so memory stays flat however
+    long the list is. progress(done, total, path) is called as each bill is yielded; setting the
+    cancel event raises Cancelled.
+    """
+    bill_paths = list(bill_paths)
+    workers = workers if workers is not None else extraction_workers
+    done = 0
+
+    def collect(path, timed_fields):
+        nonlocal done
+        bill_fields, seconds = timed_fields
+        record_bill(path, seconds)
+        done += 1
+        if progress:
+            progress(done, len(bill_paths), path)
+        return bill_fields
+
+    if workers == 1 or len(bill_paths) < parallel_threshold:
+        for path in bill_paths:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            yield collect(path, read_bill_fields_timed(path))
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers or os.cpu_count() or 1, len(bill_paths))
+    chunksize = max(1, min(len(bill_paths) // (workers * 4), read_ahead // (workers * 2)))
+    batches = iter([bill_paths[i:i + chunksize] for i in range(0, len(bill_paths), chunksize)])
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # Batches in flight, oldest first; topped up as the consumer takes results
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(read_bill_batch, batch)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            batch, future = pending.popleft()
+            for path, timed_fields in zip(batch, future.result()):
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled()
+                yield collect(path, timed_fields)
+            # Topped up once the batch is consumed, so no more than read_ahead bills are ever waiting
+            next_batch = next(batches, None)
+            if next_batch is not None:
+                pending.append((next_batch, pool.submit(read_bill_batch, next_batch)))
+    except BaseException:
+        # Cancelled, failed, or the consumer stopped early: drop the reads still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def extract_bills(bill_paths, workers=None, progress=None, cancel=None):
+    """Extract data from each bill, reading the files in a process pool when there are enough bills.
+
+    progress and cancel are as for iter_bill_fields. Results are returned in the same order as bill_paths.
+    """
+    return [bill_data(fields, parse_address(fields['address']))
+            for fields in iter_bill_fields(bill_paths, workers, progress, cancel)]
@@ -0,0 +1,407 @@
+"""Command-line entry point: python -m orderreports <command> ...
+
+Only argparse and the standard library are imported up front, so --help and
+runs with nothing to do start quickly; openpyxl is loaded when a report is written.
+"""
+import argparse
+import calendar
+import json
+import sys
+from datetime import date, datetime
+
+
+def _log_to(stream):
+    def log(message, tag="normal"):
+        print(message if tag == "normal" else f"[{tag}] {message}", file=stream, flush=True)
+    return log
+
+
+def _year(value):
+    from .paths import convert_year
+
+    try:
+        return convert_year(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("Please enter a valid 4-digit year.")
+
+
+def _date(value):
+    """Parse YYYY-MM-DD, accepting a Buddhist Era year."""
+    try:
+        year, month, day = value.split("-")
+        return date(_year(year), int(month), int(day))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def _emit(args, result):
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, default=str, indent=2))
+
+
+def cmd_process(args):
+    from .processing import process_bills_for_day
+
+    result = process_bills_for_day(args.year, args.month, args.day, root=args.root,
+                                   workers=args.workers, log=args.log)
+    _emit(args, result)
+    return _finish_queued(args, [result])
+
+
+def _finish_queued(args, results):
+    """Exit status of a processing run; with --wait, first retry any days queued behind an open report."""
+    statuses = {result['status'] for result in results}
+    if "queued" in statuses and args.wait:
+        from .jobs import wait_for_jobs
+
+        return 0 if wait_for_jobs(workers=args.workers, log=args.log) else 1
+    return 1 if statuses & {"report_locked", "queued"} else 0
+
+
+def _range_dates(args):
+    """Return the (start, end) dates of a --start/--end or --year/--month command."""
+    if args.start is None:
+        if args.month is None:
+            raise SystemExit(f"{args.command}: give --start/--end or --month")
+        year = args.year or date.today().year
+        args.start = date(year, args.month, 1)
+        args.end = date(year, args.month, calendar.monthrange(year, args.month)[1])
+    end = args.end or args.start
+    if end < args.start:
+        raise SystemExit(f"{args.command}: --end is before --start")
+    return args.start, end
+
+
+def cmd_range(args):
+    from .processing import process_bills_for_range
+
+    start, end = _range_dates(args)
+    results = process_bills_for_range(start, end, root=args.root, workers=args.workers, log=args.log)
+    _emit(args, results)
+    return _finish_queued(args, results)
+
+
+def cmd_rebuild(args):
+    from .rebuild import rebuild_range
+
+    start, end = _range_dates(args)
+    results = rebuild_range(start, end, root=args.root, workers=args.workers, log=args.log)
+    _emit(args, results)
+    return 1 if {result['status'] for result in results} & {"report_locked", "no_report"} else 0
+
+
+def cmd_verify(args):
+    from .rebuild import verify_range
+
+    start, end = _range_dates(args)
+    results = verify_range(start, end, root=args.root, workers=args.workers, log=args.log)
+    _emit(args, results)
+    return 1 if {result['status'] for result in results} & {"differences", "no_report"} else 0
+
+
+def _month(value):
+    """Parse YYYY-MM, accepting a Buddhist Era year."""
+    try:
+        year, month = value.split("-")
+        year, month = _year(year), int(month)
+        if not 1 <= month <= 12:
+            raise ValueError
+        return year, month
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month {value!r}, expected YYYY-MM")
+
+
+def cmd_store(args):
+    from .store import get_store
+
+    store = get_store()
+    result = {'store': store.path}
+    if args.import_json:
+        result['imported'] = store.import_json(args.import_json)
+    if args.archive:
+        year, month = args.archive
+        archive_path = args.to or f"bill_store_{year}_{month:02d}.sqlite3"
+        result['archived'] = store.archive_month(year, month, archive_path)
+        result['archive'] = archive_path
+    if args.evict:
+        result['evicted'] = store.archive_month(*args.evict)
+    result['months'] = store.stats()
+
+    if args.json:
+        _emit(args, result)
+    else:
+        for key in ("imported", "archived", "evicted"):
+            if key in result:
+                args.log(f"{key}: {result[key]} rows")
+        for month in result['months']:
+            label = f"{month['year']}-{month['month']:02d}" if month['year'] else "undated"
+            args.log(f"{label}: {month['files']} files, {month['processed']} processed")
+    return 0
+
+
+def cmd_query(args):
+    from .analytics import get_analytics
+
+    start, end = args.start, args.end
+    if args.quarter:
+        year, quarter = args.quarter
+        start = date(year, quarter * 3 - 2, 1)
+        end = date(year, quarter * 3, calendar.monthrange(year, quarter * 3)[1])
+    rows = get_analytics().query(args.by or ["month"], start=start, end=end, platform=args.platform,
+                                 province=args.province)
+    if args.json:
+        _emit(args, rows)
+    else:
+        for row in rows:
+            keys = " ".join(str(row[name]) for name in args.by or ["month"])
+            args.log(f"{keys}: {row['bills']} bills, {row['boxes']} boxes, total {row['total']:,.2f}, "
+                     f"tax {row['tax']:,.2f}")
+    return 0
+
+
+def cmd_backfill(args):
+    import os
+
+    from .analytics import get_analytics
+    from .paths import get_path
+
+    analytics = get_analytics()
+    months = [(args.year, month) for month in (args.months or range(1, 13))]
+    result = {}
+    for year, month in months:
+        report_path = get_path(year, month, root=args.root)
+        if not os.path.exists(report_path):
+            continue
+        result[f"{year}-{month:02d}"] = added = analytics.backfill_report(report_path, year, month)
+        args.log(f"{year}-{month:02d}: {added} bills added from {report_path}")
+    _emit(args, result)
+    return 0
+
+
+def _quarter(value):
+    """Parse YYYY-Qn, accepting a Buddhist Era year."""
+    try:
+        year, quarter = value.upper().split("-Q")
+        if not 1 <= int(quarter) <= 4:
+            raise ValueError
+        return _year(year), int(quarter)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid quarter {value!r}, expected YYYY-Qn")
+
+
+def cmd_jobs(args):
+    from .jobs import queued_jobs, run_due_jobs, wait_for_jobs
+
+    if args.wait:
+        wait_for_jobs(workers=args.workers, log=args.log)
+    elif args.run:
+        run_due_jobs(workers=args.workers, log=args.log, force=True)
+    jobs = queued_jobs()
+    if args.json:
+        _emit(args, jobs)
+    else:
+        if not jobs:
+            args.log("No queued report writes.")
+        for job in jobs:
+            next_try = datetime.fromtimestamp(job['next_attempt']).strftime("%H:%M:%S")
+            args.log(f"{job['year']}-{job['month']:02d}-{job['day']:02d} -> {job['report']}: "
+                     f"{job['attempts']} attempt(s), {job['last_error']}, next try at {next_try}")
+    return 1 if jobs and (args.run or args.wait) else 0
+
+
+def cmd_serve(args):
+    from .service import serve
+
+    serve(host=args.host, port=args.port, root=args.root, workers=args.workers, log=args.log)
+    return 0
+
+
+def cmd_submit(args):
+    from .service import ServiceError, submit_range
+
+    start = args.start or date.today()
+    end = args.end or start
+    if end < start:
+        raise SystemExit("submit: --end is before --start")
+    try:
+        results = submit_range(start, end, url=args.service, root=args.root, workers=args.workers, log=args.log,
+                               loopback=args.loopback)
+    except ServiceError as e:
+        args.log(str(e), "error")
+        return 1
+    _emit(args, results)
+    return 1 if any(result['status'] in ("report_locked", "queued") for result in results) else 0
+
+
+def cmd_watch(args):
+    from .watch import watch_bills
+
+    summary = watch_bills(root=args.root, workers=args.workers, log=args.log, poll_interval=args.interval,
+                          settle=args.settle, max_batches=args.max_batches)
+    _emit(args, summary)
+    return 0
+
+
+def build_parser():
+    today = date.today()
+    parser = argparse.ArgumentParser(prog="orderreports",
+                                     description="Process daily bills into the monthly order reports.")
+    parser.add_argument("--root", help="OrderReports root folder (default: $ORDER_REPORTS_ROOT or the desktop tree)")
+    parser.add_argument("--json", action="store_true", help="print the run summary as JSON on stdout")
+    parser.add_argument("--metrics", metavar="PATH", help="append run timings to this JSON-lines file "
+                                                          "(default: $ORDER_REPORTS_METRICS or metrics.jsonl in the root)")
+    parser.add_argument("--no-metrics", action="store_true", help="do not collect or write run timings")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="write cProfile stats to PREFIX.prof and top allocations to PREFIX-memory.txt")
+    parser.add_argument("--store", help="bill store database (default: ./bill_store.sqlite3 or $ORDER_REPORTS_STORE)")
+    parser.add_argument("--analytics", help="bill history database "
+                                            "(default: ./bill_analytics.sqlite3 or $ORDER_REPORTS_ANALYTICS)")
+    parser.add_argument("--gazetteer", metavar="CSV",
+                        help="sub-district names for address parsing (columns province_th, province_en, "
+                             "subdistrict_th, subdistrict_en; default: $ORDER_REPORTS_GAZETTEER). Only the 77 "
+                             "provinces are built in; without this file zones come only from ต./ตำบล/แขวง markers")
+    parser.add_argument("--full-restyle", action="store_true",
+                        help="restyle and renumber every row of the day sheet, not only the rows written")
+    parser.add_argument("--totals", choices=("indirect", "direct", "values"),
+                        help="how running totals reach the previous day: INDIRECT formulas (default), "
+                             "direct cell references, or values computed on write")
+    parser.add_argument("--full-save", action="store_true",
+                        help="load and save the whole report with openpyxl instead of only the day sheets written")
+    parser.add_argument("--trust-snapshots", action="store_true",
+                        help="reuse the listing of a day folder whose mtime is unchanged instead of listing it "
+                             "again; bill files overwritten in place are missed")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="process the bills of one day")
+    process.add_argument("--year", type=_year, default=today.year, help="year, CE or BE (default: this year)")
+    process.add_argument("--month", type=int, choices=range(1, 13), default=today.month, metavar="1-12")
+    process.add_argument("--day", type=int, choices=range(1, 32), default=today.day, metavar="1-31")
+    process.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+    process.add_argument("--wait", action="store_true",
+                         help="if the report is open, keep retrying until the queued days are written")
+    process.set_defaults(handler=cmd_process)
+
+    batch = commands.add_parser("range", help="process a date range or a whole month with one report load and save")
+    batch.add_argument("--start", type=_date, help="first day, YYYY-MM-DD")
+    batch.add_argument("--end", type=_date, help="last day, YYYY-MM-DD (default: --start)")
+    batch.add_argument("--year", type=_year, help="year for --month (default: this year)")
+    batch.add_argument("--month", type=int, choices=range(1, 13), metavar="1-12", help="process the whole month")
+    batch.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+    batch.add_argument("--wait", action="store_true",
+                       help="if the report is open, keep retrying until the queued days are written")
+    batch.set_defaults(handler=cmd_range)
+
+    for name, handler, text in (
+            ("rebuild", cmd_rebuild, "regenerate day sheets from their bill files, replacing the rows written"),
+            ("verify", cmd_verify, "compare day sheets with their bill files without writing; exit 1 on differences")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--start", type=_date, help="first day, YYYY-MM-DD")
+        command.add_argument("--end", type=_date, help="last day, YYYY-MM-DD (default: --start)")
+        command.add_argument("--year", type=_year, help="year for --month (default: this year)")
+        command.add_argument("--month", type=int, choices=range(1, 13), metavar="1-12", help="the whole month")
+        command.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+        command.set_defaults(handler=handler)
+
+    watch = commands.add_parser("watch", help="process today's bills as they arrive, until Ctrl+C")
+    watch.add_argument("--interval", type=float, default=2.0, help="seconds between folder scans (default: 2)")
+    watch.add_argument("--settle", type=float, default=3.0,
+                       help="seconds a file's size and mtime must stay unchanged before it is read (default: 3)")
+    watch.add_argument("--max-batches", type=int, help="stop after this many batches")
+    watch.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+    watch.set_defaults(handler=cmd_watch)
+
+    serve = commands.add_parser("serve", help="run the single-writer service that writes bills sent by 'submit'")
+    serve.add_argument("--host", default="127.0.0.1",
+                       help="address to listen on (default: loopback only; 0.0.0.0 for the station LAN)")
+    serve.add_argument("--port", type=int, default=8765, help="port (default: 8765)")
+    serve.add_argument("--workers", type=int, help="processes for bills no station submitted (default: one per core)")
+    serve.set_defaults(handler=cmd_serve)
+
+    submit = commands.add_parser("submit", help="extract bills here and send them to the writer service")
+    submit.add_argument("--start", type=_date, help="first day, YYYY-MM-DD (default: today)")
+    submit.add_argument("--end", type=_date, help="last day, YYYY-MM-DD (default: --start)")
+    submit.add_argument("--service", metavar="URL",
+                        help="writer service (default: $ORDER_REPORTS_SERVICE or http://127.0.0.1:8765)")
+    submit.add_argument("--loopback", action="store_true",
+                        help="run the writer service in this process too, on a free loopback port")
+    submit.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+    submit.set_defaults(handler=cmd_submit)
+
+    jobs = commands.add_parser("jobs", help="list report writes queued while a report was open, or retry them")
+    jobs.add_argument("--run", action="store_true", help="retry every queued report now")
+    jobs.add_argument("--wait", action="store_true", help="retry with backoff until the queue is empty")
+    jobs.add_argument("--workers", type=int, help="bill extraction processes (default: one per core)")
+    jobs.set_defaults(handler=cmd_jobs)
+
+    store = commands.add_parser("store", help="inspect, archive or evict the processed-bill store")
+    store.add_argument("--import-json", metavar="PATH", help="import an old processed_files_record.json")
+    store.add_argument("--archive", type=_month, metavar="YYYY-MM", help="move a month's rows to an archive file")
+    store.add_argument("--to", metavar="PATH", help="archive file (default: bill_store_YYYY_MM.sqlite3)")
+    store.add_argument("--evict", type=_month, metavar="YYYY-MM", help="delete a month's rows")
+    store.set_defaults(handler=cmd_store)
+
+    query = commands.add_parser("query", help="totals from the processed-bill history")
+    query.add_argument("--by", action="append", choices=("day", "month", "platform", "province"),
+                       help="group by this column; repeat for several (default: month)")
+    query.add_argument("--start", type=_date, help="first day, YYYY-MM-DD")
+    query.add_argument("--end", type=_date, help="last day, YYYY-MM-DD")
+    query.add_argument("--quarter", type=_quarter, metavar="YYYY-Qn", help="instead of --start/--end")
+    query.add_argument("--platform", help="only this platform (Shopee, Lazada)")
+    query.add_argument("--province", help="only this province, in Thai or romanized (Bangkok, จ.เชียงราย)")
+    query.set_defaults(handler=cmd_query)
+
+    backfill = commands.add_parser("backfill", help="load the bill rows of existing monthly reports into the history")
+    backfill.add_argument("--year", type=_year, default=today.year, help="year, CE or BE (default: this year)")
+    backfill.add_argument("--month", dest="months", type=int, action="append", choices=range(1, 13), metavar="1-12",
+                          help="only this month; repeat for several (default: every month with a report)")
+    backfill.set_defaults(handler=cmd_backfill)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.store:
+        from . import store
+
+        store.bill_store_path = args.store
+    if args.analytics:
+        from . import analytics
+
+        analytics.analytics_path = args.analytics
+    if args.metrics or args.no_metrics:
+        from . import metrics
+
+        metrics.metrics_file = args.metrics
+        metrics.enabled = not args.no_metrics
+    if args.gazetteer:
+        from .address import load_gazetteer
+
+        try:
+            load_gazetteer(args.gazetteer)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"--gazetteer: {e}")
+    if args.full_restyle:
+        from . import processing
+
+        processing.incremental_formatting = False
+    if args.totals:
+        from . import processing
+
+        processing.running_totals = args.totals
+    if args.full_save:
+        from . import processing
+
+        processing.partial_writes = False
+    if args.trust_snapshots:
+        from . import scan
+
+        scan.trust_snapshots = True
+    # Keep stdout clean for the JSON summary
+    args.log = _log_to(sys.stderr if args.json else sys.stdout)
+    if args.profile:
+        from .metrics import profile
+
+        with profile(args.profile):
+            return args.handler(args)
+    return args.handler(args)
@@ -0,0 +1,287 @@
+"""Tk front-end for bill processing: a thin window over orderreports.processing."""
+import calendar
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+
+from datetime import datetime
+from tkinter import ttk, messagebox
+
+from . import paths
+from .jobs import queued_jobs, run_due_jobs
+from .processing import process_bills_for_day
+
+# Thai month names mapped to month numbers
+months_in_thai = ["มกราคม", "กุมภาพันธ์", "มีนาคม", "เมษายน", "พฤษภาคม", "มิถุนายน", "กรกฎาคม", "สิงหาคม", "กันยายน",
+                  "ตุลาคม", "พฤศจิกายน", "ธันวาคม"]
+month_map = {month: index + 1 for index, month in enumerate(months_in_thai)}
+
+# Widgets, created by main()
+root = output_text = year_entry = month_var = day_var = day_dropdown = process_button = None
+cancel_button = progress_bar = progress_label = jobs_label = None
+
+# The worker thread never touches widgets: it posts events here and the Tk loop drains them.
+events = queue.Queue()
+drain_interval_ms = 50
+cancel_event = None
+run_started = None
+busy = False
+# How often the queue of report writes waiting for an open report is shown and retried
+jobs_interval_ms = 5000
+
+
+def convert_year(year):
+    try:
+        return paths.convert_year(year)
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Please enter a valid 4-digit year.")
+        return None
+
+
+def update_days():
+    try:
+        year = convert_year(year_entry.get())
+        month = month_map[month_var.get()]
+        if not year or not month:
+            return
+        # Get the last day of the selected month and year
+        last_day = calendar.monthrange(year, month)[1]
+        day_dropdown['values'] = list(range(1, last_day + 1))
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
+
+
+# Function to display output with badge-style updates
+def write_output(message, tag="normal"):
+    output_text.config(state="normal")
+    output_text.insert(tk.END, message + "\n", tag)
+    output_text.see(tk.END)  # Auto-scroll to the bottom
+    output_text.config(state="disabled")
+
+
+def post_output(message, tag="normal"):
+    """Log callback for the worker thread: queue the message for write_output."""
+    events.put(("log", message, tag))
+
+
+def post_progress(done, total, path):
+    events.put(("progress", done, total, os.path.basename(path)))
+
+
+def show_progress(done, total, name):
+    progress_bar.config(maximum=max(total, 1), value=done)
+    elapsed = time.perf_counter() - run_started
+    remaining = elapsed / done * (total - done) if done else 0
+    progress_label.config(text=f"{done}/{total} {name} - about {remaining:.0f}s left")
+
+
+def finish_run(result):
+    global busy
+    busy = False
+    process_button.config(text="Process Bills", state="normal")
+    cancel_button.config(state="disabled")
+    elapsed = time.perf_counter() - run_started
+    status = result['status'] if result else "failed"
+    progress_label.config(text=f"{status.replace('_', ' ')} in {elapsed:.1f}s")
+
+
+def drain_events():
+    """Apply queued worker events to the widgets, then reschedule on the Tk loop."""
+    try:
+        while True:
+            kind, *args = events.get_nowait()
+            if kind == "log":
+                write_output(*args)
+            elif kind == "progress":
+                show_progress(*args)
+            elif kind == "done":
+                finish_run(*args)
+            elif kind == "jobs_done":
+                finish_jobs()
+    except queue.Empty:
+        pass
+    root.after(drain_interval_ms, drain_events)
+
+
+def check_jobs():
+    """Show the queued report writes and, when one is due and nothing is running, retry it."""
+    if not busy:
+        jobs = queued_jobs()
+        if jobs:
+            next_try = datetime.fromtimestamp(min(job['next_attempt'] for job in jobs))
+            days = ", ".join(f"{job['day']}/{job['month']}" for job in jobs)
+            jobs_label.config(text=f"Queued until the report is closed: {days} - next try {next_try:%H:%M:%S}")
+            if next_try <= datetime.now():
+                start_jobs()
+        else:
+            jobs_label.config(text="")
+    root.after(jobs_interval_ms, check_jobs)
+
+
+def start_jobs():
+    global busy
+    busy = True
+    process_button.config(state="disabled")
+    threading.Thread(target=jobs_thread, daemon=True).start()
+
+
+def jobs_thread():
+    try:
+        run_due_jobs(log=post_output)
+    except Exception as e:
+        post_output(f"Error: {e}", "error")
+    finally:
+        events.put(("jobs_done",))
+
+
+def finish_jobs():
+    global busy
+    busy = False
+    process_button.config(state="normal")
+
+
+# Main function to process bills for the given date
+def process_bills():
+    global cancel_event, run_started, busy
+    year = convert_year(year_entry.get())
+    month = month_map[month_var.get()]
+    day = day_var.get()
+    if year and month and day:
+        busy = True
+        process_button.config(text="Processing...", state="disabled")
+        cancel_button.config(state="normal")
+        progress_bar.config(value=0)
+        progress_label.config(text="Scanning bills...")
+        write_output(f"Starting processing for {year}-{month:02d}-{int(day):02d}...")
+        cancel_event = threading.Event()
+        run_started = time.perf_counter()
+        # Start processing in a separate thread to avoid freezing the GUI
+        threading.Thread(target=process_bills_thread, args=(year, month, int(day), cancel_event),
+                         daemon=True).start()
+    else:
+        messagebox.showerror("Incomplete Data", "Please fill in all fields correctly.")
+
+
+def cancel_processing():
+    if cancel_event is not None:
+        cancel_event.set()
+        cancel_button.config(state="disabled")
+        write_output("Cancelling after the current bill...", "warning")
+
+
+# Thread target for processing bills; reports back only through the event queue
+def process_bills_thread(year, month, day, cancel):
+    result = None
+    try:
+        result = process_bills_for_day(year, month, day, log=post_output, progress=post_progress, cancel=cancel)
+    except Exception as e:
+        post_output(f"Error: {e}", "error")
+    finally:
+        events.put(("done", result))
+
+
+def main():
+    """Build the window and run the Tk main loop."""
+    global root, output_text, year_entry, month_var, day_var, day_dropdown, process_button
+    global cancel_button, progress_bar, progress_label, jobs_label
+
+    # Get current date to set as default
+    current_date = datetime.now()
+    current_year = current_date.year
+    current_month = current_date.month
+    current_day = current_date.day
+
+    # Create main window
+    root = tk.Tk()
+    root.title("Order Reports - Bill Processing")
+    # root.geometry("940x400")
+
+    # Get the screen width and height
+    screen_width = root.winfo_screenwidth()
+    screen_height = root.winfo_screenheight()
+
+    # Set the window dimensions (800x400) and position it in the center of the screen
+    window_width = 940
+    window_height = 400
+
+    # Calculate the x and y position for centering the window
+    x_position = (screen_width // 2) - (window_width // 2)
+    y_position = (screen_height // 2) - (window_height // 2)
+
+    # Set the window geometry with the calculated position and size
+    root.geometry(f"{window_width}x{window_height}+{x_position}+{y_position}")
+
+    # Configure main layout
+    main_pane = tk.PanedWindow(root, orient=tk.HORIZONTAL, sashrelief=tk.RAISED)
+    main_pane.pack(fill=tk.BOTH, expand=True)
+
+    # Left panel for inputs and Process button
+    input_frame = tk.Frame(main_pane)
+    input_frame.grid_columnconfigure(1, weight=1)
+    main_pane.add(input_frame, width=250)
+
+    # Right panel for output display
+    output_frame = tk.Frame(main_pane)
+    output_text = tk.Text(output_frame, wrap="word", state="disabled", height=20)
+    output_scroll = tk.Scrollbar(output_frame, command=output_text.yview)
+    output_text.config(yscrollcommand=output_scroll.set)
+    output_text.pack(side="left", fill="both", expand=True)
+    output_scroll.pack(side="right", fill="y")
+    main_pane.add(output_frame, width=250)
+
+    # Year Entry
+    tk.Label(input_frame, text="Year:").grid(row=0, column=0, pady=10, padx=10, sticky="w")
+    year_entry = tk.Entry(input_frame, width=20)
+    year_entry.insert(0, str(current_year))  # Set current year as default
+    year_entry.grid(row=0, column=1, padx=5, pady=5)
+
+    # Month Dropdown
+    tk.Label(input_frame, text="Month:").grid(row=1, column=0, pady=10, padx=10, sticky="w")
+    month_var = tk.StringVar(value=months_in_thai[current_month - 1])  # Set current month as default
+    month_dropdown = ttk.Combobox(input_frame, textvariable=month_var, values=months_in_thai, state="readonly", width=17)
+    month_dropdown.grid(row=1, column=1, padx=5, pady=5)
+    month_dropdown.bind("<<ComboboxSelected>>", lambda e: update_days())  # Update days when month changes
+
+    # Day Dropdown
+    tk.Label(input_frame, text="Day:").grid(row=2, column=0, pady=10, padx=10, sticky="w")
+    day_var = tk.StringVar(value=str(current_day))  # Set current day as default
+    day_dropdown = ttk.Combobox(input_frame, textvariable=day_var, values=[str(i) for i in range(1, 32)], state="readonly",
+                                width=17)
+    day_dropdown.grid(row=2, column=1, padx=5, pady=5)
+    update_days()  # Initialize days dropdown based on current month and year
+
+    # Adjust column configuration for consistent input field alignment
+    input_frame.grid_columnconfigure(1, weight=1, uniform="input")
+
+    # Process Button
+    process_button = tk.Button(input_frame, text="Process Bills", command=process_bills)
+    process_button.grid(row=3, column=0, pady=20)
+    cancel_button = tk.Button(input_frame, text="Cancel", command=cancel_processing, state="disabled")
+    cancel_button.grid(row=3, column=1, pady=20)
+
+    # Progress of the current run, fed by drain_events
+    progress_bar = ttk.Progressbar(input_frame, mode="determinate")
+    progress_bar.grid(row=4, column=0, columnspan=2, padx=10, sticky="ew")
+    progress_label = tk.Label(input_frame, text="")
+    progress_label.grid(row=5, column=0, columnspan=2, padx=10, sticky="w")
+    # Days waiting for the monthly report to be closed, refreshed by check_jobs
+    jobs_label = tk.Label(input_frame, text="", fg="#b45309", wraplength=230, justify="left")
+    jobs_label.grid(row=6, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+
+    # Text tag configurations for badge-style output
+    output_text.tag_configure("badge", background="#6b7280", foreground="white")
+    output_text.tag_configure("italic", background="#6b7280", foreground="white", font=("Arial", 10, "italic"))
+    output_text.tag_configure("success", background="#22c55e", foreground="white")
+    output_text.tag_configure("warning", background="#facc15", foreground="black")
+    output_text.tag_configure("error", background="#e11d48", foreground="white")
+
+    # Run the GUI
+    root.after(drain_interval_ms, drain_events)
+    root.after(0, check_jobs)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
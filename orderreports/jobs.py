@@ -0,0 +1,69 @@
+"""Queued report writes: days whose bills are extracted but whose monthly report was open.
+
+When the report is open in Excel, processing caches the extracted bills in the store and
+queues the days there (see processing.queue_locked_reports), so the queue survives a restart.
+run_due_jobs retries each report whose backoff has run out and writes all of its queued
+days in one load and save; the GUI calls it on a timer, the CLI through `jobs --wait`.
+"""
+import time
+
+from itertools import groupby
+
+from . import metrics, processing
+from .processing import print_output, process_report_days
+from .store import get_store
+
+
+def queued_jobs():
+    """Return the queued report writes (dicts of store.job_fields), by date."""
+    return get_store().report_jobs()
+
+
+def _by_report(jobs):
+    key = lambda job: (job['report'], job['year'], job['month'], job['root'])
+    return [(report, list(group)) for report, group in groupby(sorted(jobs, key=key), key=key)]
+
+
+def run_due_jobs(workers=None, log=print_output, force=False):
+    """Retry the queued days of every report whose next attempt is due (any report when force).
+
+    Returns the summaries of the days retried.
+    """
+    now = time.time()
+    results = []
+    for (report, year, month, root), jobs in _by_report(queued_jobs()):
+        if not force and min(job['next_attempt'] for job in jobs) > now:
+            continue
+        days = [job['day'] for job in jobs]
+        log(f"Retrying {len(days)} queued day(s) for {report}...", "badge")
+        try:
+            with metrics.run(f"queued {year}-{month:02d}", log, root=root):
+                results.extend(process_report_days(year, month, days, root=root, workers=workers, log=log))
+        except Exception as e:
+            log(f"Queued write to {report} failed: {e}", "error")
+            get_store().queue_report_days(report, year, month, days, root, str(e), processing.retry_delay,
+                                          processing.max_retry_delay)
+    return results
+
+
+def wait_for_jobs(workers=None, log=print_output, stop=None):
+    """Retry queued writes as their backoff runs out until the queue is empty, stop is set or Ctrl+C.
+
+    Returns True when every queued day was written.
+    """
+    try:
+        while True:
+            run_due_jobs(workers, log)
+            jobs = queued_jobs()
+            if not jobs:
+                return True
+            wait = max(0.0, min(job['next_attempt'] for job in jobs) - time.time())
+            log(f"{len(jobs)} day(s) still queued, next try in {wait:.0f}s.", "badge")
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+    except KeyboardInterrupt:
+        log("Stopped waiting; the queued days stay queued.", "badge")
+        return False
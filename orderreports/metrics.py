@@ -0,0 +1,201 @@
+"""Per-stage and per-bill timing for processing runs.
+
+A run is opened with `with run(label, log):`; inside it, `stage(name)` blocks,
+`@timed(name)` functions and `timed_iter(name, ...)` generator stages add their wall
+time to the run, and extraction records each bill's read time. When the outermost run
+ends, a summary badge goes to the log and a JSON line is appended to metrics_path().
+Outside a run (or with enabled = False) the hooks only do a context-variable lookup.
+"""
+import contextvars
+import json
+import os
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from .paths import get_root
+
+enabled = True
+# JSON-lines file the run summaries are appended to; None means metrics_name in the OrderReports root
+metrics_file = os.environ.get("ORDER_REPORTS_METRICS") or None
+metrics_name = "metrics.jsonl"
+
+_current = contextvars.ContextVar("orderreports_run", default=None)
+
+
+class RunMetrics:
+    """Stage and bill timings collected during one processing run."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.total = None
+        self.stages = {}
+        self.bills = []
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_bill(self, path, seconds):
+        self.bills.append((path, seconds))
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def bill_summary(self):
+        if not self.bills:
+            return {'count': 0}
+        times = [seconds for _, seconds in self.bills]
+        slowest = max(self.bills, key=lambda bill: bill[1])
+        return {'count': len(times), 'mean_ms': round(sum(times) / len(times) * 1000, 2),
+                'max_ms': round(slowest[1] * 1000, 2), 'slowest': slowest[0]}
+
+    def summary(self):
+        """Return the run as a JSON-serializable dict."""
+        return {
+            'timestamp': datetime.now().isoformat(timespec="seconds"),
+            'run': self.label,
+            'total_s': round(self.total if self.total is not None else time.perf_counter() - self.started, 4),
+            'stages': {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            'bills': self.bill_summary(),
+        }
+
+    def badge(self):
+        """Return a one-line summary for the GUI log."""
+        parts = [f"{stage} {seconds:.2f}s" for stage, seconds in self.stages.items()]
+        bills = self.bill_summary()
+        if bills['count']:
+            parts.append(f"{bills['count']} bills avg {bills['mean_ms']:.0f}ms max {bills['max_ms']:.0f}ms")
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        return f"Timings: {' | '.join(parts)} | total {total:.2f}s"
+
+
+def current():
+    """Return the active run's metrics, or None outside a run."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """Add the wall time of the block to the active run under `name`."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _current.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.add(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def timed_iter(name, iterable):
+    """Yield from iterable, adding the time spent producing each item to the active run under `name`."""
+    metrics = _current.get()
+    if metrics is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                metrics.add(name, time.perf_counter() - started)
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+
+
+def record_bill(path, seconds):
+    """Record one bill's read time in the active run."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_bill(path, seconds)
+
+
+def metrics_path(root=None):
+    """Return the metrics file: metrics_file if set, else metrics_name in the OrderReports root."""
+    return metrics_file or os.path.join(get_root(root), metrics_name)
+
+
+def append_metrics(summary, path=None, root=None):
+    """Append one run summary as a JSON line to the metrics file."""
+    with open(path or metrics_path(root), "a", encoding="utf-8") as file:
+        file.write(json.dumps(summary, ensure_ascii=False, default=str) + "\n")
+
+
+@contextmanager
+def run(label, log=None, root=None):
+    """Collect timings for a processing run; nested runs join the outer one.
+
+    root is the OrderReports root the run works on; the summary is written there unless metrics_file is set.
+    """
+    if not enabled or _current.get() is not None:
+        yield _current.get()
+        return
+
+    metrics = RunMetrics(label)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+        metrics.finish()
+        if "extract" in metrics.stages:
+            if log:
+                log(metrics.badge(), "badge")
+            try:
+                append_metrics(metrics.summary(), root=root)
+            except OSError as e:
+                if log:
+                    log(f"Could not write metrics: {e}", "warning")
+
+
+@contextmanager
+def profile(prefix):
+    """Capture cProfile stats (prefix.prof) and the top allocations (prefix-memory.txt) for a block.
+
+    Only the calling process is profiled; run with one extraction worker to include bill parsing.
+    """
+    import cProfile
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(f"{prefix}.prof")
+        with open(f"{prefix}-memory.txt", "w", encoding="utf-8") as file:
+            file.write(f"peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+            for statistic in snapshot.statistics("lineno")[:25]:
+                file.write(f"{statistic}\n")
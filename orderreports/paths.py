@@ -0,0 +1,51 @@
+import os
+import re
+
+# Root of the OrderReports tree; ORDER_REPORTS_ROOT overrides it for other machines and scripts
+DEFAULT_ROOT = r"C:\Users\Admin\Desktop\OrderReports"
+
+
+class UnsupportedReport(Exception):
+    """The report uses a feature the partial writer (report_zip) does not handle; use the full openpyxl path."""
+
+
+def get_root(root=None):
+    """Return the OrderReports root folder, from the argument, the environment or the default."""
+    return root or os.environ.get("ORDER_REPORTS_ROOT") or DEFAULT_ROOT
+
+
+def is_file_accessible(path, mode="r"):
+    """Check if a file is accessible by trying to open it."""
+    try:
+        with open(path, mode):
+            return True
+    except IOError:
+        return False
+
+
+def get_path(year, month, day=None, report=True, root=None):
+    """Return the path of the Monthly Report or Daily Bills folder for a given year, month, and day."""
+    month_str = f"{month:02d}"
+    base_path = os.path.join(get_root(root), f"Year_{year}", f"Month_{month_str}")
+
+    if report:
+        return os.path.join(base_path, f"Monthly_Report_{month}_{year}.xlsx")
+    elif day:
+        return os.path.join(base_path, "Daily_Bills", f"Day_{day}")
+    return os.path.join(base_path, "Daily_Bills")
+
+
+def convert_year(year):
+    """Return a 4-digit CE year, converting Buddhist Era years; raises ValueError on bad input."""
+    year = int(year)
+    if year > 2500:  # Assuming it's a BE year if over 2500
+        year -= 543
+    if len(str(year)) > 4:
+        raise ValueError("Year cannot have more than 4 digits.")
+    return year
+
+
+def parse_bill_folder(path):
+    """Return (year, month, day) for a path inside Year_YYYY/Month_MM/Daily_Bills/Day_N, or None."""
+    match = re.search(r"Year_(\d{4})[\\/]Month_(\d{2})[\\/]Daily_Bills[\\/]Day_(\d{1,2})(?:[\\/]|$)", path)
+    return tuple(int(part) for part in match.groups()) if match else None
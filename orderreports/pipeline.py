@@ -0,0 +1,130 @@
+"""Bill processing as generator stages: scan -> select latest -> extract -> parse (-> write).
+
+Each stage takes and yields BillRecord objects, one at a time, so a day's bills flow through
+to the report writer (processing.write_records) without the whole day being held as nested
+dicts. The only buffers are the selection, which has to see every file name of the folder
+before it knows the latest file per bill, and the read-ahead of the extraction pool
+(bills.read_ahead). Stages can be used on their own or chained:
+
+    selected = select_latest(scan_records(folder, entries), store.processed_keys(folder))
+    records = parse_records(extract_records(selected, store), store, (year, month, day))
+"""
+import os
+
+from dataclasses import dataclass
+
+from .address import parse_address
+from .bills import bill_data, iter_bill_fields, parse_bill_filename, read_ahead
+
+# Extracted columns of a bill, in report order (box_count comes from the file name)
+data_fields = ("customer_name", "zone", "total_value", "tax_value", "transport_service", "phone")
+
+
+@dataclass(slots=True)
+class BillRecord:
+    """One bill file on its way through the stages; the columns are filled in by extract and parse."""
+    bill_number: str
+    box_count: int
+    path: str
+    mod_time: float
+    size: int
+    fields: dict = None  # Raw fields read from the file, until parse_records parses them
+    customer_name: str = None
+    zone: str = None
+    total_value: float = None
+    tax_value: float = None
+    transport_service: str = None
+    phone: str = None
+
+    @property
+    def key(self):
+        """The (path, mtime, size) store key of the file."""
+        return self.path, self.mod_time, self.size
+
+    @property
+    def complete(self):
+        """True when the bill has both a total and a tax value, so it can be written."""
+        return self.total_value is not None and self.tax_value is not None
+
+    def set_data(self, data):
+        for field in data_fields:
+            setattr(self, field, data[field])
+
+    def data(self):
+        """Return the bill's columns as the dict the report writer and the store use."""
+        return {'customer_name': self.customer_name, 'zone': self.zone, 'box_count': self.box_count,
+                'total_value': self.total_value, 'tax_value': self.tax_value,
+                'transport_service': self.transport_service, 'phone': self.phone}
+
+
+def scan_records(folder, entries):
+    """Stage 1: yield a BillRecord for each bill file of a folder listing (see scan.scan_folders)."""
+    for filename, mod_time, size in entries:
+        bill_number, box_count = parse_bill_filename(filename)
+        if bill_number:
+            yield BillRecord(bill_number, box_count, os.path.join(folder, filename), mod_time, size)
+
+
+def select_latest(records, processed, include=None):
+    """Stage 2: return the most recent unprocessed record for each bill number, in listing order.
+
+    processed is the set of store keys already written; when include is given, only records
+    whose path is in it are considered. This stage has to see the whole listing, so it returns a list.
+    """
+    latest = {}
+    for record in records:
+        if include is not None and record.path not in include:
+            continue
+        # Skip files that have already been written to the report
+        if record.key in processed:
+            continue
+        # Keep the latest file for each unique bill number
+        if record.bill_number not in latest or record.mod_time > latest[record.bill_number].mod_time:
+            latest[record.bill_number] = record
+    return list(latest.values())
+
+
+def extract_records(records, store, workers=None, progress=None, cancel=None):
+    """Stage 3: fill records from the store's extraction cache and read the raw fields of the rest.
+
+    Records come out in the order they went in; progress and cancel are as for bills.iter_bill_fields.
+    """
+    records = list(records)
+    cached = store.extracted_keys([record.key for record in records])
+    fields = iter_bill_fields([record.path for record in records if record.key not in cached],
+                              workers, progress, cancel)
+    try:
+        for record in records:
+            if record.key in cached:
+                record.set_data(store.cached_bills([record.key])[record.key])
+            else:
+                record.fields = next(fields)
+            yield record
+    finally:
+        fields.close()
+
+
+def parse_records(records, store, date):
+    """Stage 4: parse the raw fields of freshly read records into the bill's columns.
+
+    The results are saved to the store, dated with the (year, month, day) tuple, every
+    read_ahead bills and when the stage ends, so a cancelled run keeps what it has read.
+    """
+    fresh = []
+    try:
+        for record in records:
+            if record.fields is not None:
+                record.set_data(bill_data(record.fields, parse_address(record.fields['address'])))
+                record.fields = None
+                fresh.append(record)
+                if len(fresh) >= read_ahead:
+                    _record_extracted(store, fresh, date)
+                    fresh = []
+            yield record
+    finally:
+        _record_extracted(store, fresh, date)
+
+
+def _record_extracted(store, records, date):
+    if records:
+        store.record_extracted([(record.key, date, record.bill_number, record.data()) for record in records])
@@ -0,0 +1,345 @@
+"""Processing API: scan a day's bill folder, extract new bills and write them into the monthly report.
+
+Nothing here touches the GUI. Progress goes through a `log(message, tag)` callback,
+which prints by default, and each run returns a plain summary dict.
+"""
+import time
+
+from datetime import timedelta
+from itertools import chain, groupby, islice
+
+from . import metrics
+from .bills import Cancelled
+from .paths import UnsupportedReport, get_path, is_file_accessible
+from .pipeline import BillRecord, extract_records, parse_records, scan_records, select_latest
+from .scan import scan_folders
+from .store import get_store
+
+# Style and number only the rows written in a run; False restyles every row of the day sheet.
+incremental_formatting = True
+# How the Shopee/Lazada running totals reach the previous day: "indirect" (the original
+# volatile INDIRECT formulas), "direct" (plain cell references) or "values" (computed here).
+running_totals = "indirect"
+# Load and save only the day sheets being written (see report_zip); False always uses openpyxl's full path.
+partial_writes = True
+# When the report is open in Excel, queue the days' writes and retry them (see jobs) instead of giving up.
+# Retries wait retry_delay seconds, doubling each time up to max_retry_delay.
+queue_locked_reports = True
+retry_delay = 15.0
+max_retry_delay = 300.0
+# Bills written to a day sheet per batch while the rest of the day is still being read
+write_batch = 500
+
+
+def print_output(message, tag="normal"):
+    """Default log callback: print the message, prefixed by its tag when it is not plain output."""
+    print(message if tag == "normal" else f"[{tag}] {message}", flush=True)
+
+
+def bill_file_key(bill_info):
+    """Return the (path, mtime, size) store key of a selected bill file."""
+    return bill_info['path'], bill_info['mod_time'], bill_info['size']
+
+
+@metrics.timed("scan")
+def find_new_bill_files(daily_folder, store, include=None, entries=None):
+    """Return the most recent unprocessed file for each bill number in a day folder.
+
+    When include is given, only bill files whose path is in it are considered.
+    entries is the folder's listing from scan_folders, when it was already scanned.
+    """
+    if entries is None:
+        entries = scan_folders([daily_folder], store)[daily_folder]
+    selected = select_latest(scan_records(daily_folder, entries), store.processed_keys(daily_folder), include)
+    return {record.bill_number: {'path': record.path, 'mod_time': record.mod_time, 'size': record.size,
+                                 'box_count': record.box_count}
+            for record in selected}
+
+
+@metrics.timed("extract")
+def extract_new_bills(bill_files, store, date, workers=None, progress=None, cancel=None):
+    """Extract the selected bill files and return bill rows keyed by bill number.
+
+    Bills whose (path, mtime, size) is already in the store are not parsed again.
+    New extraction results are saved to the store, dated with the (year, month, day) tuple.
+    progress and cancel are passed on to extract_records.
+    """
+    records = [BillRecord(bill_number, info['box_count'], info['path'], info['mod_time'], info['size'])
+               for bill_number, info in bill_files.items()]
+    return {record.bill_number: record.data()
+            for record in parse_records(extract_records(records, store, workers, progress, cancel), store, date)
+            if record.complete}
+
+
+def day_records(daily_folder, entries, store, date, include=None, workers=None, progress=None, cancel=None):
+    """Return the day's selected BillRecords and a generator of them extracted and parsed, in the same order.
+
+    entries is the folder's listing from scan_folders; the other arguments are as for
+    find_new_bill_files and extract_new_bills.
+    """
+    with metrics.stage("scan"):
+        selected = select_latest(scan_records(daily_folder, entries), store.processed_keys(daily_folder), include)
+    records = parse_records(extract_records(selected, store, workers, progress, cancel), store, date)
+    return selected, metrics.timed_iter("extract", records)
+
+
+def _batches(records, size):
+    """Yield lists of up to size records; a size of None gives one list."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_records(sheet, day, records, incremental=None, totals=None, log=None):
+    """Write BillRecords to the day sheet as they arrive, write_batch at a time.
+
+    In full restyle mode the day is written as one batch, so the sheet is restyled once.
+    Returns the summed row counts of write_day_sheet and the list of records written.
+    """
+    incremental = incremental_formatting if incremental is None else incremental
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    written = []
+    for batch in _batches(records, write_batch if incremental else None):
+        rows = write_day_sheet(sheet, day, {record.bill_number: record.data() for record in batch},
+                               incremental, totals, log)
+        for name in counts:
+            counts[name] += rows[name]
+        written.extend(batch)
+    return counts, written
+
+
+def write_day_sheet(sheet, day, bills_data, incremental=None, totals=None, log=None):
+    """Write the day's bills to its sheet and refresh styling, indices and summary formulas.
+
+    Bills already in the sheet (matched by bill number) are updated in place or, when
+    unchanged, skipped; the rest are appended as one block. In incremental mode only the
+    rows written now are styled and numbered; otherwise the whole sheet is. log(message, tag)
+    reports a sheet without its summary label rows. Returns the row counts.
+    """
+    from .report import (build_bill_index, insert_bill_rows, normalize_bill_number, process_new_rows,
+                         process_sheet, read_layout, update_row_indices, update_summary_formulas,
+                         upsert_bill_rows)
+
+    incremental = incremental_formatting if incremental is None else incremental
+    totals = totals or running_totals
+    with metrics.stage("insert"):
+        layout = read_layout(sheet)
+        index = build_bill_index(sheet, last_row=layout.last_row)
+        new_bills, updated, unchanged = upsert_bill_rows(sheet, bills_data, index)
+        if new_bills or updated:
+            first_new = layout.last_row + 1 if sheet["C5"].value else 5
+            insert_bill_rows(sheet, first_new, new_bills, index, layout)
+    if new_bills or updated:
+        if incremental:
+            rows = [(first_new, layout.last_row)] if new_bills else []
+            rows += [(index[normalize_bill_number(b)],) * 2 for b in updated]
+            with metrics.stage("process_sheet"):
+                process_new_rows(sheet, day, layout, rows, totals, log)
+            with metrics.stage("formulas"):
+                update_row_indices(sheet, last_row=layout.last_row, from_row=first_new if new_bills else None)
+                update_summary_formulas(sheet, last_data_row=layout.last_row)
+        else:
+            with metrics.stage("process_sheet"):
+                process_sheet(sheet, day, totals, log)
+            with metrics.stage("formulas"):
+                update_row_indices(sheet)
+                update_summary_formulas(sheet)
+    return {'inserted': len(new_bills), 'updated': len(updated), 'unchanged': len(unchanged)}
+
+
+def process_bills_for_day(year, month, day, root=None, workers=None, log=print_output, progress=None, cancel=None):
+    """Main function to process daily bills and update the monthly report.
+
+    progress(done, total, path) is called after each bill file is read; setting the cancel event
+    (a threading.Event) stops the run before anything is saved.
+    Returns a summary dict with the run status, the report path and the bills written.
+    """
+    with metrics.run(f"day {year}-{month:02d}-{day:02d}", log, root=root):
+        return process_report_days(year, month, [day], root=root, workers=workers, log=log,
+                                   progress=progress, cancel=cancel)[0]
+
+
+def group_days_by_report(start, end):
+    """Split the dates from start to end (inclusive) into (year, month, [days]) per monthly report."""
+    dates = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    return [(year, month, [d.day for d in group])
+            for (year, month), group in groupby(dates, key=lambda d: (d.year, d.month))]
+
+
+def process_report_days(year, month, days, root=None, workers=None, log=print_output, include=None,
+                        progress=None, cancel=None, partial=None, queue=None, listings=None):
+    """Process several days of one month, loading and saving the monthly report only once.
+
+    include optionally restricts the bill files considered (see find_new_bill_files).
+    listings ({folder: entries}, as from scan_folders) stands in for scanning those day folders.
+    progress and cancel are as for process_bills_for_day; a cancelled run saves nothing.
+    partial overrides partial_writes and queue overrides queue_locked_reports; days queued
+    earlier for the same report are written in the same save. Returns one summary dict per
+    requested day, in order.
+    """
+    partial = partial_writes if partial is None else partial
+    queue = queue_locked_reports if queue is None else queue
+    requested = set(days)
+    if queue and include is None:
+        days = sorted(requested | get_store().queued_days(get_path(year, month, root=root)))
+    try:
+        results = _process_report_days(year, month, days, root, workers, log, include, progress, cancel, partial,
+                                       queue, listings)
+    except UnsupportedReport as e:
+        # Nothing was saved; the bills are cached in the store, so the second pass only redoes the writing
+        log(f"Partial save not possible ({e}), using the whole workbook instead.", "badge")
+        results = _process_report_days(year, month, days, root, workers, log, include, progress, cancel, False,
+                                       queue, listings)
+    return [result for day, result in zip(days, results) if day in requested]
+
+
+def report_sheets(days, totals, report_path=None):
+    """Return the day sheets a partial load needs, or None when the whole workbook is needed.
+
+    With report_path, a next day still holding direct references to one of the days (written
+    earlier in "direct" mode) is loaded too, so write_platform_summary can repoint them.
+    """
+    if totals == "values":
+        return None  # Month-to-date values are computed from every day sheet
+    names = {str(day) for day in days}
+    if totals == "direct":
+        # The previous day's total rows are read and the next day's references repointed
+        names |= {str(day + offset) for day in days for offset in (-1, 1)}
+    elif report_path is not None:
+        from .report_zip import sheets_referring_to
+
+        names |= sheets_referring_to(report_path, {str(day + 1): str(day) for day in days
+                                                   if str(day + 1) not in names})
+    return names
+
+
+def _process_report_days(year, month, days, root, workers, log, include, progress, cancel, partial, queue,
+                         listings=None):
+    report_path = get_path(year, month, root=root)
+    results = [{'date': f"{year}-{month:02d}-{day:02d}", 'report': report_path, 'status': None, 'bills': []}
+               for day in days]
+    store = get_store()
+    book1_wb = None
+    changed = False
+    locked = None  # Checked once, when the first bills are ready to be written
+    updated, written_keys, waiting = [], [], []
+    folders = [get_path(year, month, day, report=False, root=root) for day in days]
+    listings = dict(listings or {})
+    with metrics.stage("scan"):
+        listings.update(scan_folders([folder for folder in folders if folder not in listings], store))
+    try:
+        for day, daily_folder, result in zip(days, folders, results):
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            started = time.perf_counter()
+            selected, records = day_records(daily_folder, listings[daily_folder], store, (year, month, day),
+                                            include, workers, progress, cancel)
+            complete = (record for record in records if record.complete)
+            first = next(complete, None)
+            written = []
+            if first is None:
+                result['status'] = "no_new_bills"
+            else:
+                waiting.append(day)
+                if locked is None:
+                    locked = not is_file_accessible(report_path, mode="r+")
+                if locked:
+                    # Still read the rest, so the bills are cached in the store for the retry
+                    for _ in complete:
+                        pass
+                else:
+                    if book1_wb is None:
+                        # openpyxl is only imported once there is something to write
+                        from .report_zip import open_report
+
+                        log(f"Loading workbook {report_path}...", "badge")
+                        sheets = report_sheets(days, running_totals, report_path) if partial else None
+                        with metrics.stage("load"):
+                            book1_wb = open_report(report_path, sheets, partial=sheets is not None)
+                    result['rows'], written = write_records(book1_wb[str(day)], day, chain([first], complete),
+                                                              log=log)
+                    changed = changed or bool(result['rows']['inserted'] or result['rows']['updated'])
+                    result['bills'] = [dict(bill_number=record.bill_number, **record.data()) for record in written]
+                    updated.append(result)
+                    written_keys.extend(record.key for record in selected)
+
+            result['seconds'] = round(time.perf_counter() - started, 3)
+            if not locked:
+                rows = result.get('rows', {})
+                log(f"{result['date']}: {len(written)} new bills, {rows.get('inserted', 0)} rows added, "
+                    f"{rows.get('updated', 0)} updated, {rows.get('unchanged', 0)} unchanged "
+                    f"({result['seconds']:.2f}s)", "badge")
+
+        if locked:
+            return _report_locked(results, days, report_path, year, month, waiting, root, log, queue)
+        if changed and cancel is not None and cancel.is_set():
+            raise Cancelled()
+        if changed and running_totals == "values":
+            from .report import write_month_totals
+
+            # Once per report: every day from the first one written on depends on it
+            with metrics.stage("formulas"):
+                write_month_totals(book1_wb, min(waiting))
+        if changed:
+            started = time.perf_counter()
+            try:
+                with metrics.stage("save"):
+                    book1_wb.save(report_path)
+            except PermissionError:
+                # Opened in Excel between the check and the save
+                return _report_locked(results, days, report_path, year, month, waiting, root, log, queue)
+            log(f"Data updated in {report_path} ({time.perf_counter() - started:.2f}s to save)", "success")
+        if written_keys:
+            from .analytics import get_analytics
+
+            store.mark_processed(written_keys)
+            analytics = get_analytics()
+            for result in updated:
+                result['status'] = "updated"
+                analytics.record_day(result['date'], result['bills'])
+        if queue and include is None:
+            store.dequeue_report_days(report_path, days)
+    except Cancelled:
+        log("Cancelled, the report was not changed.", "warning")
+        for result in results:
+            if result['status'] is None:
+                result['status'] = "cancelled"
+                result['bills'] = []
+                result.pop('rows', None)
+    finally:
+        if book1_wb is not None:
+            book1_wb.close()
+
+    return results
+
+
+def _report_locked(results, days, report_path, year, month, waiting, root, log, queue):
+    """Mark a run whose report is open: its days with bills are queued for a retry, or reported as locked."""
+    if queue:
+        get_store().queue_report_days(report_path, year, month, waiting, root, "report open", retry_delay,
+                                      max_retry_delay)
+        log(f"File {report_path} is currently open. {len(waiting)} day(s) queued, "
+            f"they will be written once it is closed.", "warning")
+    else:
+        log(f"File {report_path} is currently open. Please close it to continue.", "warning")
+    for day, result in zip(days, results):
+        result['status'] = ("queued" if queue else "report_locked") if day in waiting else "no_new_bills"
+        result['bills'] = []
+        result.pop('rows', None)
+    return results
+
+
+def process_bills_for_range(start, end, root=None, workers=None, log=print_output):
+    """Process every day from start to end (dates, inclusive), one load and save per monthly report.
+
+    Days that cross a month boundary are grouped by report file. Returns one summary dict per day.
+    """
+    results = []
+    with metrics.run(f"range {start}..{end}", log, root=root):
+        for year, month, days in group_days_by_report(start, end):
+            log(f"Processing {year}-{month:02d} days {days[0]}-{days[-1]}...", "badge")
+            results.extend(process_report_days(year, month, days, root=root, workers=workers, log=log))
+    return results
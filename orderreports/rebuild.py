@@ -0,0 +1,361 @@
+"""Rebuild and verify day sheets from the bill files in their Daily_Bills/Day_N folders.
+
+Normal processing only ever adds to a day sheet: it writes the bills it has not written
+before and updates rows whose bill file changed. A sheet that was edited by hand, or
+written by a run that was interrupted halfway, is not put right by that. rebuild_days
+regenerates each day's data rows from the latest file of every bill in the folder, in one
+pass per sheet and one load and save per report. verify_days compares a sheet with the
+same source bills and reports the differences without writing the report.
+
+Both use the store's extraction cache, so a month whose bills were processed before is
+rebuilt or verified without reading the bill files again.
+"""
+import math
+import os
+
+from itertools import chain
+
+from . import metrics, processing
+from .bills import normalize_bill_number, transport_platform
+from .paths import UnsupportedReport, get_path, is_file_accessible
+from .pipeline import extract_records, parse_records, scan_records, select_latest
+from .processing import group_days_by_report, print_output, report_sheets
+from .scan import scan_folders
+from .store import get_store
+
+# Number columns are compared to the cent; the rest must match exactly
+compared_columns = ("B", "C", "D", "E", "F", "G", "H", "K", "L", "M")
+
+
+def source_bills(year, month, days, root=None, workers=None):
+    """Return {day: (records, keys)} with the latest complete BillRecord of every bill in each day folder.
+
+    The processed state is ignored, so bills already written are included. keys are the
+    store keys of every bill file in the folder, older versions too.
+    """
+    store = get_store()
+    folders = [get_path(year, month, day, report=False, root=root) for day in days]
+    with metrics.stage("scan"):
+        listings = scan_folders(folders, store)
+    sources = {}
+    for day, folder in zip(days, folders):
+        with metrics.stage("scan"):
+            scanned = list(scan_records(folder, listings[folder]))
+            selected = select_latest(scanned, set())
+        records = parse_records(extract_records(selected, store, workers), store, (year, month, day))
+        records = [record for record in metrics.timed_iter("extract", records) if record.complete]
+        sources[day] = (records, [record.key for record in scanned])
+    return sources
+
+
+def rebuild_days(year, month, days, root=None, workers=None, log=print_output, partial=None):
+    """Regenerate the data rows, styling and summary of several day sheets of one monthly report.
+
+    Days whose folder has no bills are left as they are. Every bill file of a rebuilt day
+    is marked processed. Returns one summary dict per day, in order.
+    """
+    partial = processing.partial_writes if partial is None else partial
+    report_path = get_path(year, month, root=root)
+    results = [{'date': f"{year}-{month:02d}-{day:02d}", 'report': report_path, 'status': None, 'bills': []}
+               for day in days]
+    if not os.path.exists(report_path):
+        log(f"Report {report_path} does not exist.", "error")
+        for result in results:
+            result['status'] = "no_report"
+        return results
+    if not is_file_accessible(report_path, mode="r+"):
+        log(f"File {report_path} is currently open. Please close it to rebuild.", "warning")
+        for result in results:
+            result['status'] = "report_locked"
+        return results
+
+    sources = source_bills(year, month, days, root, workers)
+    for day, result in zip(days, results):
+        if not sources[day][0]:
+            log(f"{result['date']}: no bill files, sheet left as it is.", "warning")
+            result['status'] = "no_bills"
+    rebuilt = [(day, result) for day, result in zip(days, results) if sources[day][0]]
+    if not rebuilt:
+        return results
+
+    try:
+        try:
+            _write_sheets(report_path, rebuilt, sources, log, partial)
+        except UnsupportedReport as e:
+            log(f"Partial save not possible ({e}), using the whole workbook instead.", "badge")
+            _write_sheets(report_path, rebuilt, sources, log, False)
+    except PermissionError:
+        # Opened in Excel between the check and the save
+        log(f"File {report_path} is currently open. Please close it to rebuild.", "warning")
+        for day, result in rebuilt:
+            result['status'] = "report_locked"
+        return results
+
+    from .analytics import get_analytics
+
+    store = get_store()
+    store.mark_processed(list(chain.from_iterable(sources[day][1] for day, _ in rebuilt)))
+    analytics = get_analytics()
+    for day, result in rebuilt:
+        result['status'] = "rebuilt"
+        result['bills'] = [dict(bill_number=record.bill_number, **record.data()) for record in sources[day][0]]
+        analytics.record_day(result['date'], result['bills'], source="rebuild")
+    return results
+
+
+def _write_sheets(report_path, rebuilt, sources, log, partial):
+    from .report import (data_block_end, process_new_rows, read_layout, rebuild_bill_rows, update_row_indices,
+                         update_summary_formulas, write_month_totals)
+    from .report_zip import open_report
+
+    totals = processing.running_totals
+    log(f"Loading workbook {report_path}...", "badge")
+    sheets = report_sheets([day for day, _ in rebuilt], totals, report_path) if partial else None
+    with metrics.stage("load"):
+        wb = open_report(report_path, sheets, partial=sheets is not None)
+    try:
+        for day, result in rebuilt:
+            records = sources[day][0]
+            sheet = wb[str(day)]
+            with metrics.stage("insert"):
+                layout = read_layout(sheet)
+                before = max(data_block_end(sheet, layout) - layout.first_row + 1, 0)
+                last_row = rebuild_bill_rows(sheet, {record.bill_number: record.data() for record in records},
+                                             layout)
+            with metrics.stage("process_sheet"):
+                process_new_rows(sheet, day, layout, [(layout.first_row, last_row)], totals, log)
+            with metrics.stage("formulas"):
+                update_row_indices(sheet, last_row=last_row)
+                update_summary_formulas(sheet, last_data_row=last_row)
+            result['rows'] = {'before': before, 'after': len(records)}
+            log(f"{result['date']}: rebuilt {len(records)} rows (was {before}).", "badge")
+        if totals == "values":
+            with metrics.stage("formulas"):
+                write_month_totals(wb, min(day for day, _ in rebuilt))
+        with metrics.stage("save"):
+            wb.save(report_path)
+        log(f"Rebuilt {len(rebuilt)} day sheet(s) in {report_path}", "success")
+    finally:
+        wb.close()
+
+
+def _same(expected, actual):
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, abs_tol=0.005)
+    return expected == actual
+
+
+def compare_sheet(rows, records, day=None, totals="indirect", previous=None):
+    """Return the differences between a day sheet's data rows and its source bills, as strings.
+
+    rows are the sheet's rows from row 5 on, as value tuples from column A. When day is given,
+    the Shopee, Lazada and Grand total rows are checked too, for the totals mode (see
+    processing.running_totals); previous is then the rows of the day before, or None.
+    """
+    from .report import bill_row_values, summary_labels
+
+    rows = _padded(rows)
+    # The data block runs to the last bill number above the summary labels, empty rows included
+    labels = next((index for index, values in enumerate(rows) if values[4] in summary_labels), len(rows))
+    last_row = 4 + next((index + 1 for index in range(labels - 1, -1, -1) if rows[index][2] is not None), 0)
+    differences = []
+    if last_row == 4 and not records:
+        return differences  # An untouched template sheet, without summary formulas yet
+    found = {}
+    for row, values in enumerate(rows[:last_row - 4], start=5):
+        if values[2] is None:
+            differences.append(f"C{row}: empty row in the data block")
+            continue
+        cells = dict(zip("ABCDEFGHIJKLMN", values))
+        if cells["A"] != row - 4:
+            differences.append(f"A{row}: index {cells['A']!r}, expected {row - 4}")
+        key = normalize_bill_number(cells["C"])
+        if key in found:
+            differences.append(f"C{row}: bill {cells['C']} also in row {found[key][0]}")
+        else:
+            found[key] = row, cells
+
+    expected_g = expected_h = 0.0
+    for record in records:
+        expected = bill_row_values(record.bill_number, record.data())
+        expected["L"] = transport_platform(expected["K"]) if expected["K"] else None
+        expected_g += expected["G"] or 0
+        expected_h += expected["H"] or 0
+        row, cells = found.pop(normalize_bill_number(record.bill_number), (None, None))
+        if row is None:
+            differences.append(f"bill {record.bill_number}: missing")
+            continue
+        for col in compared_columns:
+            if not _same(expected[col], cells[col]):
+                differences.append(f"{col}{row}: {cells[col]!r}, expected {expected[col]!r} "
+                                   f"(bill {record.bill_number})")
+    for row, cells in sorted(found.values()):
+        differences.append(f"C{row}: bill {cells['C']} has no bill file")
+
+    for col, expected_sum in (("G", expected_g), ("H", expected_h)):
+        actual = sum(_number(values[ord(col) - ord("A")]) for values in rows[:last_row - 4])
+        if not _same(round(expected_sum, 2), round(actual, 2)):
+            differences.append(f"{col}: total {actual:.2f}, expected {expected_sum:.2f}")
+    differences.extend(_check_summary(rows, last_row))
+    if day is not None:
+        differences.extend(_check_platform_summary(rows, day, totals, previous))
+    return differences
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _padded(rows):
+    return [values + (None,) * (14 - len(values)) for values in rows]
+
+
+def _cell(rows, ref):
+    """Return the value of a cell like "I20" from rows read from row 5 on, None outside them."""
+    col, row = ref[0], int(ref[1:])
+    return rows[row - 5][ord(col) - ord("A")] if 5 <= row < 5 + len(rows) else None
+
+
+def _summary_layout(rows):
+    """Return (last data row, {label: row}) as read_layout finds them in a sheet, from its rows."""
+    from .report import summary_labels
+
+    last_row = 4 + next((index for index, values in enumerate(rows) if values[2] is None), len(rows))
+    label_rows = {}
+    for row in range(last_row + 1, 5 + len(rows)):
+        label = rows[row - 5][4]
+        if label in summary_labels and label not in label_rows:
+            label_rows[label] = row
+    return last_row, label_rows
+
+
+def _check_summary(rows, last_row):
+    """Check the SUM row and the references below the data block that update_summary_formulas writes."""
+    expected = {}
+    for col in "FGH":
+        expected[f"{col}{last_row + 1}"] = f"=SUM({col}5:{col}{last_row})"
+        expected[f"{col}{last_row + 2}"] = f"={col}{last_row + 1}"
+    expected[f"H{last_row + 4}"] = f"=H{last_row + 2}"
+    expected[f"A{last_row + 1}"] = f"=A{last_row}"
+    expected[f"A{last_row + 2}"] = f"=A{last_row + 1}"
+    differences = []
+    for cell, formula in expected.items():
+        col, row = cell[0], int(cell[1:])
+        actual = rows[row - 5][ord(col) - ord("A")] if row - 5 < len(rows) else None
+        if actual != formula:
+            differences.append(f"{cell}: {actual!r}, expected {formula}")
+    return differences
+
+
+def _check_platform_summary(rows, day, totals, previous):
+    """Check the Shopee, Lazada and Grand total rows that write_platform_summary writes.
+
+    The formulas are compared with summary_formulas; in "values" mode the numbers are
+    worked out from the data rows and the previous day's running totals, as write_month_totals does.
+    """
+    from .report import _number as sumif_number, sum_platform_rows, summary_formulas, summary_labels
+
+    last_row, label_rows = _summary_layout(rows)
+    missing = [label for label in summary_labels if label not in label_rows]
+    if missing:
+        return [f"summary rows not found: {', '.join(missing)}"]
+    # The SUMIFs run down to the last value in column H, into the SUM rows, as summary_end_row finds it
+    end = next((row - 1 for row in range(max(last_row, 5), 5 + len(rows)) if rows[row - 5][7] is None),
+               4 + len(rows))
+    previous = _padded(previous) if previous is not None else None
+    previous_rows = _summary_layout(previous)[1] if previous is not None else {}
+
+    if totals == "values":
+        sums = sum_platform_rows(values[5:12] for values in rows[:end - 4])
+        expected = {}
+        for label in ("Shopee", "Lazada"):
+            row = label_rows[label]
+            expected[f"F{row}"], expected[f"G{row}"], expected[f"H{row}"] = sums[label]
+            running = _cell(previous, f"I{previous_rows[label]}") if label in previous_rows else None
+            expected[f"I{row}"] = sums[label][2] + sumif_number(running)
+        shopee_row, lazada_row, grand_total_row = (label_rows[label] for label in summary_labels)
+        for col in "FGHI":
+            expected[f"{col}{grand_total_row}"] = expected[f"{col}{shopee_row}"] + expected[f"{col}{lazada_row}"]
+    else:
+        expected = summary_formulas(None, day, end, label_rows, totals, previous_rows)
+
+    differences = []
+    for ref, value in expected.items():
+        actual = _cell(rows, ref)
+        if not _same(value, actual):
+            differences.append(f"{ref}: {actual!r}, expected {value!r}")
+    return differences
+
+
+def verify_days(year, month, days, root=None, workers=None, log=print_output):
+    """Compare several day sheets of one monthly report with their bill files; nothing is written to it.
+
+    Returns one summary dict per day, with status "ok", "differences" or "no_bills" and the
+    list of differences found.
+    """
+    from openpyxl import load_workbook
+
+    report_path = get_path(year, month, root=root)
+    results = [{'date': f"{year}-{month:02d}-{day:02d}", 'report': report_path, 'status': None,
+                'differences': []} for day in days]
+    if not os.path.exists(report_path):
+        log(f"Report {report_path} does not exist.", "error")
+        for result in results:
+            result['status'] = "no_report"
+        return results
+
+    sources = source_bills(year, month, days, root, workers)
+    sheet_rows = {}
+
+    def read_rows(name):
+        if name not in sheet_rows:
+            sheet_rows[name] = (list(wb[name].iter_rows(min_row=5, max_col=14, values_only=True))
+                                if name in wb.sheetnames else None)
+        return sheet_rows[name]
+
+    with metrics.stage("load"):
+        wb = load_workbook(report_path, read_only=True)
+    try:
+        for day, result in zip(days, results):
+            records = sources[day][0]
+            if str(day) not in wb.sheetnames:
+                result['differences'] = [f"sheet {day} is missing"] if records else []
+            else:
+                with metrics.stage("verify"):
+                    result['differences'] = compare_sheet(read_rows(str(day)), records, day,
+                                                          processing.running_totals, read_rows(str(day - 1)))
+            result['bills'] = len(records)
+            if not records and not result['differences']:
+                result['status'] = "no_bills"
+                continue
+            result['status'] = "differences" if result['differences'] else "ok"
+            if result['differences']:
+                log(f"{result['date']}: {len(result['differences'])} difference(s) against {len(records)} bills",
+                    "warning")
+                for difference in result['differences']:
+                    log(f"    {difference}")
+            else:
+                log(f"{result['date']}: {len(records)} bills match.", "success")
+    finally:
+        wb.close()
+    return results
+
+
+def rebuild_range(start, end, root=None, workers=None, log=print_output):
+    """Rebuild every day sheet from start to end (dates, inclusive), one load and save per report."""
+    results = []
+    with metrics.run(f"rebuild {start}..{end}", log, root=root):
+        for year, month, days in group_days_by_report(start, end):
+            log(f"Rebuilding {year}-{month:02d} days {days[0]}-{days[-1]}...", "badge")
+            results.extend(rebuild_days(year, month, days, root=root, workers=workers, log=log))
+    return results
+
+
+def verify_range(start, end, root=None, workers=None, log=print_output):
+    """Verify every day sheet from start to end (dates, inclusive) against its bill files."""
+    results = []
+    with metrics.run(f"verify {start}..{end}", log, root=root):
+        for year, month, days in group_days_by_report(start, end):
+            log(f"Verifying {year}-{month:02d} days {days[0]}-{days[-1]}...", "badge")
+            results.extend(verify_days(year, month, days, root=root, workers=workers, log=log))
+    return results
@@ -0,0 +1,456 @@
+"""Monthly report day-sheet updates: bill rows, platform styling, row indices and summary formulas."""
+import re
+
+from openpyxl.styles import PatternFill, Border, Side, Font
+
+from .bills import normalize_bill_number, transport_platform, valid_platforms  # noqa: F401
+
+# Define styles
+fill_color_shopee = PatternFill(start_color="F7C7AC", end_color="F7C7AC", fill_type="solid")
+fill_color_lazada = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
+fill_color_total = PatternFill(start_color="C9C9C9", end_color="C9C9C9", fill_type="solid")
+no_fill = PatternFill()
+border = Border(left=Side(style='thin', color="000000"), right=Side(style='thin', color="000000"), top=Side(style='thin', color="000000"), bottom=Side(style='thin', color="000000"))
+thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+default_font = Font(name="Tahoma", size=12)  # Set default font style for rows
+total_font = Font(name="Tahoma", size=12, bold=True)
+platform_font_red = Font(name="Tahoma", size=12, color="FF0000")  # Red font for platform text
+
+summary_labels = ("Shopee", "Lazada", "Grand total")
+audit_column = "O"  # Formula text behind the summary values when the totals are written as values
+
+
+class SheetLayout:
+    """Row layout of a day sheet: the data block and the summary label rows below it.
+
+    Read once per run with read_layout and kept current as rows are inserted,
+    so the formatting steps do not scan the sheet again.
+    """
+
+    def __init__(self, first_row, last_row, label_rows):
+        self.first_row = first_row
+        self.last_row = last_row  # first_row - 1 while the sheet has no bills
+        self.label_rows = label_rows  # {label: row} for summary_labels found in column E
+
+    def rows_inserted(self, at, amount):
+        """Shift the label rows for `amount` rows inserted before row `at`."""
+        self.label_rows = {label: row + amount if row >= at else row for label, row in self.label_rows.items()}
+
+
+def read_layout(sheet, start_row=5):
+    """Return the SheetLayout of a day sheet; the summary labels are looked for below the data rows."""
+    last_row = get_last_data_row(sheet, start_row)
+    label_rows = {}
+    for row in range(last_row + 1, sheet.max_row + 1):
+        value = sheet.cell(row=row, column=5).value
+        if value in summary_labels and value not in label_rows:
+            label_rows[value] = row
+    return SheetLayout(start_row, last_row, label_rows)
+
+
+def get_last_data_row(sheet, start_row=5, column="C"):
+    """Find the last row containing data in the specified column."""
+    for row in range(start_row, sheet.max_row + 1):
+        if sheet[f"{column}{row}"].value is None:
+            return row - 1
+    return sheet.max_row
+
+
+def get_existing_bill_numbers(sheet, start_row=5, column="C"):
+    """Return a set of existing bill numbers, truncated to the first 6 digits."""
+    return {str(sheet[f"{column}{row}"].value)[:6] for row in range(start_row, sheet.max_row + 1)
+            if sheet[f"{column}{row}"].value}
+
+
+def apply_borders_and_format(sheet, row, start_col='A', end_col='N', font=default_font):
+    """Apply borders, default font, and formatting to a row."""
+    for col in range(ord(start_col), ord(end_col) + 1):
+        cell = sheet[f"{chr(col)}{row}"]
+        cell.border = thin_border
+        cell.font = font
+
+
+def build_bill_index(sheet, start_row=5, column="C", last_row=None):
+    """Return {normalized bill number: row} for the data rows of a day sheet."""
+    if last_row is None:
+        last_row = get_last_data_row(sheet, start_row, column)
+    index = {}
+    for row in range(start_row, last_row + 1):
+        value = sheet[f"{column}{row}"].value
+        if value is not None:
+            index[normalize_bill_number(value)] = row
+    return index
+
+
+def bill_row_values(bill_number, data):
+    """Return the {column: value} cells written for one bill row."""
+    return {
+        "B": "PHK",
+        "C": bill_number,
+        "D": data['customer_name'],
+        "E": data['zone'],
+        "F": data['box_count'],
+        "G": data['total_value'],
+        "H": data['tax_value'],
+        "K": data['transport_service'],
+        "M": data['phone'],
+    }
+
+
+def upsert_bill_rows(sheet, bills_data, index):
+    """Update rows of bills already in the sheet in place and return the bills that still need a row.
+
+    Rows whose cells already match the bill are left alone. Returns (new_bills, updated, unchanged),
+    where the last two are lists of bill numbers.
+    """
+    new_bills, updated, unchanged = {}, [], []
+    for bill_number, data in bills_data.items():
+        row = index.get(normalize_bill_number(bill_number))
+        if row is None:
+            new_bills[bill_number] = data
+            continue
+
+        values = bill_row_values(sheet[f"C{row}"].value, data)
+        if all(sheet[f"{col}{row}"].value == value for col, value in values.items()):
+            unchanged.append(bill_number)
+            continue
+
+        for col, value in values.items():
+            sheet[f"{col}{row}"] = value
+        # Clear the old platform styling; process_sheet applies it again from the new transport
+        sheet[f"L{row}"] = None
+        for col in "IJKL":
+            sheet[f"{col}{row}"].fill = no_fill
+        apply_borders_and_format(sheet, row)
+        updated.append(bill_number)
+
+    return new_bills, updated, unchanged
+
+
+def insert_bill_rows(sheet, start_row, bills_data, index=None, layout=None):
+    """Insert one block of rows for the new bills at start_row and fill it in a single pass.
+
+    When a bill index or a SheetLayout is given, it is updated for the new rows.
+    Returns the first row after the block.
+    """
+    if not bills_data:
+        return start_row
+
+    # Row 5 is the template's blank first data row, so an empty sheet only needs room for the rest
+    insert_at = start_row + 1 if start_row == 5 else start_row
+    amount = len(bills_data) - 1 if start_row == 5 else len(bills_data)
+    if amount:
+        sheet.insert_rows(insert_at, amount)  # One shift of the summary block for the whole day
+        for row in range(insert_at, insert_at + amount):
+            sheet.row_dimensions[row].height = 18
+        if layout is not None:
+            layout.rows_inserted(insert_at, amount)
+
+    row = fill_bill_rows(sheet, start_row, bills_data, index)
+    if layout is not None:
+        layout.last_row = row - 1
+    return row
+
+
+def fill_bill_rows(sheet, start_row, bills_data, index=None):
+    """Write one row per bill from start_row on, with borders and fonts; returns the row after the last."""
+    row = start_row
+    for bill_number, data in bills_data.items():
+        for col, value in bill_row_values(bill_number, data).items():
+            sheet[f"{col}{row}"] = value
+        sheet[f"H{row}"].number_format = "0.00"
+
+        for col in range(ord('A'), ord('N') + 1):
+            cell = sheet[f"{chr(col)}{row}"]
+            cell.border = thin_border
+            cell.font = default_font
+        if index is not None:
+            index[normalize_bill_number(bill_number)] = row
+        row += 1
+    return row
+
+
+def data_block_end(sheet, layout):
+    """Return the last row with a bill number above the summary labels, past any empty rows in the block."""
+    end = min(layout.label_rows.values(), default=layout.last_row + 1)
+    for row in range(end - 1, layout.last_row, -1):
+        if sheet[f"C{row}"].value is not None:
+            return row
+    return layout.last_row
+
+
+def rebuild_bill_rows(sheet, bills_data, layout):
+    """Replace the data rows of a day sheet with one row per bill, in order.
+
+    The block is resized with a single insert or delete, then every row is cleared and
+    filled. layout is updated for the new block; returns the last data row. The summary rows
+    below move with the block, as they do when insert_bill_rows adds rows.
+    """
+    first_row = layout.first_row
+    # Row 5 is the template's blank first data row, so there is always at least one row
+    have = max(data_block_end(sheet, layout) - first_row + 1, 1)
+    need = max(len(bills_data), 1)
+    if need > have:
+        sheet.insert_rows(first_row + have, need - have)
+        for row in range(first_row + have, first_row + need):
+            sheet.row_dimensions[row].height = 18
+        layout.rows_inserted(first_row + have, need - have)
+    elif need < have:
+        sheet.delete_rows(first_row + need, have - need)
+        # openpyxl leaves the row heights where they were; move the summary rows' heights up with them
+        for row in range(first_row + need, sheet.max_row + 1):
+            sheet.row_dimensions[row].height = sheet.row_dimensions[row + have - need].height
+        layout.rows_inserted(first_row + need, need - have)
+
+    for row in sheet.iter_rows(min_row=first_row, max_row=first_row + need - 1, max_col=14):
+        for cell in row:
+            cell.value = None
+        # Only rows styled for a platform have a fill; setting a style is what costs here
+        for cell in row[8:12]:
+            if cell.fill.fill_type is not None:
+                cell.fill = no_fill
+    layout.last_row = fill_bill_rows(sheet, first_row, bills_data) - 1
+    return layout.last_row
+
+
+def update_row_indices(sheet, start_row=5, column="A", last_row=None, from_row=None):
+    """Update row indices in the specified column, with last two rows repeating the last index.
+
+    from_row limits the numbering to the rows from there on, e.g. the rows just added.
+    """
+    if last_row is None:
+        last_row = get_last_data_row(sheet, start_row)
+    for row in range(from_row or start_row, last_row + 1):
+        sheet[f"{column}{row}"].value = row - start_row + 1
+
+    sheet[f"{column}{last_row + 1}"].value = f"={column}{last_row}"
+    sheet[f"{column}{last_row + 2}"].value = f"={column}{last_row + 1}"
+
+
+def find_keyword_row(ws, keyword, column):
+    """Finds the row number of the cell that contains a specific keyword in a given column."""
+    for row in range(1, ws.max_row + 1):
+        if ws.cell(row=row, column=column).value == keyword:
+            return row
+    return None
+
+
+# ---------------------------------------------------------------------------- #
+
+def style_platform_rows(ws, first_row, last_row):
+    """Fill columns I-L and set the App column for rows whose transport ends in a known platform."""
+    for row in ws.iter_rows(min_row=first_row, max_row=last_row, min_col=9, max_col=12, values_only=False):
+        transport_cell = row[2]  # Column K (Transport)
+        app_cell = row[3]  # Column L (App)
+        platform = transport_platform(transport_cell.value) if transport_cell.value else None
+        if platform:
+            app_cell.value = platform
+            app_cell.font = platform_font_red  # Set red font for platform text
+            app_cell.border = border
+            fill_color = fill_color_lazada if platform == "Lazada" else fill_color_shopee
+            for cell in row[:3]:
+                cell.fill = fill_color
+                cell.border = border
+                cell.font = platform_font_red
+
+
+def process_sheet(ws, sheet_number, totals="indirect", log=None):
+    """Processes and formats a sheet with platform-specific styling and summary rows based on the last data row."""
+    last_row = get_last_data_row(ws, column="H")
+
+    # Apply platform-specific formatting
+    style_platform_rows(ws, 2, last_row)
+
+    # Find dynamic rows based on labels
+    label_rows = {label: find_keyword_row(ws, label, 5) for label in summary_labels}
+    write_platform_summary(ws, sheet_number, last_row, label_rows, totals, log)
+
+
+def process_new_rows(ws, sheet_number, layout, rows, totals="indirect", log=None):
+    """Incremental process_sheet: style only the given rows and rewrite the summary from the layout.
+
+    rows is an iterable of (first_row, last_row) ranges, normally the block just inserted
+    and any rows updated in place.
+    """
+    for first_row, last_row in rows:
+        style_platform_rows(ws, first_row, last_row)
+    write_platform_summary(ws, sheet_number, summary_end_row(ws, layout), layout.label_rows, totals, log)
+
+
+def summary_end_row(ws, layout):
+    """Return the row the summary SUMIFs run down to, as process_sheet finds it.
+
+    process_sheet sums down to the last row with a value in column H, which runs on
+    into the summary rows; only the few rows after the data block need checking.
+    """
+    return get_last_data_row(ws, start_row=max(layout.last_row, layout.first_row), column="H")
+
+
+def previous_total(ws, sheet_number, label, totals, previous_rows=None):
+    """Return the formula term adding the previous day's running total for label, or ""."""
+    if sheet_number <= 1:
+        return ""
+    prev_sheet_name = str(sheet_number - 1)
+    if totals == "indirect":
+        return (f' + SUMIF(INDIRECT("\'{prev_sheet_name}\'!E:E"), "{label}", '
+                f'INDIRECT("\'{prev_sheet_name}\'!I:I"))')
+    if previous_rows is None:
+        if prev_sheet_name not in ws.parent.sheetnames:
+            return ""
+        previous_rows = read_layout(ws.parent[prev_sheet_name]).label_rows
+    # A missing label adds nothing, as the SUMIF over an empty match does
+    return f" + '{prev_sheet_name}'!I{previous_rows[label]}" if label in previous_rows else ""
+
+
+def summary_formulas(ws, sheet_number, last_row, label_rows, totals="indirect", previous_rows=None):
+    """Return {cell: formula} for the Shopee, Lazada and Grand total summary rows.
+
+    totals picks how column I reaches back to the previous day's running total: "indirect"
+    (SUMIF over INDIRECT whole columns, the original formulas) or "direct" (a plain reference
+    to the previous sheet's total cell). "values" writes the direct formulas here too;
+    write_month_totals then replaces them with numbers.
+    """
+    formulas = {}
+    for label in ("Shopee", "Lazada"):
+        row = label_rows[label]
+        for col in "FGH":
+            formulas[f"{col}{row}"] = f'=SUMIF(L5:L{last_row},"{label}",{col}5:{col}{last_row})'
+        link = "indirect" if totals == "indirect" else "direct"
+        formulas[f"I{row}"] = f"=H{row}" + previous_total(ws, sheet_number, label, link, previous_rows)
+
+    # Grand Total formula
+    shopee_row, lazada_row, grand_total_row = (label_rows[label] for label in summary_labels)
+    for col in "FGHI":
+        formulas[f"{col}{grand_total_row}"] = f"={col}{shopee_row}+{col}{lazada_row}"
+    return formulas
+
+
+def write_platform_summary(ws, sheet_number, last_row, label_rows, totals="indirect", log=None):
+    """Write the Shopee, Lazada and Grand total summary rows for data down to last_row.
+
+    A sheet without the summary label rows is left as it is and reported through log(message, tag).
+    In "values" mode the caller replaces the formulas with numbers once every day of the run is
+    written, with one write_month_totals call per report.
+    """
+    if not all(label_rows.get(label) for label in summary_labels):
+        if log is not None:
+            log(f"Sheet {sheet_number}: required rows not found for Shopee, Lazada, or Grand Total.", "error")
+        return
+
+    for ref, formula in summary_formulas(ws, sheet_number, last_row, label_rows, totals).items():
+        ws[ref] = formula
+
+    # Apply formatting to rows
+    apply_borders_and_format(ws, label_rows["Shopee"], font=default_font)
+    apply_borders_and_format(ws, label_rows["Lazada"], font=default_font)
+    apply_borders_and_format(ws, label_rows["Grand total"], font=total_font)
+
+    # Whatever the mode now, the next day may hold direct references from a run in "direct" mode
+    relink_next_day(ws, sheet_number, label_rows)
+
+
+def relink_next_day(ws, sheet_number, label_rows):
+    """Point the next day's direct running-total references at this sheet's current total rows.
+
+    Inserting rows moves this sheet's summary block, and openpyxl does not update
+    references to it from other sheets.
+    """
+    next_sheet_name = str(sheet_number + 1)
+    if next_sheet_name not in ws.parent.sheetnames:
+        return
+    next_ws = ws.parent[next_sheet_name]
+    next_rows = read_layout(next_ws).label_rows
+    reference = re.compile(rf"'{sheet_number}'!I\d+")
+    for label in ("Shopee", "Lazada"):
+        if label in next_rows:
+            cell = next_ws[f"I{next_rows[label]}"]
+            if isinstance(cell.value, str) and reference.search(cell.value):
+                cell.value = reference.sub(f"'{sheet_number}'!I{label_rows[label]}", cell.value)
+
+
+def _number(value):
+    """Return value if SUMIF would add it, else 0."""
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def platform_sums(ws, first_row, last_row):
+    """Return {label: [F, G, H]} summed over rows whose App column (L) is that platform, like the SUMIFs."""
+    return sum_platform_rows(ws.iter_rows(min_row=first_row, max_row=last_row, min_col=6, max_col=12,
+                                          values_only=True))
+
+
+def sum_platform_rows(rows):
+    """platform_sums over (F, G, H, I, J, K, L) value tuples, e.g. rows read by verify."""
+    sums = {"Shopee": [0, 0, 0], "Lazada": [0, 0, 0]}
+    keys = {label.lower(): label for label in sums}
+    for f, g, h, _, _, _, app in rows:
+        label = keys.get(str(app).lower()) if app is not None else None
+        if label:
+            total = sums[label]
+            total[0] += _number(f)
+            total[1] += _number(g)
+            total[2] += _number(h)
+    return sums
+
+
+def write_month_totals(wb, from_day, audit_col=None):
+    """Write the summary rows of the day sheets from from_day on as values instead of formulas.
+
+    The totals are computed here from every day sheet of the month, so Excel has nothing to
+    recalculate. The audit column keeps the direct formulas each value stands for.
+    """
+    audit_col = audit_col or audit_column
+    running = {"Shopee": 0, "Lazada": 0}
+    previous_rows = {}
+    for day in range(1, 32):
+        if str(day) not in wb.sheetnames:
+            running, previous_rows = {"Shopee": 0, "Lazada": 0}, {}
+            continue
+        ws = wb[str(day)]
+        layout = read_layout(ws)
+        label_rows = layout.label_rows
+        if not all(label in label_rows for label in summary_labels):
+            running, previous_rows = {"Shopee": 0, "Lazada": 0}, label_rows
+            continue
+
+        shopee_row, lazada_row, grand_total_row = (label_rows[label] for label in summary_labels)
+        if day != from_day and ws[f"I{shopee_row}"].value is None:
+            # Never processed: the summary stays empty and the next day's total starts again from 0
+            running, previous_rows = {"Shopee": 0, "Lazada": 0}, label_rows
+            continue
+
+        last_row = summary_end_row(ws, layout)
+        sums = platform_sums(ws, layout.first_row, last_row)
+        values = {}
+        for label in ("Shopee", "Lazada"):
+            row = label_rows[label]
+            values[f"F{row}"], values[f"G{row}"], values[f"H{row}"] = sums[label]
+            values[f"I{row}"] = sums[label][2] + running[label]
+            running[label] = values[f"I{row}"]
+        for col in "FGHI":
+            values[f"{col}{grand_total_row}"] = values[f"{col}{shopee_row}"] + values[f"{col}{lazada_row}"]
+
+        if day >= from_day:
+            formulas = summary_formulas(ws, day, last_row, label_rows, "direct", previous_rows)
+            for ref, value in values.items():
+                ws[ref] = value
+            for row in (shopee_row, lazada_row, grand_total_row):
+                ws[f"{audit_col}{row}"] = " | ".join(f"{col}: {formulas[f'{col}{row}']}" for col in "FGHI")
+        previous_rows = label_rows
+
+
+def update_summary_formulas(sheet, start_row=5, columns=("F", "G", "H"), last_data_row=None):
+    """Set up sum formulas and additional references in the last few rows for specified columns."""
+    if last_data_row is None:
+        last_data_row = get_last_data_row(sheet, start_row)
+
+    for col in columns:
+        # Add sum formulas for the first summary row
+        sheet[f"{col}{last_data_row + 1}"].value = f"=SUM({col}{start_row}:{col}{last_data_row})"
+        # Add a reference to the first summary row in the second summary row
+        sheet[f"{col}{last_data_row + 2}"].value = f"={col}{last_data_row + 1}"
+
+        # Specifically for column 'H', add a reference two rows below the second summary row
+        if col == "H":
+            # Ensure there's a blank row and then add the reference formula
+            sheet[f"{col}{last_data_row + 4}"].value = f"={col}{last_data_row + 2}"
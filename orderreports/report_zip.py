@@ -0,0 +1,472 @@
+"""Partial report writer: load and save only the day sheets being written.
+
+A monthly report holds 31 day sheets, but a run usually touches one. Instead of letting
+openpyxl parse and re-serialize the whole workbook, the report is handled as the zip it is:
+the day sheets are loaded from a stripped-down copy of the package, and on save only their
+sheetN.xml parts are regenerated. The shared strings and cell formats they need are appended
+to the original parts, and every other part is copied unchanged.
+
+Reports this writer cannot patch safely raise UnsupportedReport; callers then fall back to
+openpyxl's full load and save. UnsupportedReport lives in paths and openpyxl is imported
+on first use, so catching it costs nothing on runs that write nothing.
+"""
+import io
+import os
+import posixpath
+import re
+import tempfile
+import zipfile
+
+from copy import copy
+from .bill_reader import DOC_REL_NS, ET, PKG_REL_NS, SHEET_MAIN_NS, _resolve_part, _text_content
+from .paths import UnsupportedReport
+
+# Sheet relationships that do not stop a partial write; anything else (drawings, comments,
+# tables, hyperlinks) is left to the full openpyxl path.
+allowed_sheet_relationships = ("/printerSettings",)
+# Conditional formats refer to differential styles, which are not remapped here
+_UNSUPPORTED_SHEET_XML = re.compile(rb"<(?:\w+:)?conditionalFormatting\b")
+
+_CELL = re.compile(r'<c\b([^>]*?)(/>|>(.*?)</c>)', re.S)
+_ROW = re.compile(r'<row\b([^>]*)>')
+_COL = re.compile(r'<col\b([^>]*?)(/?)>')
+_STYLE_ATTR = re.compile(r'\bs="(\d+)"')
+_COL_STYLE_ATTR = re.compile(r'\bstyle="(\d+)"')
+_VALUE = re.compile(r'<v>(\d+)</v>')
+_REL_ID = re.compile(r'\br:id="([^"]+)"')
+
+empty_strings = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 f'<sst xmlns="{SHEET_MAIN_NS}" count="0" uniqueCount="0"></sst>').encode("utf-8")
+strings_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+
+
+def _escape(text, quote=False):
+    """Escape &, < and > for XML text, and double quotes too for attribute values."""
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return text.replace('"', "&quot;") if quote else text
+
+
+def _q(tag, ns=SHEET_MAIN_NS):
+    return f"{{{ns}}}{tag}"
+
+
+def _read_rels(archive, part):
+    """Return {relationship id: (type, resolved target)} for a part, or {} when it has none."""
+    folder, name = part.rsplit("/", 1) if "/" in part else ("", part)
+    rels_part = f"{folder}/_rels/{name}.rels" if folder else f"_rels/{name}.rels"
+    if rels_part not in archive.namelist():
+        return {}
+    return {rel.get("Id"): (rel.get("Type", ""), _resolve_part(part, rel.get("Target")))
+            for rel in ET.fromstring(archive.read(rels_part)).iter(_q("Relationship", PKG_REL_NS))}
+
+
+def _rels_part(part):
+    folder, name = part.rsplit("/", 1)
+    return f"{folder}/_rels/{name}.rels"
+
+
+def _workbook_sheets(archive):
+    """Return the workbook part and its [(sheet name, sheet part)] in workbook order."""
+    workbook_part = None
+    for rel in ET.fromstring(archive.read("_rels/.rels")).iter(_q("Relationship", PKG_REL_NS)):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            workbook_part = _resolve_part("", rel.get("Target"))
+    if workbook_part is None:
+        raise UnsupportedReport("no workbook part")
+    rels = _read_rels(archive, workbook_part)
+    sheets = []
+    for sheet in ET.fromstring(archive.read(workbook_part)).iter(_q("sheet")):
+        rel_type, target = rels[sheet.get(_q("id", DOC_REL_NS))]
+        if not rel_type.endswith("/worksheet"):
+            raise UnsupportedReport(f"sheet {sheet.get('name')} is not a worksheet")
+        sheets.append((sheet.get("name"), target))
+    return workbook_part, sheets
+
+
+def _part_of_type(archive, workbook_part, suffix):
+    for rel_type, target in _read_rels(archive, workbook_part).values():
+        if rel_type.endswith(suffix):
+            return target
+    return None
+
+
+class PartialReport:
+    """A monthly report opened for a few of its sheets.
+
+    Behaves like the openpyxl workbook for what processing needs: report[name], sheetnames
+    (only the loaded sheets), save(path) and close().
+    """
+
+    def __init__(self, path, sheet_names):
+        self.path = path
+        with open(path, "rb") as handle:
+            self.data = handle.read()
+        with zipfile.ZipFile(io.BytesIO(self.data)) as archive:
+            self.workbook_part, sheets = _workbook_sheets(archive)
+            self.sheet_parts = {name: part for name, part in sheets if name in sheet_names}
+            self.styles_part = _part_of_type(archive, self.workbook_part, "/styles")
+            self.strings_part = _part_of_type(archive, self.workbook_part, "/sharedStrings")
+            if self.styles_part is None:
+                raise UnsupportedReport("the report has no styles part")
+            for name, part in self.sheet_parts.items():
+                for rel_type, _ in _read_rels(archive, part).values():
+                    if not rel_type.endswith(allowed_sheet_relationships):
+                        raise UnsupportedReport(f"sheet {name} has {rel_type.rsplit('/', 1)[-1]} parts")
+                if _UNSUPPORTED_SHEET_XML.search(archive.read(part)):
+                    raise UnsupportedReport(f"sheet {name} has conditional formatting")
+            from openpyxl import load_workbook
+
+            self.workbook = load_workbook(io.BytesIO(self._stripped_package(archive, sheets)))
+
+    def _stripped_package(self, archive, sheets):
+        """Return a copy of the package holding only the loaded sheets, for openpyxl to read."""
+        dropped = {part for name, part in sheets if name not in self.sheet_parts}
+        dropped |= {_rels_part(part) for part in dropped}
+        calc_chain = _part_of_type(archive, self.workbook_part, "/calcChain")
+        if calc_chain:
+            dropped.add(calc_chain)
+
+        workbook = ET.fromstring(archive.read(self.workbook_part))
+        kept_ids = set()
+        for container in workbook.iter(_q("sheets")):
+            for sheet in list(container):
+                if sheet.get("name") in self.sheet_parts:
+                    kept_ids.add(sheet.get(_q("id", DOC_REL_NS)))
+                else:
+                    container.remove(sheet)
+        # Defined names and the active tab point at sheet positions that no longer exist
+        for names in workbook.findall(_q("definedNames")):
+            workbook.remove(names)
+        for view in workbook.iter(_q("workbookView")):
+            view.attrib.pop("activeTab", None)
+            view.attrib.pop("firstSheet", None)
+
+        rels_part = _rels_part(self.workbook_part)
+        rels = ET.fromstring(archive.read(rels_part))
+        for rel in list(rels):
+            if rel.get("Type", "").endswith(("/worksheet", "/calcChain")) and rel.get("Id") not in kept_ids:
+                rels.remove(rel)
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as stripped:
+            for info in archive.infolist():
+                if info.filename in dropped:
+                    continue
+                if info.filename == self.workbook_part:
+                    stripped.writestr(info.filename, ET.tostring(workbook))
+                elif info.filename == rels_part:
+                    stripped.writestr(info.filename, ET.tostring(rels))
+                else:
+                    stripped.writestr(info.filename, archive.read(info.filename))
+        return buffer.getvalue()
+
+    @property
+    def sheetnames(self):
+        return self.workbook.sheetnames
+
+    def __getitem__(self, name):
+        return self.workbook[name]
+
+    def close(self):
+        self.workbook.close()
+
+    def save(self, path=None):
+        """Write the loaded sheets back into the report at path (default: where it was read from)."""
+        saved = io.BytesIO()
+        self.workbook.save(saved)
+        with zipfile.ZipFile(saved) as written, zipfile.ZipFile(io.BytesIO(self.data)) as original:
+            _, written_sheets = _workbook_sheets(written)
+            written_styles = _part_of_type(written, "xl/workbook.xml", "/styles")
+            written_strings = _part_of_type(written, "xl/workbook.xml", "/sharedStrings")
+
+            styles = _StyleMerger(original.read(self.styles_part), written.read(written_styles))
+            strings = _StringMerger(original.read(self.strings_part) if self.strings_part else empty_strings,
+                                    written.read(written_strings) if written_strings else None)
+            parts = {}
+            for name, written_part in written_sheets:
+                part = self.sheet_parts[name]
+                sheet_xml = _remap_sheet(written.read(written_part).decode("utf-8"), styles, strings)
+                self._check_relationships(original, part, sheet_xml)
+                parts[part] = sheet_xml.encode("utf-8")
+            parts[self.styles_part] = styles.patched()
+            parts.update(self._workbook_parts(original))
+            if self.strings_part:
+                parts[self.strings_part] = strings.patched()
+            elif strings.added:
+                parts.update(self._new_strings_part(original, parts, strings.patched()))
+            self._write(original, parts, path or self.path)
+
+    def _check_relationships(self, original, part, sheet_xml):
+        ids = set(_REL_ID.findall(sheet_xml))
+        if ids - set(_read_rels(original, part)):
+            raise UnsupportedReport(f"{part} refers to relationships the writer does not keep")
+
+    def _workbook_parts(self, original):
+        """Return the workbook parts to patch: recalculate on open, and drop the stale calc chain."""
+        parts = {}
+        workbook_xml = original.read(self.workbook_part).decode("utf-8")
+        calc = re.search(r"<calcPr\b[^>]*?/?>", workbook_xml)
+        if calc and not re.search(r'\bfullCalcOnLoad="(1|true)"', calc.group(0)):
+            tag = re.sub(r'\sfullCalcOnLoad="[^"]*"', "", calc.group(0))
+            tag = re.sub(r"(/?>)$", r' fullCalcOnLoad="1"\1', tag)
+            workbook_xml = workbook_xml[:calc.start()] + tag + workbook_xml[calc.end():]
+        elif not calc:
+            # calcPr follows these elements in the workbook schema
+            ends = [match.end() for tag in ("sheets", "functionGroups", "externalReferences", "definedNames")
+                    for match in re.finditer(rf"</{tag}>|<{tag}\b[^>]*/>", workbook_xml)]
+            if not ends:
+                raise UnsupportedReport("workbook.xml has no sheets element")
+            at = max(ends)
+            workbook_xml = workbook_xml[:at] + '<calcPr fullCalcOnLoad="1"/>' + workbook_xml[at:]
+        parts[self.workbook_part] = workbook_xml.encode("utf-8")
+
+        calc_chain = _part_of_type(original, self.workbook_part, "/calcChain")
+        if calc_chain:
+            parts[calc_chain] = None
+            rels_part = _rels_part(self.workbook_part)
+            rels_xml = original.read(rels_part).decode("utf-8")
+            parts[rels_part] = re.sub(r"<Relationship\b[^>]*/calcChain\"[^>]*/>", "", rels_xml).encode("utf-8")
+            types_xml = original.read("[Content_Types].xml").decode("utf-8")
+            parts["[Content_Types].xml"] = re.sub(rf'<Override\b[^>]*PartName="/{re.escape(calc_chain)}"[^>]*/>',
+                                                  "", types_xml).encode("utf-8")
+        return parts
+
+    def _new_strings_part(self, original, parts, strings_xml):
+        """Return the parts that add a sharedStrings part to a report that had none."""
+        strings_part = posixpath.join(posixpath.dirname(self.workbook_part), "sharedStrings.xml")
+        rels_part = _rels_part(self.workbook_part)
+        rels_xml = (parts.get(rels_part) or original.read(rels_part)).decode("utf-8")
+        target = posixpath.relpath(strings_part, posixpath.dirname(self.workbook_part))
+        rels_xml = rels_xml.replace("</Relationships>", f'<Relationship Id="rIdSharedStrings" Type="{DOC_REL_NS}'
+                                    f'/sharedStrings" Target="{target}"/></Relationships>')
+        types_xml = (parts.get("[Content_Types].xml") or original.read("[Content_Types].xml")).decode("utf-8")
+        types_xml = types_xml.replace("</Types>", f'<Override PartName="/{strings_part}" ContentType="{strings_type}"'
+                                                  '/></Types>')
+        return {rels_part: rels_xml.encode("utf-8"), "[Content_Types].xml": types_xml.encode("utf-8"),
+                strings_part: strings_xml}
+
+    def _write(self, original, parts, path):
+        """Write the new package next to path and move it into place, so a failed save leaves the report intact."""
+        folder = os.path.dirname(os.path.abspath(path))
+        handle, temp_path = tempfile.mkstemp(suffix=".xlsx", dir=folder)
+        try:
+            with os.fdopen(handle, "wb") as out, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as package:
+                for info in original.infolist():
+                    if info.filename not in parts:
+                        package.writestr(info, original.read(info.filename))
+                    elif parts[info.filename] is not None:  # None drops the part
+                        package.writestr(info, parts[info.filename])
+                for name in parts.keys() - set(original.namelist()):
+                    package.writestr(name, parts[name])
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        with open(path, "rb") as handle:
+            self.data = handle.read()
+
+
+def _root_tag(xml, tag):
+    """Check the part uses the default namespace, so unprefixed elements can be appended to it."""
+    if not re.search(rf"<{tag}\b[^>]*\bxmlns=\"{re.escape(SHEET_MAIN_NS)}\"", xml):
+        raise UnsupportedReport(f"{tag} does not use the default spreadsheet namespace")
+
+
+class _StringMerger:
+    """Map the shared strings of regenerated sheets onto the original sharedStrings part."""
+
+    def __init__(self, original_xml, written_xml):
+        self.xml = original_xml.decode("utf-8")
+        _root_tag(self.xml, "sst")
+        self.index = {}
+        items = ET.fromstring(original_xml).findall(_q("si"))
+        for position, item in enumerate(items):
+            if len(item) == 1 and item[0].tag == _q("t"):
+                self.index.setdefault(item[0].text or "", position)
+        self.count = len(items)
+        self.written = ([_text_content(item) for item in ET.fromstring(written_xml).findall(_q("si"))]
+                        if written_xml else [])
+        self.added = []
+
+    def map(self, written_index):
+        text = self.written[written_index]
+        if text not in self.index:
+            self.index[text] = self.count + len(self.added)
+            self.added.append(text)
+        return self.index[text]
+
+    def patched(self):
+        if not self.added:
+            return self.xml.encode("utf-8")
+        items = "".join(f'<si><t xml:space="preserve">{_escape(text)}</t></si>' if text != text.strip()
+                        else f"<si><t>{_escape(text)}</t></si>" for text in self.added)
+        xml = re.sub(r"<sst\b([^>]*?)/>", r"<sst\1></sst>", self.xml)
+        xml = xml.replace("</sst>", items + "</sst>")
+        total = self.count + len(self.added)
+        head = re.search(r"<sst\b[^>]*>", xml).group(0)
+        new_head = re.sub(r'\suniqueCount="\d+"', f' uniqueCount="{total}"', head)
+        new_head = re.sub(r'\scount="(\d+)"', lambda m: f' count="{int(m.group(1)) + len(self.added)}"', new_head)
+        return xml.replace(head, new_head, 1).encode("utf-8")
+
+
+def _styles(xml):
+    """Parse a styles part into number formats, fonts, fills, borders, cell formats and style names."""
+    from openpyxl.styles.borders import Border
+    from openpyxl.styles.cell_style import CellStyle
+    from openpyxl.styles.fills import Fill
+    from openpyxl.styles.fonts import Font
+
+    root = ET.fromstring(xml)
+
+    def children(tag):
+        node = root.find(_q(tag))
+        return list(node) if node is not None else []
+
+    return {
+        "numFmts": {int(fmt.get("numFmtId")): fmt.get("formatCode") for fmt in children("numFmts")},
+        "fonts": [Font.from_tree(font) for font in children("fonts")],
+        "fills": [Fill.from_tree(fill) for fill in children("fills")],
+        "borders": [Border.from_tree(border) for border in children("borders")],
+        "cellXfs": [CellStyle.from_tree(xf) for xf in children("cellXfs")],
+        "cellStyles": {int(style.get("xfId")): style.get("name") for style in children("cellStyles")},
+    }
+
+
+class _StyleMerger:
+    """Map the cell formats of regenerated sheets onto the original styles part, appending what is missing."""
+
+    def __init__(self, original_xml, written_xml):
+        self.xml = original_xml.decode("utf-8")
+        _root_tag(self.xml, "styleSheet")
+        self.original = _styles(original_xml)
+        self.written = _styles(written_xml)
+        self.style_ids = {name: xf_id for xf_id, name in self.original["cellStyles"].items()}
+        self.added = {"numFmts": [], "fonts": [], "fills": [], "borders": [], "cellXfs": []}
+        self.cache = {}
+
+    def _find_or_add(self, kind, item):
+        items = self.original[kind]
+        try:
+            return items.index(item)
+        except ValueError:
+            items.append(item)
+            self.added[kind].append(item)
+            return len(items) - 1
+
+    def _number_format(self, fmt_id):
+        from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE
+
+        if fmt_id < BUILTIN_FORMATS_MAX_SIZE:
+            return fmt_id
+        code = self.written["numFmts"][fmt_id]
+        formats = self.original["numFmts"]
+        for original_id, original_code in formats.items():
+            if original_code == code:
+                return original_id
+        new_id = max([BUILTIN_FORMATS_MAX_SIZE - 1, *formats]) + 1
+        formats[new_id] = code
+        self.added["numFmts"].append((new_id, code))
+        return new_id
+
+    def map(self, written_index):
+        if written_index not in self.cache:
+            xf = copy(self.written["cellXfs"][written_index])
+            xf.fontId = self._find_or_add("fonts", self.written["fonts"][xf.fontId])
+            xf.fillId = self._find_or_add("fills", self.written["fills"][xf.fillId])
+            xf.borderId = self._find_or_add("borders", self.written["borders"][xf.borderId])
+            xf.numFmtId = self._number_format(xf.numFmtId)
+            name = self.written["cellStyles"].get(xf.xfId or 0)
+            if name not in self.style_ids:
+                raise UnsupportedReport(f"cell style {name!r} is not in the report")
+            xf.xfId = self.style_ids[name]
+            self.cache[written_index] = self._find_or_add("cellXfs", xf)
+        return self.cache[written_index]
+
+    def patched(self):
+        xml = self.xml
+        for kind, child in (("fonts", "font"), ("fills", "fill"), ("borders", "border"), ("cellXfs", "xf")):
+            if self.added[kind]:
+                items = "".join(_element_xml(item, child) for item in self.added[kind])
+                xml = _append_children(xml, kind, items, len(self.original[kind]))
+        if self.added["numFmts"]:
+            items = "".join(f'<numFmt numFmtId="{fmt_id}" formatCode="{_escape(code, quote=True)}"/>'
+                            for fmt_id, code in self.added["numFmts"])
+            if re.search(r"<numFmts\b", xml):
+                xml = _append_children(xml, "numFmts", items, len(self.original["numFmts"]))
+            else:
+                head = re.search(r"<styleSheet\b[^>]*>", xml)
+                xml = (xml[:head.end()] + f'<numFmts count="{len(self.added["numFmts"])}">{items}</numFmts>'
+                       + xml[head.end():])
+        return xml.encode("utf-8")
+
+
+def _element_xml(item, tag):
+    from openpyxl.xml.functions import tostring
+
+    if item is None:  # An empty <fill/>
+        return f"<{tag}/>"
+    return tostring(item.to_tree()).decode("utf-8")
+
+
+def _append_children(xml, container, items, count):
+    """Append serialized children to a container element and update its count attribute."""
+    match = re.search(rf"<{container}\b([^>]*?)(/?)>", xml)
+    if match is None:
+        raise UnsupportedReport(f"styles.xml has no {container} element")
+    attrs = re.sub(r'\scount="\d+"', "", match.group(1)) + f' count="{count}"'
+    if match.group(2):  # Self-closing, nothing in it yet
+        return xml[:match.start()] + f"<{container}{attrs}>{items}</{container}>" + xml[match.end():]
+    end = xml.index(f"</{container}>", match.end())
+    return xml[:match.start()] + f"<{container}{attrs}>" + xml[match.end():end] + items + xml[end:]
+
+
+def _remap_sheet(sheet_xml, styles, strings):
+    """Point the style and shared-string indices of an openpyxl-written sheet at the original parts."""
+    default_style = styles.map(0)
+
+    def cell(match):
+        attrs, body = match.group(1), match.group(3)
+        if _STYLE_ATTR.search(attrs):
+            attrs = _STYLE_ATTR.sub(lambda m: f's="{styles.map(int(m.group(1)))}"', attrs)
+        elif default_style:
+            attrs += f' s="{default_style}"'
+        if body is None:
+            return f"<c{attrs}/>"
+        if 't="s"' in attrs:
+            body = _VALUE.sub(lambda m: f"<v>{strings.map(int(m.group(1)))}</v>", body)
+        return f"<c{attrs}>{body}</c>"
+
+    sheet_xml = _CELL.sub(cell, sheet_xml)
+    sheet_xml = _ROW.sub(lambda m: "<row" + _STYLE_ATTR.sub(lambda s: f's="{styles.map(int(s.group(1)))}"',
+                                                           m.group(1)) + ">", sheet_xml)
+    return _COL.sub(lambda m: "<col" + _COL_STYLE_ATTR.sub(lambda s: f'style="{styles.map(int(s.group(1)))}"',
+                                                          m.group(1)) + m.group(2) + ">", sheet_xml)
+
+
+def sheets_referring_to(path, links):
+    """Return the sheets among links ({sheet name: other sheet name}) whose formulas refer to the other one.
+
+    Finds day sheets that hold direct running-total references ('5'!I20) to a sheet about to move.
+    """
+    found = set()
+    with zipfile.ZipFile(path) as archive:
+        _, sheets = _workbook_sheets(archive)
+        for name, part in sheets:
+            if name in links:
+                other = re.escape(links[name].encode("utf-8"))
+                if re.search(rb"(?:'|&apos;)" + other + rb"(?:'|&apos;)!I\d", archive.read(part)):
+                    found.add(name)
+    return found
+
+
+def open_report(path, sheet_names=None, partial=True):
+    """Open a monthly report for writing the given sheets.
+
+    Returns a PartialReport when partial is set, otherwise the full openpyxl workbook.
+    A PartialReport raises UnsupportedReport when the report cannot be patched.
+    """
+    if partial:
+        return PartialReport(path, sheet_names)
+    from openpyxl import load_workbook
+
+    return load_workbook(path)
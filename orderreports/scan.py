@@ -0,0 +1,78 @@
+"""Folder scanning for Daily_Bills/Day_N folders, built on os.scandir.
+
+A scan lists a folder once and keeps each entry's mtime and size from the directory
+listing, so there is no separate stat per file (on Windows, and so on the SMB share,
+scandir returns them with the listing). Each folder's listing is kept as a snapshot
+(folder mtime plus the entry manifest) in the bill store.
+
+Adding, removing or renaming a file changes the folder mtime; overwriting a file in
+place (re-exporting a bill under the same name) does not. A reused snapshot would keep
+the old file's mtime and size, and the new version would be taken as already processed,
+so folders are listed on every scan by default. trust_snapshots = True reuses the
+snapshot of a folder whose mtime is unchanged, for trees where bills are only ever
+added. Even then a snapshot taken within racy_window seconds of the folder's last change
+is not trusted, since a file landing in the same mtime tick would not move the folder mtime.
+"""
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .bills import parse_bill_filename
+
+# Reuse a folder's snapshot while its mtime is unchanged; misses bills overwritten in place
+trust_snapshots = False
+# Seconds; covers coarse folder timestamps on network shares
+racy_window = 2.0
+# Threads listing day folders at once; listing waits on the network, not the CPU
+scan_workers = 4
+
+
+def list_bill_files(folder):
+    """Return [(name, mtime, size)] for the bill files in a folder, in listing order."""
+    entries = []
+    with os.scandir(folder) as listing:
+        for entry in listing:
+            if parse_bill_filename(entry.name)[0]:
+                # DirEntry.stat() reuses what the listing returned where the OS provides it
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_mtime, stat.st_size))
+    return entries
+
+
+def scan_folder(folder, snapshot=None):
+    """Return the folder's snapshot (mtime, scanned_at, entries), or None when it does not exist.
+
+    snapshot is the previous one for the folder, reused while the folder is unchanged.
+    """
+    try:
+        mtime = os.stat(folder).st_mtime
+    except FileNotFoundError:
+        return None
+    if trust_snapshots and snapshot and snapshot[0] == mtime and snapshot[1] - mtime >= racy_window:
+        return snapshot
+
+    # The mtime is read before listing, so a change during the listing shows up on the next scan
+    scanned_at = time.time()
+    try:
+        return mtime, scanned_at, list_bill_files(folder)
+    except FileNotFoundError:
+        return None
+
+
+def scan_folders(folders, store):
+    """Scan several day folders, listing the changed ones on a small thread pool.
+
+    Returns {folder: entries}; a folder that does not exist has no entries.
+    Snapshots are read from and saved to the store.
+    """
+    previous = store.folder_snapshots(folders)
+    if len(folders) > 1 and scan_workers > 1:
+        with ThreadPoolExecutor(max_workers=min(scan_workers, len(folders))) as pool:
+            snapshots = list(pool.map(lambda folder: scan_folder(folder, previous.get(folder)), folders))
+    else:
+        snapshots = [scan_folder(folder, previous.get(folder)) for folder in folders]
+
+    store.save_folder_snapshots([(folder, snapshot) for folder, snapshot in zip(folders, snapshots)
+                                 if snapshot is not None and snapshot is not previous.get(folder)])
+    return {folder: snapshot[2] if snapshot else [] for folder, snapshot in zip(folders, snapshots)}
@@ -0,0 +1,410 @@
+"""Single-writer service: several stations extract bills, one process writes the reports.
+
+`serve` runs a small HTTP server (standard library only) that owns the monthly reports
+and the bill store. Stations run `submit`: they scan and extract their bills locally,
+ask the service which files are already written, and post the extraction results.
+The service records them in its store and writes them from one writer thread. Submissions
+that arrive within batch_window of each other are merged into one load and save per
+report, so extraction scales out across machines while report writes stay serialized.
+
+Bill paths travel relative to the OrderReports root, so stations and the service may
+mount the shared tree at different places. There is no authentication: the service
+listens on loopback unless given another host, and should only be exposed on the
+packing-station LAN.
+
+    POST /processed  {"year", "month", "days"}            -> {"keys": {day: [[path, mtime, size]]}}
+    POST /submit     {"year", "month", "days": [{"day", "bills": [...]}]}  -> {"results": [...]}
+    GET  /status                                          -> {"pending", "jobs"}
+"""
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import metrics
+from .bills import parse_bill_filename
+from .jobs import queued_jobs, run_due_jobs
+from .paths import get_path, get_root
+from .processing import (extract_new_bills, find_new_bill_files, group_days_by_report, print_output,
+                         process_report_days)
+from .scan import scan_folders
+from .store import bill_fields, get_store
+
+default_port = 8765
+# Seconds the writer waits after a submission for others to join its batch
+batch_window = 0.5
+# Seconds between retries of report writes queued behind an open report, while idle
+jobs_interval = 15.0
+# Seconds a station waits for its submission to be written
+submit_timeout = 600
+
+
+class ServiceError(Exception):
+    """The writer service rejected a request or could not be reached."""
+
+
+def service_url(url=None):
+    """Return the writer service URL, from the argument, $ORDER_REPORTS_SERVICE or the loopback default."""
+    return (url or os.environ.get("ORDER_REPORTS_SERVICE") or f"http://127.0.0.1:{default_port}").rstrip("/")
+
+
+def relative_path(path, root=None):
+    """Return a bill path relative to the OrderReports root, with "/" separators."""
+    return os.path.relpath(path, get_root(root)).replace(os.sep, "/")
+
+
+def absolute_path(path, root=None):
+    return os.path.join(get_root(root), *path.split("/"))
+
+
+class _Request:
+    """One call handed from an HTTP thread to the writer thread."""
+
+    def __init__(self, kind, payload):
+        self.kind = kind
+        self.payload = payload
+        self.done = threading.Event()
+        self.result = self.error = None
+
+    def reply(self, result=None, error=None):
+        self.result, self.error = result, error
+        self.done.set()
+
+
+class WriterService:
+    """Owns the bill store and the report files; every read and write of them runs on one thread."""
+
+    def __init__(self, root=None, workers=None, log=print_output):
+        self.root = root
+        self.workers = workers
+        self.log = log
+        self.requests = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="report-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.requests.put(None)  # Wake the writer thread
+        self.thread.join()
+
+    def call(self, kind, payload, timeout=None):
+        """Hand a request to the writer thread and wait for its answer."""
+        request = _Request(kind, payload)
+        self.requests.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"{kind} request not answered within {timeout}s")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                first = self.requests.get(timeout=jobs_interval)
+            except queue.Empty:
+                try:
+                    if queued_jobs():
+                        run_due_jobs(self.workers, self.log)
+                except Exception as e:
+                    self.log(f"Retrying queued writes failed: {e}", "error")
+                continue
+            if first is None:
+                continue
+            if first.kind == "submit":
+                # Let submissions from the other stations join this batch
+                time.sleep(batch_window)
+            batch = [first]
+            while True:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is not None:
+                    batch.append(request)
+            try:
+                self._handle(batch)
+            except Exception as e:
+                # Whatever went wrong, answer every caller and keep the writer thread alive
+                self.log(f"Writer batch failed: {type(e).__name__}: {e}", "error")
+                for request in batch:
+                    if not request.done.is_set():
+                        request.reply(error=e)
+
+    def _handle(self, batch):
+        submissions = [request for request in batch if request.kind == "submit"]
+        for request in batch:
+            if request.kind != "submit":
+                try:
+                    request.reply(getattr(self, f"_{request.kind}")(request.payload))
+                except Exception as e:
+                    request.reply(error=e)
+        if submissions:
+            self._write(submissions)
+
+    def _processed(self, payload):
+        """Return the store keys already written for the given days, with root-relative paths."""
+        _check_month(payload, "bad request")
+        if not isinstance(payload['days'], list) or not all(_is_int(day, 1, 31) for day in payload['days']):
+            raise ServiceError("bad request: days must be a list of days of the month")
+        store = get_store()
+        keys = {}
+        for day in payload['days']:
+            folder = get_path(payload['year'], payload['month'], day, report=False, root=self.root)
+            keys[day] = [[relative_path(path, self.root), mtime, size]
+                         for path, mtime, size in store.processed_keys(folder)]
+        return {'keys': keys}
+
+    def _status(self, payload):
+        return {'pending': self.requests.qsize(), 'jobs': queued_jobs()}
+
+    def _entries(self, payload):
+        """Return the record_extracted entries of a submission; raises ServiceError on a bad one."""
+        _check_submission(payload)
+        year, month = payload['year'], payload['month']
+        entries = []
+        for submitted in payload['days']:
+            day = submitted['day']
+            folder = get_path(year, month, day, report=False, root=self.root)
+            for bill in submitted['bills']:
+                path = absolute_path(bill['path'], self.root)
+                # Only bill files directly inside the day's own folder are accepted
+                if os.path.dirname(path) != folder or not parse_bill_filename(os.path.basename(path))[0]:
+                    raise ServiceError(f"bad submission: {bill['path']} is not a bill file of "
+                                       f"{year}-{month:02d}-{day:02d}")
+                entries.append(((path, bill['mtime'], bill['size']), (year, month, day), bill['bill_number'],
+                                {field: bill['data'].get(field) for field in bill_fields}))
+        return entries
+
+    def _write(self, submissions):
+        """Record the submitted bills, then write each report's days in one load and save."""
+        store = get_store()
+        reports, accepted = {}, []
+        for request in submissions:
+            try:
+                store.record_extracted(self._entries(request.payload))
+            except ServiceError as e:
+                request.reply(error=e)
+                continue
+            payload = request.payload
+            reports.setdefault((payload['year'], payload['month']), set()).update(
+                submitted['day'] for submitted in payload['days'])
+            accepted.append(request)
+
+        results, failed = {}, {}
+        for (year, month), days in sorted(reports.items()):
+            self.log(f"Writing {year}-{month:02d} days {', '.join(map(str, sorted(days)))} "
+                     f"for {len(accepted)} submission(s)...", "badge")
+            try:
+                # The submitted bills are in the store now, so this only re-reads files nobody submitted
+                with metrics.run(f"service {year}-{month:02d}", self.log, root=self.root):
+                    for result in process_report_days(year, month, sorted(days), root=self.root,
+                                                      workers=self.workers, log=self.log):
+                        results[result['date']] = result
+            except Exception as e:
+                self.log(f"Writing {year}-{month:02d} failed: {e}", "error")
+                failed[(year, month)] = e
+
+        for request in accepted:
+            payload = request.payload
+            error = failed.get((payload['year'], payload['month']))
+            if error is not None:
+                request.reply(error=error)
+            else:
+                request.reply({'results': [results[f"{payload['year']}-{payload['month']:02d}-{submitted['day']:02d}"]
+                                           for submitted in payload['days']]})
+
+
+def _is_int(value, low=None, high=None):
+    # bool is an int subclass, but never a valid day, size or month
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and (low is None or value >= low) and (high is None or value <= high))
+
+
+def _check_month(payload, error):
+    if not isinstance(payload, dict):
+        raise ServiceError(f"{error}: expected a JSON object")
+    if not (_is_int(payload.get('year'), 1) and _is_int(payload.get('month'), 1, 12)):
+        raise ServiceError(f"{error}: year and month must be integers")
+    if 'days' not in payload:
+        raise ServiceError(f"{error}: days is missing")
+
+
+def _check_submission(payload):
+    """Raise ServiceError unless a /submit payload has the shape submit_bills sends."""
+    _check_month(payload, "bad submission")
+    if not isinstance(payload['days'], list):
+        raise ServiceError("bad submission: days must be a list")
+    for submitted in payload['days']:
+        if not (isinstance(submitted, dict) and _is_int(submitted.get('day'), 1, 31)
+                and isinstance(submitted.get('bills'), list)):
+            raise ServiceError("bad submission: each day needs an integer day and a list of bills")
+        for bill in submitted['bills']:
+            if not (isinstance(bill, dict) and isinstance(bill.get('path'), str)
+                    and isinstance(bill.get('bill_number'), str)):
+                raise ServiceError("bad submission: each bill needs a path and a bill_number")
+            mtime = bill.get('mtime')
+            # mtime is a float from stat, size an integer
+            if isinstance(mtime, bool) or not isinstance(mtime, (int, float)) or not _is_int(bill.get('size'), 0):
+                raise ServiceError(f"bad submission: {bill['path']} needs a numeric mtime and an integer size")
+            data = bill.get('data')
+            if not isinstance(data, dict) or not all(value is None or isinstance(value, (str, int, float))
+                                                     for value in data.values()):
+                raise ServiceError(f"bad submission: data of {bill['path']} must be an object of plain values")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._answer("status", {})
+        else:
+            self._send(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/processed", "/submit"):
+            self._send(404, {'error': f"unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError as e:
+            self._send(400, {'error': f"invalid JSON: {e}"})
+            return
+        self._answer(self.path[1:], payload)
+
+    def _answer(self, kind, payload):
+        try:
+            self._send(200, self.service.call(kind, payload, submit_timeout))
+        except ServiceError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # Requests are reported through the service log instead
+
+
+def make_server(host="127.0.0.1", port=default_port, root=None, workers=None, log=print_output):
+    """Return a started WriterService and an HTTP server bound to (host, port); port 0 picks a free one."""
+    service = WriterService(root=root, workers=workers, log=log).start()
+    handler = type("Handler", (_Handler,), {'service': service})
+    return service, ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host="127.0.0.1", port=default_port, root=None, workers=None, log=print_output):
+    """Run the writer service until Ctrl+C."""
+    service, server = make_server(host, port, root, workers, log)
+    log(f"Writer service for {get_root(root)} listening on http://{host}:{server.server_address[1]}", "badge")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log("Stopping the writer service.", "badge")
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def _post(url, path, payload=None):
+    request = urllib.request.Request(url + path, data=None if payload is None else json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=submit_timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read())['error']
+        except (ValueError, KeyError):
+            message = e.reason
+        raise ServiceError(f"{url}{path}: {message}")
+    except urllib.error.URLError as e:
+        raise ServiceError(f"cannot reach the writer service at {url}: {e.reason}")
+    except TimeoutError:
+        raise ServiceError(f"{url}{path}: no answer within {submit_timeout}s")
+    except OSError as e:
+        raise ServiceError(f"{url}{path}: connection failed: {e}")
+
+
+class _ServiceState:
+    """The local store for folder snapshots and the extraction cache; the service for what is written."""
+
+    def __init__(self, store, processed):
+        self.store = store
+        self.processed = processed
+
+    def processed_keys(self, folder):
+        return self.processed.get(folder, set())
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def submit_bills(year, month, days, url=None, root=None, workers=None, log=print_output):
+    """Scan and extract the given days of one month here, then have the writer service write them.
+
+    Returns the service's summary dict per day.
+    """
+    url = service_url(url)
+    folders = {day: get_path(year, month, day, report=False, root=root) for day in days}
+    answer = _post(url, "/processed", {'year': year, 'month': month, 'days': days})
+    processed = {folders[int(day)]: {(absolute_path(path, root), mtime, size) for path, mtime, size in keys}
+                 for day, keys in answer['keys'].items()}
+    state = _ServiceState(get_store(), processed)
+
+    with metrics.stage("scan"):
+        listings = scan_folders(list(folders.values()), state)
+    submitted = []
+    for day, folder in folders.items():
+        bill_files = find_new_bill_files(folder, state, None, listings[folder])
+        bills_data = extract_new_bills(bill_files, state, (year, month, day), workers) if bill_files else {}
+        log(f"{year}-{month:02d}-{day:02d}: {len(bills_data)} new bills to submit", "badge")
+        submitted.append({'day': day, 'bills': [
+            {'path': relative_path(bill_files[bill_number]['path'], root), 'mtime': bill_files[bill_number]['mod_time'],
+             'size': bill_files[bill_number]['size'], 'bill_number': bill_number, 'data': data}
+            for bill_number, data in bills_data.items()]})
+
+    started = time.perf_counter()
+    with metrics.stage("submit"):
+        results = _post(url, "/submit", {'year': year, 'month': month, 'days': submitted})['results']
+    log(f"Submitted to {url}, written in {time.perf_counter() - started:.2f}s", "success")
+    return results
+
+
+def submit_range(start, end, url=None, root=None, workers=None, log=print_output, loopback=False):
+    """Submit every day from start to end (dates, inclusive), one request per monthly report.
+
+    With loopback, a writer service is started in this process on a free loopback port,
+    so one machine plays both roles.
+    """
+    server = service = None
+    if loopback:
+        service, server = make_server("127.0.0.1", 0, root=root, workers=workers, log=log)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = []
+    try:
+        with metrics.run(f"submit {start}..{end}", log, root=root):
+            for year, month, days in group_days_by_report(start, end):
+                results.extend(submit_bills(year, month, days, url, root, workers, log))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            service.stop()
+    return results
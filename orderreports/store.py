@@ -0,0 +1,241 @@
+"""SQLite store of bill files: which files were processed and what was extracted from them.
+
+Rows are keyed by (path, mtime, size), so a re-exported bill is a new row while an
+unchanged one is found by an indexed lookup instead of a re-parse. Replaces
+processed_files_record.json, which is imported once the first time the store opens.
+The store also holds the queue of report writes waiting for an open report (see jobs).
+"""
+import json
+import os
+import sqlite3
+import time
+
+from .paths import parse_bill_folder
+
+# Local store in the working directory, like the JSON record it replaces
+bill_store_path = "bill_store.sqlite3"
+processed_files_record = "processed_files_record.json"
+
+bill_fields = ("customer_name", "zone", "box_count", "total_value", "tax_value", "transport_service", "phone")
+job_fields = ("report", "year", "month", "day", "root", "queued_at", "attempts", "next_attempt", "last_error")
+
+_schema = """
+CREATE TABLE IF NOT EXISTS bill_files (
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    folder TEXT NOT NULL,
+    year INTEGER,
+    month INTEGER,
+    day INTEGER,
+    bill_number TEXT,
+    box_count INTEGER,
+    customer_name,
+    zone,
+    phone,
+    total_value,
+    tax_value,
+    transport_service,
+    extracted INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (path, mtime, size)
+);
+CREATE INDEX IF NOT EXISTS bill_files_folder ON bill_files (folder, processed);
+CREATE INDEX IF NOT EXISTS bill_files_month ON bill_files (year, month);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS folder_snapshots (
+    folder TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    scanned_at REAL NOT NULL,
+    entries TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_jobs (
+    report TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    root TEXT,
+    queued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    PRIMARY KEY (report, day)
+);
+"""
+
+# Opened on first use and shared for the rest of the session
+_store = None
+
+
+class BillStore:
+    """Processed-file index and extraction cache for daily bills."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("ORDER_REPORTS_STORE") or bill_store_path
+        # The GUI runs each job on its own worker thread; jobs never overlap
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_schema)
+
+    def close(self):
+        self.conn.close()
+
+    def processed_keys(self, folder):
+        """Return the (path, mtime, size) keys already written to a report from a day folder."""
+        rows = self.conn.execute("SELECT path, mtime, size FROM bill_files WHERE folder = ? AND processed = 1",
+                                 (folder,))
+        return set(rows)
+
+    def cached_bills(self, keys):
+        """Return extracted fields for the given (path, mtime, size) keys that are already in the store."""
+        cached = {}
+        for key in keys:
+            row = self.conn.execute(
+                f"SELECT {', '.join(bill_fields)} FROM bill_files "
+                "WHERE path = ? AND mtime = ? AND size = ? AND extracted = 1", key).fetchone()
+            if row:
+                cached[key] = dict(zip(bill_fields, row))
+        return cached
+
+    def extracted_keys(self, keys):
+        """Return the subset of the given (path, mtime, size) keys whose extraction is in the store."""
+        return {key for key in keys if self.conn.execute(
+            "SELECT 1 FROM bill_files WHERE path = ? AND mtime = ? AND size = ? AND extracted = 1", key).fetchone()}
+
+    def record_extracted(self, entries):
+        """Store extraction results; entries are (key, (year, month, day), bill_number, data) tuples."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO bill_files (path, mtime, size, folder, year, month, day, bill_number, "
+                f"{', '.join(bill_fields)}, extracted, updated_at) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, {', '.join('?' * len(bill_fields))}, 1, ?) "
+                "ON CONFLICT (path, mtime, size) DO UPDATE SET extracted = 1, updated_at = excluded.updated_at, "
+                + ", ".join(f"{field} = excluded.{field}" for field in bill_fields),
+                [(*key, os.path.dirname(key[0]), *date, bill_number, *(data.get(f) for f in bill_fields), now)
+                 for key, date, bill_number, data in entries])
+
+    def mark_processed(self, keys):
+        """Record that the files with the given keys have been written to their report."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO bill_files (path, mtime, size, folder, year, month, day, processed, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (path, mtime, size) DO UPDATE SET processed = 1, updated_at = excluded.updated_at",
+                [(*key, os.path.dirname(key[0]), *(parse_bill_folder(key[0]) or (None, None, None)), now)
+                 for key in keys])
+
+    def folder_snapshots(self, folders):
+        """Return {folder: (mtime, scanned_at, entries)} for the folders that have a snapshot (see scan)."""
+        snapshots = {}
+        for folder in folders:
+            row = self.conn.execute("SELECT mtime, scanned_at, entries FROM folder_snapshots WHERE folder = ?",
+                                    (folder,)).fetchone()
+            if row:
+                snapshots[folder] = (row[0], row[1], [tuple(entry) for entry in json.loads(row[2])])
+        return snapshots
+
+    def save_folder_snapshots(self, snapshots):
+        """Store (folder, (mtime, scanned_at, entries)) snapshots, replacing earlier ones."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO folder_snapshots (folder, mtime, scanned_at, entries) VALUES (?, ?, ?, ?)",
+                [(folder, mtime, scanned_at, json.dumps(entries)) for folder, (mtime, scanned_at, entries) in snapshots])
+
+    def queue_report_days(self, report, year, month, days, root, error, delay, max_delay):
+        """Queue days whose report write has to wait, or requeue them after another failed attempt.
+
+        The first retry is due after delay seconds; each further one waits twice as long, up to max_delay.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO report_jobs (report, day, year, month, root, queued_at, attempts, next_attempt, "
+                "last_error) VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (report, day) DO UPDATE SET attempts = attempts + 1, last_error = excluded.last_error, "
+                "next_attempt = ? + MIN(?, ? * (1 << attempts))",
+                [(report, day, year, month, root, now, now + delay, error, now, max_delay, delay) for day in days])
+
+    def report_jobs(self):
+        """Return the queued report writes as dicts of job_fields, by date."""
+        rows = self.conn.execute(f"SELECT {', '.join(job_fields)} FROM report_jobs ORDER BY year, month, day")
+        return [dict(zip(job_fields, row)) for row in rows]
+
+    def queued_days(self, report):
+        """Return the set of days queued for a report."""
+        return {day for day, in self.conn.execute("SELECT day FROM report_jobs WHERE report = ?", (report,))}
+
+    def dequeue_report_days(self, report, days):
+        """Drop queued jobs for days that have now been written (or had nothing left to write)."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM report_jobs WHERE report = ? AND day = ?",
+                                  [(report, day) for day in days])
+
+    def import_json(self, path=None):
+        """Import a processed_files_record.json once; returns the number of entries imported.
+
+        The JSON record has no file sizes, so each entry is matched against the file on disk.
+        Entries whose file is gone or has changed since are kept with size -1 and never match again.
+        """
+        path = path or processed_files_record
+        if self.get_meta("json_imported") or not os.path.exists(path):
+            return 0
+        with open(path, "r") as file:
+            entries = json.load(file)
+
+        keys = []
+        for bill_path, mtime in entries:
+            try:
+                stat = os.stat(bill_path)
+                size = stat.st_size if stat.st_mtime == mtime else -1
+            except OSError:
+                size = -1
+            keys.append((bill_path, mtime, size))
+        self.mark_processed(keys)
+        self.set_meta("json_imported", os.path.abspath(path))
+        return len(keys)
+
+    def archive_month(self, year, month, archive_path=None):
+        """Move a month's rows out of the store, into archive_path when given; returns the row count."""
+        if archive_path:
+            self.conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        try:
+            with self.conn:
+                if archive_path:
+                    self.conn.execute("CREATE TABLE IF NOT EXISTS archive.bill_files AS "
+                                      "SELECT * FROM main.bill_files WHERE 0")
+                    self.conn.execute("INSERT INTO archive.bill_files SELECT * FROM main.bill_files "
+                                      "WHERE year = ? AND month = ?", (year, month))
+                removed = self.conn.execute("DELETE FROM main.bill_files WHERE year = ? AND month = ?",
+                                            (year, month))
+        finally:
+            if archive_path:
+                self.conn.execute("DETACH DATABASE archive")
+        return removed.rowcount
+
+    def stats(self):
+        """Return row counts per (year, month) with how many of them are processed."""
+        rows = self.conn.execute("SELECT year, month, COUNT(*), SUM(processed) FROM bill_files "
+                                 "GROUP BY year, month ORDER BY year, month")
+        return [{'year': year, 'month': month, 'files': files, 'processed': processed}
+                for year, month, files, processed in rows]
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def get_store():
+    """Return the session's bill store, opening it (and importing the JSON record) on first use."""
+    global _store
+    if _store is None:
+        _store = BillStore()
+        _store.import_json()
+    return _store
@@ -0,0 +1,202 @@
+"""Watch mode: process bill files as they land in today's Daily_Bills/Day_N folder.
+
+The folder is polled with os.scandir. A file counts as arrived when it first shows up, and
+is picked up once its size and mtime have been stable for `settle` seconds and it opens as a
+complete xlsx zip. Every poll that finds ready files runs one micro-batch: one report load,
+one day-sheet update and one save. While the report is open in Excel the files wait, unread;
+a batch that fails is logged and retried with a growing delay instead of stopping the watch.
+"""
+import os
+import time
+import zipfile
+
+from datetime import date
+
+from . import metrics
+from .bills import parse_bill_filename
+from .paths import get_path, is_file_accessible
+from .processing import bill_file_key, print_output, process_report_days
+from .store import get_store
+
+
+def scan_bill_files(folder):
+    """Return {path: (mtime, size)} for the bill files currently in a folder."""
+    found = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if parse_bill_filename(entry.name)[0] and entry.is_file():
+                    stat = entry.stat()
+                    found[entry.path] = (stat.st_mtime, stat.st_size)
+    except FileNotFoundError:
+        pass
+    return found
+
+
+def is_bill_complete(path):
+    """Return True when a bill file can be opened and reads as a complete xlsx zip."""
+    return is_file_accessible(path, "rb") and zipfile.is_zipfile(path)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def latency_summary(latencies):
+    """Return count, mean, p50, p95 and max of arrival-to-written latencies, in seconds."""
+    if not latencies:
+        return {'count': 0}
+    return {
+        'count': len(latencies),
+        'mean_s': round(sum(latencies) / len(latencies), 3),
+        'p50_s': round(_percentile(latencies, 0.5), 3),
+        'p95_s': round(_percentile(latencies, 0.95), 3),
+        'max_s': round(max(latencies), 3),
+    }
+
+
+class BillWatcher:
+    """Polls one day folder at a time and processes stable bill files in micro-batches."""
+
+    def __init__(self, root=None, workers=None, log=print_output, poll_interval=2.0, settle=3.0,
+                 today=date.today, max_backoff=300.0):
+        self.root = root
+        self.workers = workers
+        self.log = log
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.today = today
+        self.day = None
+        # path -> {'mtime', 'size', 'arrived' (wall clock), 'changed' (monotonic)}
+        self.pending = {}
+        self.handled = set()  # Keys written to the report
+        self.skipped = set()  # Keys a batch left unwritten
+        self.batches = []
+        self.latencies = []
+        # After a failed batch, polls before retry_at (monotonic) do nothing; the wait doubles per failure
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.retry_at = 0.0
+        self.report_open = False
+
+    def poll(self):
+        """Scan the folder once and process whatever is ready; returns the batch summary or None."""
+        today = self.today()
+        if today != self.day:
+            # New day: start over on the new folder
+            self.day, self.pending, self.handled, self.skipped = today, {}, set(), set()
+            self.log(f"Watching {get_path(today.year, today.month, today.day, report=False, root=self.root)}",
+                     "badge")
+
+        folder = get_path(today.year, today.month, today.day, report=False, root=self.root)
+        now, wall = time.monotonic(), time.time()
+        current = scan_bill_files(folder)
+        for path, (mtime, size) in current.items():
+            if (path, mtime, size) in self.handled or (path, mtime, size) in self.skipped:
+                continue
+            seen = self.pending.get(path)
+            if seen is None:
+                self.pending[path] = {'mtime': mtime, 'size': size, 'arrived': wall, 'changed': now}
+            elif (seen['mtime'], seen['size']) != (mtime, size):
+                # Still being written or re-exported: restart the settle timer, keep the arrival time
+                seen.update(mtime=mtime, size=size, changed=now)
+        for path in set(self.pending) - set(current):
+            del self.pending[path]
+
+        ready = {path: seen for path, seen in self.pending.items()
+                 if now - seen['changed'] >= self.settle and is_bill_complete(path)}
+        if not ready or now < self.retry_at or self.is_report_open(today):
+            return None
+        try:
+            batch = self.process_batch(today, ready, folder, current)
+        except Exception as e:
+            # The files stay pending; a corrupt report or a database error must not end the watch
+            self.failures += 1
+            delay = min(self.max_backoff, self.poll_interval * 2 ** self.failures)
+            self.retry_at = time.monotonic() + delay
+            self.log(f"Batch failed ({type(e).__name__}: {e}), retrying in {delay:.0f}s.", "error")
+            return None
+        self.failures = 0
+        return batch
+
+    def is_report_open(self, today):
+        """Return True while the day's report is open elsewhere; logs when that starts and ends."""
+        report_path = get_path(today.year, today.month, root=self.root)
+        report_open = os.path.exists(report_path) and not is_file_accessible(report_path, mode="r+")
+        if report_open != self.report_open:
+            self.report_open = report_open
+            self.log(f"File {report_path} is currently open, waiting for it to be closed." if report_open
+                     else f"File {report_path} was closed, writing the waiting bills.", "warning")
+        return report_open
+
+    def process_batch(self, today, ready, folder, current):
+        """Write one micro-batch of ready files to the report and record its latencies.
+
+        current is this poll's scan of the folder; processing selects from it instead of
+        listing the folder again, so it sees the same version of each file as the watcher.
+        """
+        started = time.perf_counter()
+        entries = [(os.path.basename(path), mtime, size) for path, (mtime, size) in current.items()]
+        # Not queued when the report is open: the watcher retries the batch on its next poll anyway
+        with metrics.run(f"watch {today}", self.log, root=self.root):
+            result = process_report_days(today.year, today.month, [today.day], root=self.root,
+                                         workers=self.workers, log=self.log, include=set(ready), queue=False,
+                                         listings={folder: entries})[0]
+        if result['status'] == "report_locked":
+            return None  # Leave the files pending and try again on the next poll
+
+        written = time.time()
+        processed = get_store().processed_keys(folder)
+        skipped = []
+        for path, seen in ready.items():
+            key = bill_file_key({'path': path, 'mod_time': seen['mtime'], 'size': seen['size']})
+            if key in processed:
+                self.handled.add(key)
+            else:
+                # Superseded by a newer file of the same bill, or unreadable: not retried until it changes
+                self.skipped.add(key)
+                skipped.append(os.path.basename(path))
+            del self.pending[path]
+        if skipped:
+            self.log(f"Not written: {', '.join(sorted(skipped))}", "warning")
+        if not result['bills']:
+            return None
+
+        written_numbers = {bill['bill_number'] for bill in result['bills']}
+        latencies = [written - seen['arrived'] for path, seen in ready.items()
+                     if parse_bill_filename(os.path.basename(path))[0] in written_numbers]
+        self.latencies.extend(latencies)
+
+        batch = {'date': result['date'], 'files': len(ready), 'bills_written': len(result['bills']),
+                 'seconds': round(time.perf_counter() - started, 3), 'latency': latency_summary(latencies)}
+        self.batches.append(batch)
+        self.log(f"Batch: {batch['bills_written']} bills written in {batch['seconds']:.2f}s, "
+                 f"arrival-to-written latency mean {batch['latency']['mean_s']:.2f}s, "
+                 f"max {batch['latency']['max_s']:.2f}s", "success")
+        return batch
+
+    def run(self, stop=None, max_batches=None):
+        """Poll until stop (a threading.Event) is set, max_batches have run, or Ctrl+C."""
+        try:
+            while not (stop and stop.is_set()):
+                if self.poll() and max_batches and len(self.batches) >= max_batches:
+                    break
+                if stop:
+                    stop.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            self.log("Stopped watching.", "badge")
+        return self.summary()
+
+    def summary(self):
+        """Return the batches run so far and the overall latency summary."""
+        return {'batches': self.batches, 'latency': latency_summary(self.latencies)}
+
+
+def watch_bills(root=None, workers=None, log=print_output, poll_interval=2.0, settle=3.0, stop=None,
+                max_batches=None):
+    """Watch today's bill folder and process new or modified bills until stopped."""
+    watcher = BillWatcher(root=root, workers=workers, log=log, poll_interval=poll_interval, settle=settle)
+    return watcher.run(stop=stop, max_batches=max_batches)
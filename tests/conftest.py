@@ -0,0 +1,108 @@
+"""Shared fixtures: a synthetic OrderReports tree with its own bill store and history.
+
+Run from the repository root with `python -m pytest`.
+"""
+import os
+import shutil
+import time
+
+import pytest
+
+from benchmarks.synthetic import generate_day
+from orderreports import analytics, metrics, paths, processing, scan, store
+
+YEAR, MONTH = 2024, 11
+
+
+def quiet(message, tag="normal"):
+    pass
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """Return the root of a fresh tree; the store, history and metrics files live next to it."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ORDER_REPORTS_STORE", str(tmp_path / "bill_store.sqlite3"))
+    monkeypatch.setenv("ORDER_REPORTS_ANALYTICS", str(tmp_path / "bill_analytics.sqlite3"))
+    monkeypatch.setattr(store, "_store", None)
+    monkeypatch.setattr(analytics, "_analytics", None)
+    monkeypatch.setattr(metrics, "enabled", False)
+    for module, name in ((processing, "partial_writes"), (processing, "incremental_formatting"),
+                         (processing, "running_totals"), (processing, "queue_locked_reports"),
+                         (scan, "trust_snapshots")):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    root = str(tmp_path / "OrderReports")
+    yield root
+    for opened in (store._store, analytics._analytics):
+        if opened is not None:
+            opened.close()
+
+
+def use_store(monkeypatch, path):
+    """Switch to another bill store file, e.g. to process a copied tree from scratch."""
+    if store._store is not None:
+        store._store.close()
+    monkeypatch.setenv("ORDER_REPORTS_STORE", str(path))
+    monkeypatch.setattr(store, "_store", None)
+
+
+def make_days(root, bills_per_day, seed=0):
+    """Generate bill folders (and the report) for {day: bill count}; returns {day: folder}."""
+    return {day: generate_day(root, YEAR, MONTH, day, bills, seed=seed) for day, bills in bills_per_day.items()}
+
+
+def report_path(root):
+    return paths.get_path(YEAR, MONTH, root=root)
+
+
+def process(root, days, log=quiet, **kwargs):
+    return processing.process_report_days(YEAR, MONTH, days, root=root, workers=1, log=log, **kwargs)
+
+
+def copy_tree(root, name):
+    """Copy a tree next to it, for processing the same bills two ways."""
+    target = os.path.join(os.path.dirname(root), name)
+    shutil.copytree(root, target)
+    return target
+
+
+def sheet_cells(path, day):
+    """Return {coordinate: (value, number format, font colour, bold, fill colour)} for one day sheet."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path)
+    try:
+        return {cell.coordinate: (cell.value, cell.number_format, cell.font.color and cell.font.color.rgb,
+                                  cell.font.b, cell.fill.fill_type and cell.fill.start_color.rgb)
+                for row in wb[str(day)].iter_rows() for cell in row
+                if cell.value is not None or cell.has_style}
+    finally:
+        wb.close()
+
+
+def overwrite_bill(path, extra):
+    """Re-export a bill in place: same name, a different total, a later mtime."""
+    from openpyxl import load_workbook
+
+    before = os.stat(path)
+    wb = load_workbook(path)
+    sheet = wb.active
+    for row in sheet.iter_rows():
+        for cell in row:
+            if isinstance(cell.value, (int, float)) and cell.value > 100:
+                cell.value += extra
+    wb.save(path)
+    os.utime(path, (before.st_atime, before.st_mtime + 10))
+
+
+def age_folder(folder, seconds=60):
+    """Move a folder's mtime into the past, out of the racy window."""
+    mtime = time.time() - seconds
+    os.utime(folder, (mtime, mtime))
+
+
+def overwrite_in_place(folder, path):
+    """Re-export a bill; on the share the folder mtime stays exactly where it was."""
+    stat = os.stat(folder)
+    overwrite_bill(path, 1)
+    os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns))
@@ -0,0 +1,67 @@
+import pytest
+
+from orderreports import address
+from orderreports.address import canonical_province, load_gazetteer, parse_address
+
+
+@pytest.fixture
+def fresh_gazetteer(monkeypatch):
+    """Let a test load sub-districts without leaving them in the shared gazetteer."""
+    monkeypatch.setattr(address.gazetteer, "subdistricts", {})
+    monkeypatch.setattr(address.gazetteer, "_automaton", None)
+    parse_address.cache_clear()
+    yield address.gazetteer
+    parse_address.cache_clear()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("123/4 ม.5 ต.บางพลี อ.เมือง จ.สมุทรปราการ 10540 โทร. 081-234-5678", ("บางพลี / สมุทรปราการ", "081-234-5678")),
+    ("5 หมู่ 3 ตำบลสุเทพ อำเภอเมือง จังหวัดเชียงใหม่ 50200 0812345678", ("สุเทพ / เชียงใหม่", "081-234-5678")),
+    ("5 ต.บางพลีอ.เมืองจ.สมุทรปราการ10540", ("บางพลี / สมุทรปราการ", "N/A")),
+    ("7 Moo 2 T.Suthep A.Mueang Chiang Mai 50200 Tel. 081-234-5678", ("Suthep / Chiang Mai", "081-234-5678")),
+    ("88 ซ.สุขุมวิท 101 แขวงบางจาก กทม. 10260", ("บางจาก / กรุงเทพมหานคร", "N/A")),
+    ("", ("N/A / N/A", "N/A")),
+])
+def test_markers_and_gazetteer(text, expected):
+    assert parse_address(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # เลย is also "very"; ตาก is part of ถ.ตากสิน
+    ("12 ต.ในเมือง ขอนแก่น 40000 ฝากไว้หน้าบ้านเลยครับ", "ในเมือง / ขอนแก่น"),
+    ("10/2 แขวงบุคคโล กรุงเทพฯ 10600 ใกล้วงเวียนใหญ่ ถ.ตากสิน", "บุคคโล / กรุงเทพมหานคร"),
+    # With a marker or at the end of the address they are still the province
+    ("1 ต.ระแหง อ.เมือง ตาก 63000", "ระแหง / ตาก"),
+    ("ตำบลนาอาน อำเภอเมือง เลย 42000", "นาอาน / เลย"),
+    ("3 ต.กุดป่อง จ.เลย ส่งด่วนเลย", "กุดป่อง / เลย"),
+])
+def test_ambiguous_province_names(text, expected):
+    assert parse_address(text)[0] == expected
+
+
+def test_canonical_province_spellings():
+    assert {canonical_province(name) for name in ("จ.สมุทรปราการ", "Samut Prakan", "samut prakarn province",
+                                                  "จังหวัดสมุทรปราการ")} == {"สมุทรปราการ"}
+    assert canonical_province("ตาก 63000") == "ตาก"
+    assert canonical_province("N/A") is None and canonical_province("Atlantis") == "Atlantis"
+
+
+def test_load_gazetteer_adds_subdistricts(tmp_path, fresh_gazetteer):
+    path = tmp_path / "subdistricts.csv"
+    path.write_text("province_th,province_en,subdistrict_th,subdistrict_en\n"
+                    "สมุทรปราการ,Samut Prakan,บางพลีใหญ่,Bang Phli Yai\n"
+                    "เชียงใหม่,Chiang Mai,ช้างคลาน,Chang Khlan\n", encoding="utf-8-sig")
+    # Without the file, a sub-district named without a marker is taken for the province
+    assert parse_address("99 บางพลีใหญ่ 10540")[0] == "N/A / บางพลีใหญ่"
+
+    assert load_gazetteer(str(path)) == 2
+    # The sub-district fills in the province of an address that names only the sub-district
+    assert parse_address("99 บางพลีใหญ่ 10540")[0] == "บางพลีใหญ่ / สมุทรปราการ"
+    assert parse_address("12 Chang Khlan Rd. 50100")[0] == "Chang Khlan / Chiang Mai"
+
+
+def test_load_gazetteer_rejects_missing_columns(tmp_path, fresh_gazetteer):
+    path = tmp_path / "provinces.csv"
+    path.write_text("province_th,province_en\nตาก,Tak\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="subdistrict_th, subdistrict_en"):
+        load_gazetteer(str(path))
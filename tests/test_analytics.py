@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from conftest import MONTH, YEAR, make_days, process, report_path
+from orderreports.analytics import BillAnalytics, bill_record, get_analytics
+
+
+@pytest.fixture
+def history(tmp_path):
+    opened = BillAnalytics(str(tmp_path / "analytics.sqlite3"))
+    yield opened
+    opened.close()
+
+
+def _bill(total, zone="บางพลี / จ.สมุทรปราการ", transport="Kerry / Shopee"):
+    return {'customer_name': "ลูกค้า", 'zone': zone, 'box_count': 1, 'total_value': total, 'tax_value': 0.0,
+            'transport_service': transport, 'phone': None}
+
+
+def test_query_reads_the_latest_row_of_each_bill(history):
+    history.record_day("2024-11-05", [dict(bill_number="111111", **_bill(100.0)),
+                                      dict(bill_number="222222", **_bill(50.0, "Suthep / Chiang Mai",
+                                                                         "Flash / Lazada"))])
+    # 111111 is written again after its bill file changed; only the newer row counts
+    history.record_day("2024-11-05", [dict(bill_number="111111", **_bill(120.0))])
+    history.record_day("2024-12-01", [dict(bill_number="333333", **_bill(10.0))])
+
+    assert history.query(["month"]) == [
+        {'month': "2024-11", 'bills': 2, 'boxes': 2, 'total': 170.0, 'tax': 0.0},
+        {'month': "2024-12", 'bills': 1, 'boxes': 1, 'total': 10.0, 'tax': 0.0}]
+    assert history.query(["platform"], end="2024-11-30") == [
+        {'platform': "Lazada", 'bills': 1, 'boxes': 1, 'total': 50.0, 'tax': 0.0},
+        {'platform': "Shopee", 'bills': 1, 'boxes': 1, 'total': 120.0, 'tax': 0.0}]
+    # Any spelling of a province finds the canonical name it was stored under
+    for spelling in ("สมุทรปราการ", "Samut Prakan", "จ.สมุทรปราการ"):
+        assert [row['total'] for row in history.query(["province"], province=spelling)] == [130.0]
+
+
+def test_provinces_from_older_histories_are_canonicalized(tmp_path):
+    path = str(tmp_path / "analytics.sqlite3")
+    old = BillAnalytics(path)
+    records = [bill_record("2024-11-05", "111111", _bill(100.0), "bill"),
+               bill_record("2024-11-05", "222222", _bill(50.0), "bill")]
+    records[0]['province'], records[1]['province'] = "จ.สมุทรปราการ", "Samut Prakan"
+    old.append(records)
+    old.conn.execute("PRAGMA user_version = 0")
+    old.close()
+
+    history = BillAnalytics(path)
+    try:
+        assert history.query(["province"]) == [
+            {'province': "สมุทรปราการ", 'bills': 2, 'boxes': 2, 'total': 150.0, 'tax': 0.0}]
+    finally:
+        history.close()
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_processing_records_bills_and_backfill_skips_them(tree):
+    make_days(tree, {5: 4, 6: 3})
+    results = process(tree, [5, 6])
+    bills = [bill for result in results for bill in result['bills']]
+    history = get_analytics()
+    totals, = history.query([])
+    assert totals['bills'] == 7 and totals['boxes'] == sum(bill['box_count'] for bill in bills)
+    assert totals['total'] == round(sum(bill['total_value'] for bill in bills), 2)
+
+    assert history.backfill_report(report_path(tree), YEAR, MONTH) == 0
+    history.conn.execute("DELETE FROM bills WHERE date = ?", (f"{YEAR}-{MONTH:02d}-06",))
+    history.conn.commit()
+    assert history.backfill_report(report_path(tree), YEAR, MONTH) == 3
+    assert history.query(["day"])[1]['bills'] == 3
@@ -0,0 +1,107 @@
+import random
+import re
+import zipfile
+
+import pytest
+
+from benchmarks.synthetic import write_bill
+from orderreports import bills
+from orderreports.bill_reader import SHEET_MAIN_NS, read_bill_cells
+from orderreports.bills import load_bill_fields, read_bill_fields
+
+_INLINE = re.compile(r'<c r="([A-Z]+\d+)"([^>]*?) t="inlineStr"><is><t>(.*?)</t></is></c>', re.S)
+
+
+def _rewrite(path, changes, added=None):
+    """Rewrite parts of an xlsx package in place; changes maps part names to str -> str functions."""
+    with zipfile.ZipFile(path) as archive:
+        parts = [(info, archive.read(info.filename)) for info in archive.infolist()]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for info, data in parts:
+            if info.filename in changes:
+                data = changes[info.filename](data.decode("utf-8")).encode("utf-8")
+            archive.writestr(info, data)
+        for name, data in (added or {}).items():
+            archive.writestr(name, data)
+
+
+def _share_strings(path, keep_inline=()):
+    """Move the bill's inline strings (openpyxl's default) into sharedStrings.xml, as Excel saves them."""
+    strings = []
+
+    def share(match):
+        if match[1] in keep_inline:
+            return match[0]
+        strings.append(match[3])
+        return f'<c r="{match[1]}"{match[2]} t="s"><v>{len(strings) - 1}</v></c>'
+
+    _rewrite(path, {"xl/worksheets/sheet1.xml": lambda xml: _INLINE.sub(share, xml)})
+    items = "".join(f'<si><t xml:space="preserve">{text}</t></si>' for text in strings)
+    _rewrite(path, {
+        "xl/_rels/workbook.xml.rels": lambda xml: xml.replace("</Relationships>", (
+            '<Relationship Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+            'sharedStrings" Target="sharedStrings.xml" Id="rIdStrings"/></Relationships>')),
+        "[Content_Types].xml": lambda xml: xml.replace("</Types>", (
+            '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-'
+            'officedocument.spreadsheetml.sharedStrings+xml"/></Types>')),
+    }, {"xl/sharedStrings.xml": f'<sst xmlns="{SHEET_MAIN_NS}" count="{len(strings)}" '
+                                f'uniqueCount="{len(strings)}">{items}</sst>'})
+
+
+def _cell_types(path):
+    with zipfile.ZipFile(path) as archive:
+        xml = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    return {match[0]: match[1] for match in re.findall(r'<c r="(D\d+)"[^>]*? t="(\w+)"', xml)}
+
+
+@pytest.mark.parametrize("strings", ["inline", "shared"])
+@pytest.mark.parametrize("seed", range(10))
+def test_fast_reader_matches_openpyxl(tmp_path, seed, strings):
+    path = str(tmp_path / "12345601.xlsx")
+    write_bill(path, random.Random(seed), "123456")
+    if strings == "shared":
+        _share_strings(path)
+    assert _cell_types(path)["D11"] == ("s" if strings == "shared" else "inlineStr")
+
+    fields = read_bill_cells(path)
+    assert fields == load_bill_fields(path)
+    assert isinstance(fields['address'], str) and isinstance(fields['total_value'], (int, float))
+    assert isinstance(fields['tax_value'], (int, float))
+
+
+def test_mixed_strings_and_empty_cells(tmp_path):
+    from openpyxl import load_workbook
+
+    path = str(tmp_path / "12345601.xlsx")
+    write_bill(path, random.Random(1), "123456")
+    wb = load_workbook(path)
+    sheet = wb["CashSale_th"]
+    sheet["D12"] = None  # No transport
+    tax_row = max(row for row in range(1, sheet.max_row + 1) if sheet[f"J{row}"].value is not None)
+    sheet[f"J{tax_row}"] = None
+    wb.save(path)
+    _share_strings(path, keep_inline={"D9"})
+    types = _cell_types(path)
+    assert (types["D9"], types["D11"]) == ("inlineStr", "s") and "D12" not in types
+
+    fields = read_bill_cells(path)
+    assert fields == load_bill_fields(path)
+    assert fields['transport'] is None and fields['tax_value'] is None
+    assert fields['customer_name'] and fields['address']
+
+
+def test_reader_falls_back_to_openpyxl(tmp_path, monkeypatch):
+    path = str(tmp_path / "12345601.xlsx")
+    write_bill(path, random.Random(2), "123456")
+    _share_strings(path)
+    expected = load_bill_fields(path)
+    # openpyxl finds the shared strings through the content types; the fast reader only follows relationships
+    _rewrite(path, {"xl/_rels/workbook.xml.rels":
+                    lambda xml: re.sub(r'<Relationship [^>]*/sharedStrings"[^>]*/>', "", xml)})
+    with pytest.raises(KeyError):
+        read_bill_cells(path)
+
+    loaded = []
+    monkeypatch.setattr(bills, "load_bill_fields", lambda path: loaded.append(path) or load_bill_fields(path))
+    assert read_bill_fields(path) == expected
+    assert loaded == [path]
@@ -0,0 +1,78 @@
+import concurrent.futures
+import multiprocessing
+import random
+import threading
+import time
+
+import pytest
+
+from benchmarks.synthetic import write_bill
+from orderreports import bills
+from orderreports.bills import Cancelled, iter_bill_fields, read_bill_fields
+
+
+@pytest.fixture
+def bill_paths(tmp_path):
+    paths = []
+    for number in range(40):
+        path = str(tmp_path / f"{100000 + number}01.xlsx")
+        write_bill(path, random.Random(number), str(100000 + number))
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Record the size of each batch handed to the process pool."""
+    sizes = []
+
+    class CountingPool(concurrent.futures.ProcessPoolExecutor):
+        def submit(self, fn, batch, *args, **kwargs):
+            sizes.append(len(batch))
+            return super().submit(fn, batch, *args, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", CountingPool)
+    monkeypatch.setattr(bills, "read_ahead", 8)
+    return sizes
+
+
+def _pool_stopped():
+    deadline = time.monotonic() + 10
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not multiprocessing.active_children()
+
+
+def test_pool_keeps_order_and_bounds_read_ahead(bill_paths, submitted):
+    ahead = []
+    fields = list(iter_bill_fields(bill_paths, workers=2,
+                                   progress=lambda done, total, path: ahead.append(sum(submitted) - done)))
+    assert fields == [read_bill_fields(path) for path in bill_paths]
+    assert sum(submitted) == len(bill_paths) and len(submitted) > 4
+    assert max(ahead) <= bills.read_ahead
+    assert _pool_stopped()
+
+
+def test_cancel_stops_the_pool(bill_paths, submitted):
+    cancel = threading.Event()
+
+    def progress(done, total, path):
+        if done == 3:
+            cancel.set()
+
+    yielded = []
+    with pytest.raises(Cancelled):
+        for fields in iter_bill_fields(bill_paths, workers=2, progress=progress, cancel=cancel):
+            yielded.append(fields)
+    assert len(yielded) == 3
+    # Nothing more is queued once cancelled, and the workers go away
+    assert sum(submitted) <= 3 + bills.read_ahead < len(bill_paths)
+    assert _pool_stopped()
+
+
+def test_consumer_stopping_early_stops_the_pool(bill_paths, submitted):
+    fields = iter_bill_fields(bill_paths, workers=2)
+    assert next(fields) == read_bill_fields(bill_paths[0])
+    fields.close()
+    assert sum(submitted) < len(bill_paths)
+    assert _pool_stopped()
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from conftest import MONTH, YEAR, copy_tree, make_days, overwrite_bill, process, report_path, sheet_cells, use_store
+from orderreports import paths, processing
+
+
+def _two_passes(root, days):
+    """Process the days, then change one bill file of each and add new bills, and process them again."""
+    process(root, days)
+    for day in days:
+        folder = paths.get_path(YEAR, MONTH, day, report=False, root=root)
+        overwrite_bill(os.path.join(folder, sorted(os.listdir(folder))[0]), 7)
+    make_days(root, {day: 3 for day in days}, seed=1)
+    results = process(root, days)
+    assert [(result['rows']['inserted'], result['rows']['updated']) for result in results] == [(3, 1)] * len(days)
+
+
+@pytest.mark.parametrize("totals", ["indirect", "direct", "values"])
+def test_incremental_styling_matches_full_restyle(tree, monkeypatch, totals):
+    make_days(tree, {4: 5, 5: 7, 6: 4})
+    full = copy_tree(tree, "full")
+    monkeypatch.setattr(processing, "running_totals", totals)
+    monkeypatch.setattr(processing, "write_batch", 3)  # Several batches per day
+
+    monkeypatch.setattr(processing, "incremental_formatting", True)
+    _two_passes(tree, [4, 5, 6])
+    monkeypatch.setattr(processing, "incremental_formatting", False)
+    use_store(monkeypatch, "full_store.sqlite3")
+    _two_passes(full, [4, 5, 6])
+
+    for day in (4, 5, 6):
+        assert sheet_cells(report_path(tree), day) == sheet_cells(report_path(full), day), f"sheet {day}"
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from conftest import MONTH, YEAR, make_days, process, quiet, report_path
+from orderreports import bills, processing
+from orderreports.jobs import queued_jobs, run_due_jobs
+from orderreports.store import BillStore, get_store
+
+
+@pytest.fixture
+def bill_store(tmp_path):
+    opened = BillStore(str(tmp_path / "store.sqlite3"))
+    yield opened
+    opened.close()
+
+
+def test_queue_backoff_doubles_up_to_the_cap(bill_store):
+    report = "Monthly_Report_11_2024.xlsx"
+    waits = []
+    for attempt in range(6):
+        started = time.time()
+        bill_store.queue_report_days(report, 2024, 11, [5], "root", f"open {attempt}", 10.0, 60.0)
+        job, = bill_store.report_jobs()
+        assert job['attempts'] == attempt + 1
+        assert job['last_error'] == f"open {attempt}"
+        waits.append(round(job['next_attempt'] - started))
+    assert waits == [10, 20, 40, 60, 60, 60]
+
+
+def test_queue_keeps_days_apart_and_dequeues(bill_store):
+    bill_store.queue_report_days("a.xlsx", 2024, 11, [5, 6], "root", "open", 10.0, 60.0)
+    bill_store.queue_report_days("a.xlsx", 2024, 11, [6], "root", "open", 10.0, 60.0)
+    bill_store.queue_report_days("b.xlsx", 2024, 12, [1], "root", "open", 10.0, 60.0)
+    attempts = {(job['report'], job['day']): job['attempts'] for job in bill_store.report_jobs()}
+    assert attempts == {("a.xlsx", 5): 1, ("a.xlsx", 6): 2, ("b.xlsx", 1): 1}
+
+    assert bill_store.queued_days("a.xlsx") == {5, 6}
+    bill_store.dequeue_report_days("a.xlsx", [5, 6])
+    assert bill_store.queued_days("a.xlsx") == set()
+    assert bill_store.queued_days("b.xlsx") == {1}
+
+
+def test_locked_report_is_queued_then_written_once_closed(tree, monkeypatch):
+    make_days(tree, {5: 4, 6: 3})
+    locked = {report_path(tree)}
+    is_file_accessible = processing.is_file_accessible
+    monkeypatch.setattr(processing, "is_file_accessible", lambda path, mode="r": path not in locked
+                        and is_file_accessible(path, mode))
+    with open(report_path(tree), "rb") as report:
+        before = report.read()
+
+    assert [result['status'] for result in process(tree, [5, 6])] == ["queued", "queued"]
+    assert [(job['day'], job['attempts']) for job in queued_jobs()] == [(5, 1), (6, 1)]
+    # Not due yet; forced while still open, the days are requeued with a longer wait
+    assert run_due_jobs(workers=1, log=quiet) == []
+    assert [result['status'] for result in run_due_jobs(workers=1, log=quiet, force=True)] == ["queued"] * 2
+    assert [job['attempts'] for job in queued_jobs()] == [2, 2]
+    with open(report_path(tree), "rb") as report:
+        assert report.read() == before
+
+    # Closed: the retry writes both days from the store's cache and clears the queue
+    locked.clear()
+    monkeypatch.setattr(bills, "read_bill_fields_timed", lambda path: pytest.fail(f"{path} read again"))
+    for job in queued_jobs():
+        get_store().conn.execute("UPDATE report_jobs SET next_attempt = 0 WHERE day = ?", (job['day'],))
+    get_store().conn.commit()
+    results = run_due_jobs(workers=1, log=quiet)
+    assert [(result['date'], result['status'], len(result['bills'])) for result in results] == [
+        (f"{YEAR}-{MONTH:02d}-05", "updated", 4), (f"{YEAR}-{MONTH:02d}-06", "updated", 3)]
+    assert queued_jobs() == []
+    assert [result['status'] for result in process(tree, [5, 6])] == ["no_new_bills"] * 2
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from conftest import MONTH, YEAR, make_days, quiet
+from orderreports import metrics, processing
+
+
+@pytest.fixture
+def collecting(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "metrics_file", None)
+    ticks = iter(range(1000))
+    # Every clock read advances one second, so each timed block adds exactly 1.0
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: float(next(ticks)))
+
+
+@metrics.timed("parse")
+def _parse(value):
+    return value * 2
+
+
+def test_stages_add_up_within_a_run(collecting, tmp_path):
+    with metrics.run("test", root=str(tmp_path)) as run:
+        with metrics.stage("load"):
+            pass
+        with metrics.stage("load"):
+            pass
+        assert [_parse(value) for value in metrics.timed_iter("extract", [1, 2])] == [2, 4]
+        assert _parse(3) == 6
+        # A nested run joins the outer one instead of starting its own summary
+        with metrics.run("inner") as inner:
+            with metrics.stage("save"):
+                pass
+        assert inner is run
+    # timed_iter times the two items and the final StopIteration
+    assert run.stages == {'load': 2.0, 'extract': 3.0, 'parse': 3.0, 'save': 1.0}
+
+
+def test_hooks_do_nothing_outside_a_run(collecting):
+    with metrics.stage("load"):
+        pass
+    assert list(metrics.timed_iter("extract", [1, 2])) == [1, 2]
+    assert _parse(1) == 2
+    metrics.record_bill("a.xlsx", 0.5)
+    assert metrics.current() is None
+
+
+def test_timed_iter_closes_the_source_when_abandoned(collecting, tmp_path):
+    closed = []
+
+    def source():
+        try:
+            yield from range(5)
+        finally:
+            closed.append(True)
+
+    with metrics.run("test", root=str(tmp_path)):
+        items = metrics.timed_iter("extract", source())
+        assert next(items) == 0
+        items.close()
+        assert closed == [True]
+
+
+def test_run_summary_goes_to_the_root_not_the_working_directory(tree, monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "metrics_file", None)
+    make_days(tree, {5: 3})
+    processing.process_bills_for_day(YEAR, MONTH, 5, root=tree, workers=1, log=quiet)
+    assert not os.path.exists(metrics.metrics_name)
+    with open(os.path.join(tree, metrics.metrics_name), encoding="utf-8") as file:
+        summary, = [json.loads(line) for line in file]
+    assert summary['run'] == f"day {YEAR}-{MONTH:02d}-05" and summary['bills']['count'] == 3
+    assert "extract" in summary['stages']
+
+
+def test_runs_without_extraction_write_nothing(collecting, tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(metrics, "metrics_file", str(path))
+    with metrics.run("test", root=str(tmp_path)):
+        with metrics.stage("load"):
+            pass
+    assert not path.exists()
+    with metrics.run("test", root=str(tmp_path)):
+        with metrics.stage("extract"):
+            pass
+    assert json.loads(path.read_text(encoding="utf-8"))['stages'] == {'extract': 1.0}
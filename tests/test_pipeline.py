@@ -0,0 +1,48 @@
+import os
+
+from conftest import MONTH, YEAR, make_days
+from orderreports import bills
+from orderreports.pipeline import BillRecord, extract_records, parse_records, scan_records, select_latest
+from orderreports.scan import list_bill_files
+from orderreports.store import get_store
+
+
+def _record(name, mtime, folder="/day"):
+    bill_number, box_count = bills.parse_bill_filename(name)
+    return BillRecord(bill_number, box_count, f"{folder}/{name}", mtime, 100)
+
+
+def test_select_latest_keeps_newest_unprocessed_file_per_bill():
+    records = [_record("11111101.xlsx", 10.0), _record("22222201.xlsx", 10.0),
+               _record("11111102.xlsx", 20.0), _record("33333301.xlsx", 10.0)]
+    processed = {records[3].key}
+    selected = select_latest(records, processed)
+    assert [(record.bill_number, record.box_count) for record in selected] == [("111111", 2), ("222222", 1)]
+
+
+def test_select_latest_include_filter():
+    records = [_record("11111101.xlsx", 10.0), _record("22222201.xlsx", 10.0)]
+    assert [record.bill_number for record in select_latest(records, set(), {"/day/22222201.xlsx"})] == ["222222"]
+
+
+def test_stages_read_each_file_once_and_keep_order(tree, monkeypatch):
+    folder = make_days(tree, {5: 6})[5]
+    store = get_store()
+    date = (YEAR, MONTH, 5)
+
+    def run():
+        selected = select_latest(scan_records(folder, list_bill_files(folder)), set())
+        return list(parse_records(extract_records(selected, store, workers=1), store, date))
+
+    first = run()
+    assert len(first) == 6 and all(record.complete and record.fields is None for record in first)
+    assert store.extracted_keys([record.key for record in first]) == {record.key for record in first}
+
+    # The second pass comes from the store's cache, in the same order with the same data
+    reads = []
+    monkeypatch.setattr(bills, "read_bill_fields_timed", lambda path: reads.append(path))
+    second = run()
+    assert reads == []
+    assert [(record.bill_number, record.data()) for record in second] == \
+        [(record.bill_number, record.data()) for record in first]
+    assert all(os.path.dirname(record.path) == folder for record in second)
@@ -0,0 +1,113 @@
+import pytest
+
+from conftest import MONTH, YEAR, copy_tree, make_days, process, quiet, report_path, sheet_cells, use_store
+from orderreports import processing
+from orderreports.rebuild import compare_sheet, rebuild_days, verify_days
+
+
+def _verify(root, days):
+    return {result['date'][-2:].lstrip("0"): result for result in verify_days(YEAR, MONTH, days, root=root,
+                                                                               workers=1, log=quiet)}
+
+
+def _corrupt(path):
+    """Hand edits: a changed amount, a deleted bill row, an empty row and a stray bill."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path)
+    wb["5"]["G6"] = 999999
+    wb["6"].delete_rows(7, 1)
+    wb["7"].insert_rows(6, 2)
+    wb["7"]["C7"] = "999999"
+    wb.save(path)
+
+
+def test_verify_passes_after_processing(tree):
+    make_days(tree, {5: 6, 6: 5})
+    process(tree, [5, 6])
+    results = _verify(tree, [4, 5, 6])
+    assert results["4"]['status'] == "no_bills"
+    assert results["5"]['status'] == results["6"]['status'] == "ok"
+
+
+def test_verify_reports_differences_without_writing(tree):
+    make_days(tree, {5: 6, 6: 5, 7: 4})
+    process(tree, [5, 6, 7])
+    _corrupt(report_path(tree))
+    with open(report_path(tree), "rb") as report:
+        before = report.read()
+
+    results = _verify(tree, [5, 6, 7])
+    assert all(result['status'] == "differences" for result in results.values())
+    assert any(difference.startswith("G6:") for difference in results["5"]['differences'])
+    assert any(difference.endswith(": missing") for difference in results["6"]['differences'])
+    assert "C6: empty row in the data block" in results["7"]['differences']
+    assert any("999999 has no bill file" in difference for difference in results["7"]['differences'])
+    with open(report_path(tree), "rb") as report:
+        assert report.read() == before
+
+
+@pytest.mark.parametrize("totals", ["indirect", "direct", "values"])
+def test_rebuild_matches_processing_and_verify_agrees(tree, monkeypatch, totals):
+    monkeypatch.setattr(processing, "running_totals", totals)
+    make_days(tree, {5: 6, 6: 5, 7: 4})
+    expected = copy_tree(tree, "expected")
+    process(tree, [5, 6, 7])
+    _corrupt(report_path(tree))
+
+    results = rebuild_days(YEAR, MONTH, [5, 6, 7], root=tree, workers=1, log=quiet)
+    assert [result['status'] for result in results] == ["rebuilt"] * 3
+    assert all(result['status'] == "ok" for result in _verify(tree, [5, 6, 7]).values())
+    # Nothing is left for normal processing: every bill file is marked processed
+    assert [result['status'] for result in process(tree, [5, 6, 7])] == ["no_new_bills"] * 3
+
+    use_store(monkeypatch, "expected_store.sqlite3")
+    process(expected, [5, 6, 7])
+    for day in (5, 6, 7):
+        assert sheet_cells(report_path(tree), day) == sheet_cells(report_path(expected), day), f"sheet {day}"
+
+
+def test_rebuild_of_unprocessed_report_matches_processing(tree, monkeypatch):
+    make_days(tree, {5: 7})
+    expected = copy_tree(tree, "expected")
+    rebuild_days(YEAR, MONTH, [5], root=tree, workers=1, log=quiet)
+    use_store(monkeypatch, "expected_store.sqlite3")
+    process(expected, [5])
+    assert sheet_cells(report_path(tree), 5) == sheet_cells(report_path(expected), 5)
+
+
+def test_rebuild_leaves_days_without_bills_alone(tree):
+    make_days(tree, {5: 3})
+    results = rebuild_days(YEAR, MONTH, [4, 5], root=tree, workers=1, log=quiet)
+    assert [result['status'] for result in results] == ["no_bills", "rebuilt"]
+
+
+def test_compare_sheet_ignores_an_untouched_template():
+    rows = [(None,) * 14, (None, None, None, None, None, "=SUM(F5:F5)")]
+    assert compare_sheet(rows, []) == []
+
+
+def _break_running_total(path, day, totals):
+    """Point a running total at the wrong day, or change its value; returns the cell changed."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path)
+    sheet = wb[str(day)]
+    row = next(row for row in range(5, sheet.max_row + 1) if sheet[f"E{row}"].value == "Shopee")
+    cell = sheet[f"I{row}"]
+    cell.value = cell.value + 1 if totals == "values" else f"=H{row}"
+    wb.save(path)
+    return cell.coordinate
+
+
+@pytest.mark.parametrize("totals", ["indirect", "direct", "values"])
+def test_verify_checks_the_running_totals(tree, monkeypatch, totals):
+    monkeypatch.setattr(processing, "running_totals", totals)
+    make_days(tree, {5: 6, 6: 5})
+    process(tree, [5, 6])
+    assert all(result['status'] == "ok" for result in _verify(tree, [5, 6]).values())
+
+    cell = _break_running_total(report_path(tree), 6, totals)
+    results = _verify(tree, [5, 6])
+    assert results["5"]['status'] == "ok"
+    assert [difference.split(":")[0] for difference in results["6"]['differences']] == [cell]
@@ -0,0 +1,75 @@
+import zipfile
+
+import pytest
+
+from conftest import copy_tree, make_days, process, report_path, sheet_cells, use_store
+from orderreports import processing
+from orderreports.report_zip import PartialReport, UnsupportedReport, open_report
+
+
+@pytest.mark.parametrize("totals", ["indirect", "direct"])
+def test_partial_save_matches_full_save(tree, monkeypatch, totals):
+    make_days(tree, {5: 12, 6: 8})
+    full = copy_tree(tree, "full")
+    monkeypatch.setattr(processing, "running_totals", totals)
+
+    monkeypatch.setattr(processing, "partial_writes", True)
+    assert [r['status'] for r in process(tree, [5, 6])] == ["updated", "updated"]
+    # The second tree needs its own store, or its bills count as processed already
+    monkeypatch.setattr(processing, "partial_writes", False)
+    use_store(monkeypatch, "full_store.sqlite3")
+    assert [r['status'] for r in process(full, [5, 6])] == ["updated", "updated"]
+
+    for day in range(1, 32):
+        assert sheet_cells(report_path(tree), day) == sheet_cells(report_path(full), day), f"sheet {day}"
+
+
+def test_partial_save_leaves_other_sheets_untouched(tree):
+    make_days(tree, {5: 5})
+    with zipfile.ZipFile(report_path(tree)) as archive:
+        before = {name: archive.read(name) for name in archive.namelist()}
+    process(tree, [5])
+    with zipfile.ZipFile(report_path(tree)) as archive:
+        after = {name: archive.read(name) for name in archive.namelist()}
+
+    assert set(before) == set(after)
+    changed = {name for name in before if before[name] != after[name]}
+    assert changed and all(not name.startswith("xl/worksheets/") or name.endswith("sheet5.xml")
+                           for name in changed)
+
+
+def _add_conditional_format(path, day):
+    from openpyxl import load_workbook
+    from openpyxl.formatting.rule import CellIsRule
+    from openpyxl.styles import Font
+
+    wb = load_workbook(path)
+    wb[str(day)].conditional_formatting.add("G5:G50", CellIsRule(operator="greaterThan", formula=["1000"],
+                                                                 font=Font(bold=True)))
+    wb.save(path)
+
+
+def test_conditional_formatting_is_unsupported(tree):
+    make_days(tree, {5: 3})
+    _add_conditional_format(report_path(tree), 5)
+    with pytest.raises(UnsupportedReport):
+        PartialReport(report_path(tree), {"5"})
+    # Sheets without it can still be patched
+    open_report(report_path(tree), {"6"}).close()
+
+
+def test_unsupported_report_falls_back_to_full_save(tree, monkeypatch):
+    make_days(tree, {5: 6})
+    expected = copy_tree(tree, "expected")
+    _add_conditional_format(report_path(tree), 5)
+    _add_conditional_format(report_path(expected), 5)
+
+    messages = []
+    results = process(tree, [5], log=lambda message, tag="normal": messages.append(message))
+    assert results[0]['status'] == "updated" and len(results[0]['bills']) == 6
+    assert any("Partial save not possible" in message for message in messages)
+
+    monkeypatch.setattr(processing, "partial_writes", False)
+    use_store(monkeypatch, "expected_store.sqlite3")
+    process(expected, [5])
+    assert sheet_cells(report_path(tree), 5) == sheet_cells(report_path(expected), 5)
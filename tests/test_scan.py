@@ -0,0 +1,65 @@
+import os
+
+from conftest import age_folder, make_days, overwrite_in_place, process
+from orderreports import scan
+from orderreports.scan import list_bill_files, scan_folder, scan_folders
+from orderreports.store import get_store
+
+
+def test_list_bill_files_skips_other_files(tree):
+    folder = make_days(tree, {5: 3})[5]
+    open(os.path.join(folder, "notes.txt"), "w").close()
+    open(os.path.join(folder, "~$12345601.xlsx"), "w").close()
+    names = {name for name, _, _ in list_bill_files(folder)}
+    assert len(names) == 3 and all(name.endswith(".xlsx") and name[:6].isdigit() for name in names)
+
+
+def test_missing_folder_has_no_entries(tree):
+    assert scan_folder(os.path.join(tree, "nowhere")) is None
+    folder = os.path.join(tree, "nowhere")
+    assert scan_folders([folder], get_store()) == {folder: []}
+
+
+def test_snapshots_are_not_reused_by_default(tree):
+    folder = make_days(tree, {5: 3})[5]
+    age_folder(folder)
+    snapshot = scan_folder(folder)
+    assert scan_folder(folder, snapshot) is not snapshot
+
+
+def test_trusted_snapshot_reused_only_while_folder_unchanged(tree, monkeypatch):
+    monkeypatch.setattr(scan, "trust_snapshots", True)
+    folder = make_days(tree, {5: 3})[5]
+    age_folder(folder)
+    snapshot = scan_folder(folder)
+    assert scan_folder(folder, snapshot) is snapshot
+
+    # A new file moves the folder mtime, which invalidates the snapshot
+    name = next(iter(os.listdir(folder)))
+    with open(os.path.join(folder, name), "rb") as source, open(os.path.join(folder, "99999901.xlsx"), "wb") as copy:
+        copy.write(source.read())
+    rescanned = scan_folder(folder, snapshot)
+    assert rescanned is not snapshot and len(rescanned[2]) == 4
+
+
+def test_snapshot_in_racy_window_is_not_trusted(tree, monkeypatch):
+    monkeypatch.setattr(scan, "trust_snapshots", True)
+    folder = make_days(tree, {5: 3})[5]
+    snapshot = scan_folder(folder)  # Taken right after the folder changed
+    assert snapshot[1] - snapshot[0] < scan.racy_window
+    assert scan_folder(folder, snapshot) is not snapshot
+
+
+def test_bill_overwritten_in_place_is_written_again(tree):
+    folder = make_days(tree, {5: 4})[5]
+    assert len(process(tree, [5])[0]['bills']) == 4
+    age_folder(folder)
+    assert process(tree, [5])[0]['status'] == "no_new_bills"  # Saves a snapshot outside the racy window
+
+    path = os.path.join(folder, sorted(os.listdir(folder))[0])
+    overwrite_in_place(folder, path)
+
+    result = process(tree, [5])[0]
+    assert result['status'] == "updated"
+    assert result['rows'] == {'inserted': 0, 'updated': 1, 'unchanged': 0}
+
@@ -0,0 +1,73 @@
+import threading
+
+from datetime import date
+
+import pytest
+
+from conftest import MONTH, YEAR, make_days, quiet
+from orderreports import service
+
+
+@pytest.fixture
+def writer(tree):
+    writer_service, server = service.make_server("127.0.0.1", 0, root=tree, workers=1, log=quiet)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield writer_service, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    writer_service.stop()
+
+
+def _bill(**changes):
+    bill = {'path': f"Year_{YEAR}/Month_{MONTH}/Daily_Bills/Day_5/12345601.xlsx", 'mtime': 1700000000.5,
+            'size': 2048, 'bill_number': "123456", 'data': {'total_value': 107.0}}
+    bill.update(changes)
+    return {'year': YEAR, 'month': MONTH, 'days': [{'day': 5, 'bills': [bill]}]}
+
+
+@pytest.mark.parametrize("payload", [
+    _bill(data=[1]),
+    _bill(size="2048"),
+    _bill(mtime=None),
+    _bill(path="../../elsewhere/12345601.xlsx"),
+    {'year': YEAR, 'month': 13, 'days': []},
+    {'year': YEAR, 'month': MONTH, 'days': [{'day': "5", 'bills': []}]},
+    [1, 2],
+])
+def test_bad_submission_is_rejected_and_writer_keeps_running(writer, payload):
+    writer_service, url = writer
+    with pytest.raises(service.ServiceError, match="bad submission"):
+        service._post(url, "/submit", payload)
+    assert writer_service.thread.is_alive()
+    assert service._post(url, "/status") == {'pending': 0, 'jobs': []}
+
+
+def test_failed_batch_answers_every_caller(writer, monkeypatch):
+    writer_service, url = writer
+    monkeypatch.setattr(writer_service, "_write", lambda submissions: 1 / 0)
+    with pytest.raises(service.ServiceError, match="ZeroDivisionError"):
+        service._post(url, "/submit", {'year': YEAR, 'month': MONTH, 'days': []})
+    assert writer_service.thread.is_alive()
+    assert service._post(url, "/processed", {'year': YEAR, 'month': MONTH, 'days': [5]}) == {'keys': {'5': []}}
+
+
+def test_submitted_bills_are_written(tree, writer):
+    make_days(tree, {5: 4})
+    _, url = writer
+    results = service.submit_range(date(YEAR, MONTH, 5), date(YEAR, MONTH, 5), url=url, root=tree, workers=1,
+                                   log=quiet)
+    assert results[0]['status'] == "updated" and len(results[0]['bills']) == 4
+
+
+def test_unanswered_request_times_out_as_service_error(monkeypatch):
+    import socket
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    monkeypatch.setattr(service, "submit_timeout", 0.5)
+    try:
+        with pytest.raises(service.ServiceError, match="no answer"):
+            service._post(f"http://127.0.0.1:{listener.getsockname()[1]}", "/status")
+    finally:
+        listener.close()
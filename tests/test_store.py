@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+from orderreports.store import BillStore
+
+
+@pytest.fixture
+def bill_store(tmp_path):
+    opened = BillStore(str(tmp_path / "store.sqlite3"))
+    yield opened
+    opened.close()
+
+
+def test_processed_and_extracted_keys(bill_store, tmp_path):
+    folder = str(tmp_path / "Day_5")
+    key = (os.path.join(folder, "12345601.xlsx"), 1700000000.5, 2048)
+    data = {'customer_name': "ลูกค้า", 'zone': "บางพลี / สมุทรปราการ", 'box_count': 1, 'total_value': 107.0,
+            'tax_value': 7.0, 'transport_service': "Kerry / Shopee", 'phone': "081-234-5678"}
+    bill_store.record_extracted([(key, (2024, 11, 5), "123456", data)])
+    assert bill_store.extracted_keys([key, (key[0], key[1] + 1, key[2])]) == {key}
+    assert bill_store.cached_bills([key]) == {key: data}
+    assert bill_store.processed_keys(folder) == set()
+
+    bill_store.mark_processed([key])
+    assert bill_store.processed_keys(folder) == {key}
+
+
+def test_json_record_is_imported_once(bill_store, tmp_path):
+    folder = tmp_path / "Day_5"
+    folder.mkdir()
+    unchanged, changed = folder / "12345601.xlsx", folder / "22222201.xlsx"
+    unchanged.write_bytes(b"bill")
+    changed.write_bytes(b"bill")
+    record = tmp_path / "processed_files_record.json"
+    record.write_text(json.dumps([[str(unchanged), os.stat(unchanged).st_mtime],
+                                  [str(changed), os.stat(changed).st_mtime - 5],
+                                  [str(folder / "gone.xlsx"), 1.0]]))
+
+    assert bill_store.import_json(str(record)) == 3
+    assert bill_store.processed_keys(str(folder)) == {
+        (str(unchanged), os.stat(unchanged).st_mtime, 4),
+        (str(changed), os.stat(changed).st_mtime - 5, -1),
+        (str(folder / "gone.xlsx"), 1.0, -1)}
+    assert bill_store.import_json(str(record)) == 0
+
+
+def test_folder_snapshots_round_trip(bill_store, tmp_path):
+    folder = str(tmp_path / "Day_5")
+    snapshot = (1700000000.0, 1700000100.0, [("12345601.xlsx", 1700000000.5, 2048)])
+    bill_store.save_folder_snapshots([(folder, snapshot)])
+    assert bill_store.folder_snapshots([folder, str(tmp_path / "Day_6")]) == {folder: snapshot}
+
+    newer = (1700000200.0, 1700000300.0, [])
+    bill_store.save_folder_snapshots([(folder, newer)])
+    assert bill_store.folder_snapshots([folder]) == {folder: newer}
@@ -0,0 +1,110 @@
+import re
+
+import pytest
+
+from conftest import copy_tree, make_days, process, report_path, use_store
+from orderreports import processing, report
+from orderreports.report import summary_labels
+
+_SUMIF = re.compile(r'SUMIF\(L5:L(\d+),"(\w+)",([A-Z])5:[A-Z](\d+)\)')
+_INDIRECT = re.compile(r'''SUMIF\(INDIRECT\("'(\d+)'!E:E"\), "(\w+)", INDIRECT\("'\d+'!I:I"\)\)''')
+_REF = re.compile(r"(?:'(\d+)'!)?([A-Z])(\d+)")
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def evaluate(wb, sheet, ref):
+    """Evaluate the summary formulas processing writes, as Excel would."""
+    value = wb[sheet][ref].value
+    if not (isinstance(value, str) and value.startswith("=")):
+        return _number(value)
+    total = 0
+    for term in value[1:].split("+"):
+        term = term.strip()
+        if match := _SUMIF.fullmatch(term):
+            end, label, col, _ = match.groups()
+            ws = wb[sheet]
+            total += sum(evaluate(wb, sheet, f"{col}{row}") for row in range(5, int(end) + 1)
+                         if str(ws[f"L{row}"].value).lower() == label.lower())
+        elif match := _INDIRECT.fullmatch(term):
+            other, label = match.groups()
+            ws = wb[other]
+            total += sum(evaluate(wb, other, f"I{row}") for row in range(1, ws.max_row + 1)
+                         if ws[f"E{row}"].value == label)
+        elif match := _REF.fullmatch(term):
+            other, col, row = match.groups()
+            total += evaluate(wb, other or sheet, f"{col}{row}")
+        else:
+            raise AssertionError(f"{sheet}!{ref}: cannot evaluate {term!r}")
+    return total
+
+
+def summary_values(path, days):
+    """Return {(day, label, column): value} for the summary rows, evaluated."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path)
+    try:
+        values = {}
+        for day in days:
+            layout = report.read_layout(wb[str(day)])
+            for label in summary_labels:
+                for col in "FGHI":
+                    values[day, label, col] = round(evaluate(wb, str(day), f"{col}{layout.label_rows[label]}"), 2)
+        return values
+    finally:
+        wb.close()
+
+
+def _run(root, totals, monkeypatch):
+    """Process days out of order, then a second pass that adds bills to the first day."""
+    monkeypatch.setattr(processing, "running_totals", totals)
+    process(root, [5])
+    process(root, [7, 6])
+    make_days(root, {5: 4}, seed=1)
+    process(root, [5])
+
+
+def test_direct_and_values_match_indirect(tree, monkeypatch):
+    make_days(tree, {5: 6, 6: 5, 7: 4})
+    trees = {totals: copy_tree(tree, totals) for totals in ("direct", "values")}
+    _run(tree, "indirect", monkeypatch)
+    expected = summary_values(report_path(tree), [5, 6, 7])
+    assert expected[7, "Grand total", "I"] > expected[6, "Grand total", "I"] > expected[5, "Grand total", "I"] > 0
+
+    for totals, root in trees.items():
+        use_store(monkeypatch, f"{totals}_store.sqlite3")
+        _run(root, totals, monkeypatch)
+        assert summary_values(report_path(root), [5, 6, 7]) == expected, totals
+
+
+@pytest.mark.parametrize("partial", [True, False])
+def test_direct_references_are_repointed_in_other_modes(tree, monkeypatch, partial):
+    make_days(tree, {5: 6, 6: 5})
+    expected = copy_tree(tree, "expected")
+    monkeypatch.setattr(processing, "partial_writes", partial)
+    monkeypatch.setattr(processing, "running_totals", "direct")
+    process(tree, [5, 6])
+    # Switching modes: new rows on day 5 move its total rows, which day 6 still refers to directly
+    monkeypatch.setattr(processing, "running_totals", "indirect")
+    make_days(tree, {5: 4}, seed=1)
+    process(tree, [5])
+
+    use_store(monkeypatch, "expected_store.sqlite3")
+    make_days(expected, {5: 4}, seed=1)
+    process(expected, [5, 6])
+    assert summary_values(report_path(tree), [5, 6]) == summary_values(report_path(expected), [5, 6])
+
+
+def test_month_totals_are_written_once_per_report(tree, monkeypatch):
+    make_days(tree, {5: 5, 6: 5, 7: 5})
+    monkeypatch.setattr(processing, "running_totals", "values")
+    monkeypatch.setattr(processing, "write_batch", 2)
+    calls = []
+    write_month_totals = report.write_month_totals
+    monkeypatch.setattr(report, "write_month_totals", lambda wb, from_day: (calls.append(from_day),
+                                                                             write_month_totals(wb, from_day)))
+    process(tree, [5, 6, 7])
+    assert calls == [5]
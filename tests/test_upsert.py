@@ -0,0 +1,71 @@
+import os
+
+from conftest import make_days, overwrite_bill, process, report_path, sheet_cells
+from orderreports.report import build_bill_index, fill_bill_rows, style_platform_rows, upsert_bill_rows
+
+
+def _data(total, transport="Kerry / Shopee"):
+    return {'customer_name': "ลูกค้า", 'zone': "บางพลี / สมุทรปราการ", 'box_count': 1, 'total_value': total,
+            'tax_value': round(total * 7 / 107, 2), 'transport_service': transport, 'phone': "0812345678"}
+
+
+def _sheet(bills_data):
+    from openpyxl import Workbook
+
+    sheet = Workbook().active
+    fill_bill_rows(sheet, 5, bills_data)
+    style_platform_rows(sheet, 5, 4 + len(bills_data))
+    return sheet
+
+
+def test_bill_numbers_match_across_formats():
+    # Typed into Excel, bill numbers lose their leading zero or become floats
+    sheet = _sheet({12345: _data(100.0), 234567.0: _data(200.0), "345678": _data(300.0)})
+    index = build_bill_index(sheet)
+    assert index == {"12345": 5, "234567": 6, "345678": 7}
+
+    new_bills, updated, unchanged = upsert_bill_rows(
+        sheet, {"012345": _data(150.0), "234567": _data(200.0), "345678 ": _data(300.0, "Flash / Lazada"),
+                "456789": _data(400.0)}, index)
+    assert list(new_bills) == ["456789"]
+    assert updated == ["012345", "345678 "] and unchanged == ["234567"]
+    # The row keeps the bill number as the sheet had it
+    assert (sheet["C5"].value, sheet["G5"].value) == (12345, 150.0)
+    assert sheet["C7"].value == "345678" and sheet["K7"].value == "Flash / Lazada"
+    # The old platform styling is cleared, for process_sheet to apply the new one
+    assert sheet["L7"].value is None and all(sheet[f"{col}7"].fill.fill_type is None for col in "IJKL")
+    assert sheet["L6"].value == "Shopee" and sheet["I6"].fill.fill_type == "solid"
+
+
+def test_duplicate_bill_number_updates_one_row():
+    sheet = _sheet({"111111": _data(100.0), "222222": _data(200.0)})
+    sheet["C6"] = "111111"  # Typed in twice by hand
+    index = build_bill_index(sheet)
+    assert index == {"111111": 6}
+
+    new_bills, updated, _ = upsert_bill_rows(sheet, {"111111": _data(120.0)}, index)
+    assert new_bills == {} and updated == ["111111"]
+    assert (sheet["G5"].value, sheet["G6"].value) == (100.0, 120.0)
+
+
+def test_changed_bill_file_updates_its_row_in_place(tree):
+    folder = make_days(tree, {5: 6})[5]
+    process(tree, [5])
+    before = sheet_cells(report_path(tree), 5)
+
+    path = os.path.join(folder, sorted(os.listdir(folder))[2])
+    overwrite_bill(path, 5)
+    result, = process(tree, [5])
+    assert result['rows'] == {'inserted': 0, 'updated': 1, 'unchanged': 0}
+    bill, = result['bills']
+
+    after = sheet_cells(report_path(tree), 5)
+    rows = [coordinate for coordinate, cell in after.items() if coordinate[0] == "C" and cell[0] is not None
+            and str(cell[0]) == bill['bill_number']]
+    assert len(rows) == 1
+    row = rows[0][1:]
+    assert after[f"G{row}"][0] == bill['total_value'] != before[f"G{row}"][0]
+    # Nothing else moves: the other rows, the summary rows and their formulas are as they were
+    assert set(after) == set(before)
+    assert {coordinate for coordinate in after if after[coordinate] != before[coordinate]} <= {
+        f"{col}{row}" for col in "ABCDEFGHIJKLMN"}
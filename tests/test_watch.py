@@ -0,0 +1,79 @@
+import os
+
+from datetime import date
+
+import pytest
+
+from conftest import MONTH, YEAR, age_folder, make_days, overwrite_in_place, quiet
+from orderreports import paths, scan, watch
+from orderreports.watch import BillWatcher
+
+
+def _watcher(tree, log=quiet):
+    return BillWatcher(root=tree, workers=1, log=log, poll_interval=0.01, settle=0,
+                       today=lambda: date(YEAR, MONTH, 5))
+
+
+def test_watcher_writes_bill_overwritten_in_place(tree, monkeypatch):
+    # Even with trusted snapshots, a watch batch selects from the watcher's own scan
+    monkeypatch.setattr(scan, "trust_snapshots", True)
+    folder = make_days(tree, {5: 3})[5]
+    age_folder(folder)
+    watcher = _watcher(tree)
+    assert watcher.poll()['bills_written'] == 3
+
+    path = os.path.join(folder, sorted(os.listdir(folder))[0])
+    overwrite_in_place(folder, path)
+    watcher.poll()  # Sees the new version; with no settle time it is ready at once
+    assert len(watcher.batches) == 2 and watcher.batches[-1]['bills_written'] == 1
+    assert (path, os.stat(path).st_mtime, os.stat(path).st_size) in watcher.handled
+    assert watcher.poll() is None
+
+
+def test_failed_batch_keeps_files_pending_and_backs_off(tree, monkeypatch):
+    make_days(tree, {5: 3})
+    messages = []
+    watcher = _watcher(tree, log=lambda message, tag="normal": messages.append((tag, message)))
+    process_report_days = watch.process_report_days
+
+    def broken(*args, **kwargs):
+        raise OSError("disk error")
+
+    monkeypatch.setattr(watch, "process_report_days", broken)
+    assert watcher.poll() is None
+    assert ("error", "Batch failed (OSError: disk error), retrying in 0s.") in messages
+    assert len(watcher.pending) == 3 and not watcher.handled
+    assert watcher.failures == 1 and watcher.retry_at > 0
+
+    # Polls before the retry time leave the batch alone, then it goes through
+    monkeypatch.setattr(watch, "process_report_days", process_report_days)
+    monkeypatch.setattr(watcher, "retry_at", watcher.retry_at + 60)
+    assert watcher.poll() is None and len(watcher.pending) == 3
+    watcher.retry_at = 0.0
+    assert watcher.poll()['bills_written'] == 3
+    assert watcher.failures == 0 and not watcher.pending
+
+
+def test_open_report_is_not_extracted_every_poll(tree, monkeypatch):
+    make_days(tree, {5: 3})
+    report_path = paths.get_path(YEAR, MONTH, root=tree)
+    is_file_accessible = watch.is_file_accessible
+    monkeypatch.setattr(watch, "is_file_accessible", lambda path, mode="r": path != report_path
+                        and is_file_accessible(path, mode))
+    batches = []
+    monkeypatch.setattr(watch, "process_report_days", lambda *args, **kwargs: batches.append(args))
+    watcher = _watcher(tree)
+    for _ in range(3):
+        assert watcher.poll() is None
+    assert batches == [] and watcher.report_open and len(watcher.pending) == 3
+
+
+@pytest.mark.parametrize("failures, delay", [(1, 4.0), (3, 16.0), (10, 300.0)])
+def test_backoff_doubles_up_to_the_cap(tree, monkeypatch, failures, delay):
+    make_days(tree, {5: 1})
+    watcher = BillWatcher(root=tree, workers=1, log=quiet, poll_interval=2.0, settle=0,
+                          today=lambda: date(YEAR, MONTH, 5))
+    monkeypatch.setattr(watch, "process_report_days", lambda *args, **kwargs: 1 / 0)
+    watcher.failures = failures - 1
+    watcher.poll()
+    assert watcher.retry_at - watch.time.monotonic() == pytest.approx(delay, abs=1)